@@ -0,0 +1,28 @@
+"""
+ASGI entry point for the dashboard.
+
+``main.server`` is a plain Flask (WSGI) app; under gunicorn's default sync
+workers each worker handles one request at a time, so a slow modal holds
+back every slider update queued behind it. This module serves the same app
+from an asyncio event loop instead: each request is handed to a pool of
+ASGI_THREADS threads (pandas and numpy release the GIL in their heavy
+kernels), so the many cheap year lookups keep being answered while a slow
+callback computes.
+
+    pip install uvicorn a2wsgi
+    uvicorn asgi:application --workers 2                       # or:
+    SPESHEET_SERVER=asgi gunicorn                              # see gunicorn.conf.py
+
+The event loop itself only moves bytes; callbacks never run on it.
+"""
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from main import server
+
+
+# Threads per process running callbacks
+ASGI_THREADS = int(os.environ.get("SPESHEET_ASGI_THREADS", "16"))
+
+application = WSGIMiddleware(server, workers=ASGI_THREADS)
@@ -0,0 +1,75 @@
+"""
+Background execution of the heavy modal callbacks.
+
+With ``dash[diskcache]`` installed (diskcache, multiprocess, psutil), the
+advanced-analysis modals run as Dash background callbacks: each call is a
+job in a local worker process managed by a DiskcacheManager (no external
+broker). The request worker answers at once and keeps serving slider
+updates while the browser polls for the result.
+
+When the same callback fires again before its job finished, Dash terminates
+the old job (the renderer sends its id along), so superseded computations
+are dropped instead of completed. ``cancel`` inputs (e.g. the modal's close
+button) terminate the job as well.
+
+Without those packages, or with SPESHEET_BACKGROUND=0, the callbacks run
+inline in the request worker as before.
+"""
+import os
+import tempfile
+
+
+BACKGROUND_DIR = os.environ.get("SPESHEET_BACKGROUND_DIR",
+                                os.path.join(tempfile.gettempdir(), "spesheet-background"))
+# How often the browser polls a running job (ms)
+POLL_INTERVAL = 250
+
+_NO_MANAGER = object()
+_manager = _NO_MANAGER
+
+
+def manager():
+    """Shared DiskcacheManager, or None when background callbacks are unavailable."""
+    global _manager
+    if _manager is _NO_MANAGER:
+        _manager = None
+        if os.environ.get("SPESHEET_BACKGROUND", "1") != "0":
+            try:
+                import diskcache
+                from dash import DiskcacheManager
+
+                _manager = DiskcacheManager(diskcache.Cache(BACKGROUND_DIR))
+            except ImportError:
+                pass
+    return _manager
+
+
+def _no_progress(*_):
+    pass
+
+
+def callback_options(func, progress=None, running=None, cancel=None):
+    """Return (function, dash.callback kwargs) to run ``func`` in the background.
+
+    ``func`` takes ``set_progress`` as its first argument when ``progress``
+    outputs are given. Inline, it gets a no-op instead and only ``running``
+    (supported by regular callbacks) is kept.
+    """
+    options = {"running": running} if running else {}
+    mgr = manager()
+    if mgr is None:
+        if progress is None:
+            return func, options
+
+        def inline(*args):
+            return func(_no_progress, *args)
+
+        inline.__name__ = func.__name__
+        return inline, options
+
+    options.update(background=True, manager=mgr, interval=POLL_INTERVAL)
+    if progress is not None:
+        options["progress"] = progress
+    if cancel is not None:
+        options["cancel"] = cancel
+    return func, options
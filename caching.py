@@ -0,0 +1,353 @@
+"""
+Memoization layer for deterministic helpers and year/view-keyed callbacks.
+
+Two tiers:
+    1. In-process LRU (per worker, size bounded, optional TTL).
+    2. Optional shared tier so every gunicorn worker reuses the same results.
+       Selected with the SPESHEET_CACHE_URL environment variable:
+           sqlite:///path/to/cache.db   -> SQLite file (stdlib, default choice)
+           diskcache:///path/to/dir     -> diskcache.Cache (if installed)
+           redis://localhost:6379/0     -> Redis or a compatible server (if redis is installed)
+       Unset -> in-process tier only.
+       The SQLite and diskcache tiers keep at most SHARED_MAX_ENTRIES entries
+       (the least recently used / stored go first, in batches); Redis entries
+       expire after SHARED_TTL unless the function sets its own ttl (also
+       configure the server with ``maxmemory`` and ``maxmemory-policy
+       allkeys-lru`` to bound its memory).
+
+Keys are namespaced by CACHE_VERSION and the fingerprints of the data files
+and the rendering code (see response_store), so after a data refresh or a
+redeploy no worker reads an entry computed by older data or code; the old
+entries are never hit again and age out through the bounds above.
+
+Cached pandas objects are handed out as copies (copy-on-write, so no data
+is copied until a caller writes), so one caller's edits never reach another.
+Other values (figure dicts, components) are shared and must not be mutated.
+
+Usage:
+    @memoize(maxsize=64, ttl=3600)
+    def tab2_get_gdp_map_df(year, view): ...
+
+    cache_stats()  # hit/miss counters for every memoized function
+"""
+import functools
+import hashlib
+import itertools
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import response_store
+
+
+DEFAULT_MAXSIZE = 128
+SHARED_MAX_ENTRIES = 5000
+# Entries dropped at once when a shared tier goes over SHARED_MAX_ENTRIES
+EVICT_BATCH = 500
+# Default expiry of the Redis tier's entries (seconds)
+SHARED_TTL = 7 * 24 * 3600
+# Bump when the pickled value format changes (code and data changes are fingerprinted)
+CACHE_VERSION = 1
+
+_MISSING = object()
+
+
+# =============================================================================
+# Tiers
+# =============================================================================
+
+class LRUTier:
+    """Thread-safe in-process LRU with optional per-entry TTL."""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return _MISSING
+            value, expires = entry
+            if expires is not None and expires < time.time():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteTier:
+    """Shared tier backed by a single SQLite file (safe across processes)."""
+
+    def __init__(self, path, max_entries=SHARED_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY, value BLOB, expires REAL, accessed REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        # A connection must not be reused across fork: reconnect in the child
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return _MISSING
+        value, expires = row
+        now = time.time()
+        if expires is not None and expires < now:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            return _MISSING
+        conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        return pickle.loads(value)
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+            (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now + ttl if ttl else None, now),
+        )
+        # Size-bounded eviction: once over the bound, drop a batch of the least
+        # recently accessed rows (walks the ``accessed`` index)
+        (count,) = conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)",
+                (count - self.max_entries + EVICT_BATCH,),
+            )
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache")
+
+
+class DiskcacheTier:
+    """Shared tier backed by diskcache.Cache (optional dependency)."""
+
+    def __init__(self, directory, max_entries=SHARED_MAX_ENTRIES):
+        import diskcache
+        self._cache = diskcache.Cache(directory, cull_limit=10)
+        self.max_entries = max_entries
+
+    def get(self, key):
+        return self._cache.get(key, default=_MISSING)
+
+    def set(self, key, value, ttl=None):
+        self._cache.set(key, value, expire=ttl)
+        # cull() only enforces the size limit: bound the entry count here,
+        # dropping a batch of the least recently stored keys (iteration order)
+        count = len(self._cache)
+        if count > self.max_entries:
+            self._cache.expire()
+            for old in list(itertools.islice(iter(self._cache), count - self.max_entries + EVICT_BATCH)):
+                self._cache.delete(old)
+
+    def clear(self):
+        self._cache.clear()
+
+
+class RedisTier:
+    """Shared tier for Redis or any server speaking the same protocol (optional)."""
+
+    def __init__(self, url, max_entries=SHARED_MAX_ENTRIES):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        # Not enforced here: entries expire after SHARED_TTL, memory is bounded
+        # by the server's maxmemory / allkeys-lru policy
+        self.max_entries = max_entries
+
+    def get(self, key):
+        raw = self._client.get(key)
+        return _MISSING if raw is None else pickle.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self._client.set(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ex=ttl or SHARED_TTL)
+
+    def clear(self):
+        for key in self._client.scan_iter("spesheet:*"):
+            self._client.delete(key)
+
+
+def shared_tier_from_url(url):
+    """Build the shared tier described by ``url`` (None -> no shared tier)."""
+    if not url:
+        return None
+    if url.startswith("sqlite:///"):
+        return SQLiteTier(url[len("sqlite:///"):])
+    if url.startswith("diskcache:///"):
+        return DiskcacheTier(url[len("diskcache:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisTier(url)
+    raise ValueError(f"Unsupported SPESHEET_CACHE_URL: {url}")
+
+
+_shared_tier = shared_tier_from_url(os.environ.get("SPESHEET_CACHE_URL"))
+
+
+def configure_shared_tier(url):
+    """Switch the shared tier at runtime (e.g. from a gunicorn config file)."""
+    global _shared_tier
+    _shared_tier = shared_tier_from_url(url)
+    return _shared_tier
+
+
+# =============================================================================
+# Decorator
+# =============================================================================
+
+_REGISTRY = {}
+
+
+def _plain(value):
+    """``value`` with NumPy scalars as Python ones (np.int64(2000) and 2000 share a key)."""
+    if isinstance(value, (tuple, list)):
+        return type(value)(_plain(v) for v in value)
+    if type(value).__module__ == "numpy" and getattr(value, "ndim", None) == 0:
+        return value.item()
+    return value
+
+
+@functools.lru_cache(maxsize=1)
+def _namespace():
+    """Short digest of CACHE_VERSION and the data / renderer fingerprints (hashed once per process)."""
+    parts = (str(CACHE_VERSION), response_store.data_fingerprint(), response_store.source_fingerprint())
+    return hashlib.sha256(":".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def _make_key(name, args, kwargs):
+    kwargs = sorted((k, _plain(v)) for k, v in kwargs.items())
+    return f"spesheet:{_namespace()}:{name}:{_plain(args)!r}:{kwargs!r}"
+
+
+def _copy_on_write():
+    pd = sys.modules.get("pandas")
+    if pd is None:
+        return False
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    return bool(getattr(pd.options.mode, "copy_on_write", False))
+
+
+def _detach(value):
+    """A caller's own handle on a cached value: pandas objects are copied.
+
+    With copy-on-write (pandas 3) the copy is shallow and shares the data
+    until either side writes; older pandas gets a deep copy.
+    """
+    if isinstance(value, tuple):
+        return tuple(_detach(v) for v in value)
+    if type(value).__module__.startswith("pandas") and hasattr(value, "copy"):
+        return value.copy(deep=not _copy_on_write())
+    return value
+
+
+def memoize(maxsize=DEFAULT_MAXSIZE, ttl=None, shared=True, name=None):
+    """Memoize a deterministic function in the LRU tier (and the shared tier).
+
+    Arguments must have a stable repr (ints, strings, None, tuples...);
+    NumPy scalars count as the equal Python value. Pandas results are handed
+    out as copies; other cached values are shared and must be treated as
+    read-only.
+
+    Args:
+        maxsize: Entries kept in the in-process LRU.
+        ttl: Seconds before an entry expires (None -> never).
+        shared: Also read/write the shared tier when one is configured.
+        name: Key namespace; defaults to module.qualname.
+    """
+    def decorator(func):
+        key_name = name or f"{func.__module__}.{func.__qualname__}"
+        local = LRUTier(maxsize)
+        stats = {"hits": 0, "shared_hits": 0, "misses": 0}
+        stats_lock = threading.Lock()
+
+        def record(outcome):
+            with stats_lock:
+                stats[outcome] += 1
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = _make_key(key_name, args, kwargs)
+
+            value = local.get(key)
+            if value is not _MISSING:
+                record("hits")
+                return _detach(value)
+
+            tier = _shared_tier if shared else None
+            if tier is not None:
+                value = tier.get(key)
+                if value is not _MISSING:
+                    record("shared_hits")
+                    local.set(key, value, ttl)
+                    return _detach(value)
+
+            record("misses")
+            value = func(*args, **kwargs)
+            local.set(key, value, ttl)
+            if tier is not None:
+                tier.set(key, value, ttl)
+            return _detach(value)
+
+        def cache_info():
+            with stats_lock:
+                return dict(stats, size=len(local), maxsize=maxsize)
+
+        def cache_clear():
+            local.clear()
+            with stats_lock:
+                for k in stats:
+                    stats[k] = 0
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        wrapper.__wrapped__ = func
+        _REGISTRY[key_name] = wrapper
+        return wrapper
+
+    return decorator
+
+
+def cache_stats():
+    """Hit/miss counters for every memoized function, keyed by name."""
+    return {key_name: wrapper.cache_info() for key_name, wrapper in _REGISTRY.items()}
+
+
+def clear_all(shared=False):
+    """Clear every in-process cache (and the shared tier when asked)."""
+    for wrapper in _REGISTRY.values():
+        wrapper.cache_clear()
+    if shared and _shared_tier is not None:
+        _shared_tier.clear()
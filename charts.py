@@ -1,5 +1,5 @@
-from tabs import tab1, tab2, tab3
-from dash import callback, Output, Input
+from tabs import tab1, tab2, tab3, tab4
+from dash import callback, html, Output, Input
 
 ## -- all layouts --
 @callback(
@@ -19,6 +19,10 @@ def render_tab_layout(tab):
     elif tab == 'tab-3':
         return tab3.layout()
 
+    # --- TAB 4: RANKINGS ---
+    elif tab == 'tab-4':
+        return tab4.layout()
+
     return html.Div("Select a tab")
 
 
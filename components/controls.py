@@ -1,6 +1,17 @@
-from dash import html, dcc, callback, Input, Output, State
+import os
+
+from dash import html, dcc, callback, clientside_callback, Input, Output, State
 import dash_bootstrap_components as dbc
-from prepare_data import df_totals, min_year, max_year
+from prepare_data import min_year, max_year, YEARS, YEAR_RANKINGS
+from response_store import precomputed
+from dispatch import tab_callback
+
+# "mouseup": year-driven callbacks fire once when the handle is released.
+# "drag": they follow the handle, debounced by SLIDER_DEBOUNCE_MS in the
+# browser (0 = every intermediate year, coalesced server-side by dispatch.py).
+SLIDER_UPDATEMODE = os.environ.get("SPESHEET_SLIDER_UPDATEMODE", "mouseup")
+SLIDER_DEBOUNCE_MS = int(os.environ.get("SPESHEET_SLIDER_DEBOUNCE_MS", "150"))
+DEBOUNCED_DRAG = SLIDER_UPDATEMODE == "drag" and SLIDER_DEBOUNCE_MS > 0
 
 def layout():
     return html.Div(id='year-controls-container', children=[
@@ -15,6 +26,8 @@ def layout():
                     marks={str(y): {'label': str(y), 'style': {'color': '#7f8c8d', 'fontSize': '0.7rem'}} 
                            for y in range(min_year, max_year + 1, 10)},
                     step=1,
+                    # A debounced drag reads drag_value (below); value itself stays on mouseup
+                    updatemode="mouseup" if DEBOUNCED_DRAG else SLIDER_UPDATEMODE,
                 ),
                 html.Div([
                     dbc.Button("▶ Play", id="play-button", n_clicks=1, color="primary", className="me-2", size="sm"),
@@ -29,6 +42,28 @@ def layout():
         ),
     ])
 
+## Debounced drag: the year follows the handle once it rests for SLIDER_DEBOUNCE_MS
+if DEBOUNCED_DRAG:
+    clientside_callback(
+        """
+        function(dragValue, value) {
+            const nu = window.dash_clientside.no_update;
+            const token = (window._yearSliderDebounce || 0) + 1;
+            window._yearSliderDebounce = token;
+            return new Promise(function(resolve) {
+                setTimeout(function() {
+                    const settled = token === window._yearSliderDebounce;
+                    resolve(settled && dragValue !== undefined && dragValue !== value ? dragValue : nu);
+                }, %d);
+            });
+        }
+        """ % SLIDER_DEBOUNCE_MS,
+        Output('year-slider', 'value', allow_duplicate=True),
+        Input('year-slider', 'drag_value'),
+        State('year-slider', 'value'),
+        prevent_initial_call=True
+    )
+
 ## Year slider animation
 @callback(
     Output('year-slider', 'value'),
@@ -54,18 +89,24 @@ def toggle_play(n, is_disabled):
     return False, "⏸ Pause"
 
 ## Statistics cards update
-@callback(
+@tab_callback(
+    'tab-1',
     Output('stats-container', 'children'),
     Input('year-slider', 'value')
 )
 def update_stats(selected_year):
     if selected_year is None:
         return []
-    dff = df_totals[df_totals['Year'] == selected_year]
-    if dff.empty:
+    return render_stats(selected_year)
+
+@precomputed("tab1.stats", year=YEARS)
+def render_stats(selected_year):
+    ranking = YEAR_RANKINGS["totals"]
+    stats = ranking.stats(selected_year)
+    if stats is None:
         return []
-    global_sum = dff['Value'].sum()
-    max_row = dff.loc[dff['Value'].idxmax()]
+    global_sum = stats["sum"]
+    max_row = ranking.top(selected_year, 1).iloc[0]
     
     return [
         dbc.Col(dbc.Card(dbc.CardBody([
@@ -80,6 +121,6 @@ def update_stats(selected_year):
         
         dbc.Col(dbc.Card(dbc.CardBody([
             html.H6("Nation Average", className="card-subtitle text-muted small"),
-            html.H5(f"{dff['Value'].mean():,.2f} Mt", className="text-success mb-0")
+            html.H5(f"{stats['mean']:,.2f} Mt", className="text-success mb-0")
         ], className="py-2"), className="border-start border-success border-4"), width=4)
     ]
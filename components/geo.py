@@ -0,0 +1,79 @@
+"""
+Shared world topology for the choropleths.
+
+plotly.js draws every geo subplot from a topojson file (world_110m.json or
+world_50m.json) that it fetches from cdn.plot.ly by default. When the files
+are present in assets/topojson/ (``python scripts/fetch_topojson.py``) the
+maps load them from this server instead, once per browser thanks to the
+long Cache-Control set in init_app(); otherwise the CDN default is kept.
+
+Maps start at the light 110m resolution and switch to 50m when zoomed in
+(register_zoom_resolution), through a Patch on layout.geo.resolution.
+"""
+import os
+
+from dash import Input, Output, Patch, callback, get_asset_url, no_update
+from flask import request
+
+
+TOPOJSON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "topojson")
+TOPOJSON_FILES = ("world_110m.json", "world_50m.json")
+TOPOJSON_MAX_AGE = 30 * 24 * 3600  # seconds; the files only change with plotly.js
+
+# geo.projection.scale from which the 50m outlines are used
+ZOOM_50M_SCALE = 2.5
+
+
+def has_local_topojson():
+    return all(os.path.exists(os.path.join(TOPOJSON_DIR, name)) for name in TOPOJSON_FILES)
+
+
+def graph_config():
+    """dcc.Graph ``config`` for map graphs (local topojson when shipped)."""
+    if not has_local_topojson():
+        return {}
+    return {"topojsonURL": get_asset_url("topojson/")}
+
+
+def _cache_topojson(response):
+    if "/topojson/" in request.path and request.path.endswith(".json") and response.status_code in (200, 304):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = TOPOJSON_MAX_AGE
+    return response
+
+
+def init_app(server):
+    """Serve the topology assets with a long Cache-Control."""
+    server.after_request(_cache_topojson)
+
+
+def resolution_for_scale(scale):
+    return 50 if scale >= ZOOM_50M_SCALE else 110
+
+
+def _projection_scale(relayout_data):
+    if not relayout_data:
+        return None
+    if "geo.projection.scale" in relayout_data:
+        return relayout_data["geo.projection.scale"]
+    return ((relayout_data.get("geo") or {}).get("projection") or {}).get("scale")
+
+
+def register_zoom_resolution(graph_id):
+    """Switch ``graph_id`` between 110m and 50m outlines as the user zooms."""
+    @callback(
+        Output(graph_id, "figure", allow_duplicate=True),
+        Input(graph_id, "relayoutData"),
+        prevent_initial_call=True,
+    )
+    def update_resolution(relayout_data):
+        scale = _projection_scale(relayout_data)
+        if scale is None:  # pan, hover or autosize: resolution unchanged
+            return no_update
+        patch = Patch()
+        patch["layout"]["geo"]["resolution"] = resolution_for_scale(scale)
+        return patch
+
+    update_resolution.__name__ = f"update_resolution_{graph_id.replace('-', '_')}"
+    return update_resolution
@@ -0,0 +1,182 @@
+"""
+Per-tab registration of the dashboard callbacks.
+
+Only the active tab's layout is mounted (charts.render_tab_layout), and the
+renderer only dispatches callbacks whose outputs are in the page. Taking
+``tabs.active_tab`` as an Input therefore only adds work: on every tab switch
+the old tab's callbacks fire once more and ship empty figures, while the new
+tab's components trigger their own initial calls anyway.
+
+``tab_callback`` registers a callback for one tab with ``active_tab`` as a
+State instead. A call that arrives while the tab is hidden, or that leaves
+every output as ``no_update``, ends with an empty HTTP 204 instead of
+serializing placeholders:
+
+    @tab_callback("tab-1", Output("map-graph", "figure"), Input("year-slider", "value"))
+    def update_map(year): ...
+
+Requests are also coalesced per browser session, callback and trigger: a
+request that is still waiting or computing when a newer one for the same
+callback, fired by the same input(s), arrives (slider drag, keyboard repeat,
+queued workers) is abandoned with a 204 before computing and before
+serializing its result; the browser only ever shows the newest one anyway.
+Requests fired by different inputs never supersede each other, so a year
+tick answered with a Patch cannot drop the full render of a view switch or
+an initial mount (the Patch would land on a figure the client never got).
+SPESHEET_COALESCE_MS adds a short wait before computing so that bursts
+collapse into their last request (0 = only the checks, the default).
+
+Only requests carrying the session cookie are coalesced (the remote address
+would merge the users behind one NAT or proxy). The sequence numbers live in
+the worker process: with several gunicorn workers, only the requests of a
+burst that land on the same worker are coalesced (threaded workers still
+catch most of a drag, sync workers next to none).
+
+Calls, skips and superseded requests are counted per callback
+(``invocation_report()``); ``python scripts/sweep_count.py`` replays an
+autoplay sweep and ``python scripts/drag_burst.py`` a slider drag.
+"""
+import itertools
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+
+from dash import State, callback, callback_context as ctx, no_update
+from dash.exceptions import PreventUpdate
+from flask import has_request_context, request
+
+import background as background_jobs
+
+
+SESSION_COOKIE = "spesheet_sid"
+COALESCE_WINDOW = float(os.environ.get("SPESHEET_COALESCE_MS", "0")) / 1000
+COALESCE = os.environ.get("SPESHEET_COALESCE", "1") != "0"
+# (session, callback, trigger) keys remembered for coalescing
+MAX_TRACKED = 10000
+
+_lock = threading.Lock()
+_invocations = defaultdict(lambda: {"calls": 0, "skipped": 0, "superseded": 0})
+_latest = OrderedDict()
+_sequence = itertools.count(1)
+
+
+def count(name, outcome="done"):
+    """Record one invocation of callback ``name``.
+
+    ``outcome`` is "done", "skipped" (hidden tab / nothing to update) or
+    "superseded" (abandoned for a newer request).
+    """
+    with _lock:
+        entry = _invocations[name]
+        entry["calls"] += 1
+        if outcome != "done":
+            entry[outcome] += 1
+
+
+def init_app(server):
+    """Give every browser a session cookie (the coalescing key)."""
+    @server.after_request
+    def _session_cookie(response):
+        if SESSION_COOKIE not in request.cookies:
+            response.set_cookie(SESSION_COOKIE, uuid.uuid4().hex, httponly=True, samesite="Lax")
+        return response
+
+
+def _begin(name):
+    """Register a request for ``name``; returns its coalescing key and sequence (or None).
+
+    The key is (session, callback, triggering inputs); requests without a
+    session cookie are not coalesced.
+    """
+    if not COALESCE or not has_request_context():
+        return None
+    session = request.cookies.get(SESSION_COOKIE)
+    if not session:
+        return None
+    key = (session, name, tuple(sorted(ctx.triggered_prop_ids)))
+    seq = next(_sequence)
+    with _lock:
+        _latest[key] = seq
+        _latest.move_to_end(key)
+        while len(_latest) > MAX_TRACKED:
+            _latest.popitem(last=False)
+    return key, seq
+
+
+def _superseded(ticket):
+    if ticket is None:
+        return False
+    key, seq = ticket
+    with _lock:
+        return _latest.get(key, seq) != seq
+
+
+def _unchanged(result):
+    """True when a callback result leaves every output as it is."""
+    if isinstance(result, (tuple, list)) and result:
+        return all(r is no_update for r in result)
+    return result is no_update
+
+
+def invocation_report():
+    """Per-callback {calls, skipped, superseded} since start (or the last reset)."""
+    with _lock:
+        return {name: dict(entry) for name, entry in _invocations.items()}
+
+
+def reset_invocations():
+    with _lock:
+        _invocations.clear()
+
+
+def tab_callback(tab, *dependencies, background=False, progress=None, running=None, cancel=None, **kwargs):
+    """``dash.callback`` for a callback whose outputs live in ``tab``'s layout.
+
+    The decorated function takes the dependencies' values without the active
+    tab. Like ``dash.callback``, the undecorated function is returned, so
+    renderers and the static export can still call it directly.
+
+    With ``background=True`` the callback runs as a background job when a
+    manager is available (see background.py); it then receives
+    ``set_progress`` first, and its calls are counted in the job process.
+    """
+    def decorator(func):
+        name = f"{func.__module__}.{func.__name__}"
+        target, options = func, dict(kwargs)
+        if background:
+            target, extra = background_jobs.callback_options(func, progress, running, cancel)
+            options.update(extra)
+        elif running:
+            options["running"] = running
+
+        def dispatch(*args):
+            *args, active_tab = args
+            if active_tab != tab:
+                count(name, "skipped")
+                raise PreventUpdate
+
+            ticket = _begin(name)
+            if COALESCE_WINDOW and ticket is not None:
+                time.sleep(COALESCE_WINDOW)
+            if _superseded(ticket):
+                count(name, "superseded")
+                raise PreventUpdate
+
+            result = target(*args)
+            if _unchanged(result):
+                count(name, "skipped")
+                raise PreventUpdate
+            # Computed, but a newer request is on its way: skip serializing it
+            if _superseded(ticket):
+                count(name, "superseded")
+                raise PreventUpdate
+            count(name)
+            return result
+
+        dispatch.__name__ = func.__name__
+        callback(*dependencies, State("tabs", "active_tab"), **options)(dispatch)
+        return func
+
+    return decorator
@@ -0,0 +1,503 @@
+"""
+Static export of the dashboard (no Python server needed to browse it).
+
+Renders the app shell and every tab layout to HTML, and every output of the
+registered renderers (see response_store.py) to JSON shards:
+
+    site/index.html, tab2.html ... tab4.html  one page per tab
+    site/data/<tab>/<year>.json               year-driven outputs (maps, cards, bubbles...)
+    site/data/<tab>/<year>.modal.json         modal bodies, fetched when a modal opens
+    site/data/country/<ISO>.json              outputs that depend on a clicked country
+    site/assets/site.js, plotly.min.js        client runtime
+    site/assets/topojson/                     world topology (when fetched, see components/geo.py)
+
+Year switching, autoplay, view toggles, modals and country clicks are
+handled in static_site/site.js against those shards, so the folder can be
+served from any static file server:
+
+    python export_static.py [--out site] [--country-years 2021 2000]
+    python -m http.server -d site
+"""
+import argparse
+import html as html_lib
+import itertools
+import json
+import os
+import shutil
+import sys
+import time
+
+import plotly
+from dash._utils import to_json
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+RUNTIME_DIR = os.path.join(ROOT, "static_site")
+
+PAGES = {"tab-1": "index.html", "tab-2": "tab2.html", "tab-3": "tab3.html", "tab-4": "tab4.html"}
+TAB_DIRS = {"tab-1": "tab1", "tab-2": "tab2", "tab-3": "tab3", "tab-4": "tab4"}
+
+
+# =============================================================================
+# Bindings: which renderer feeds which DOM ids, from which client state
+# =============================================================================
+
+class Binding:
+    """One renderer exported for the client.
+
+    Args:
+        name: Key namespace in the shards.
+        func: Renderer called positionally with the values of ``args``.
+        args: Client state keys (year, gdp_view, tab2_mode, iso1, iso2...).
+        outputs: DOM ids filled with the result (tuple results map one-to-one,
+            single results are copied into every id).
+        shard: "static" (embedded in the page), "year" or "modal".
+        country_arg: State key holding a clicked country; non-null values are
+            served from data/country/<ISO>.json.
+        country_year: For country entries, "fixed" (rendered at the last year,
+            the client moves the year marker) or "nearest" (rendered for
+            --country-years, the client picks the closest one).
+        when: {state_key: value} conditions for the binding to apply; argument
+            combinations that contradict them are not exported.
+        ring: State key of an ISO to ring on the bubble figure (Tab 3).
+    """
+
+    def __init__(self, name, func, args, outputs, shard="year", country_arg=None,
+                 country_year=None, when=None, ring=None):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.outputs = outputs
+        self.shard = shard
+        self.country_arg = country_arg
+        self.country_year = country_year
+        self.when = when or {}
+        self.ring = ring
+
+    def applies(self, named):
+        """False when argument values ``named`` contradict ``when``."""
+        return all(named.get(k, v) == v for k, v in self.when.items())
+
+    def manifest(self):
+        return dict(name=self.name, args=self.args, outputs=self.outputs, shard=self.shard,
+                    country_arg=self.country_arg, country_year=self.country_year,
+                    when=self.when, ring=self.ring)
+
+
+def make_bindings():
+    """Bindings for every tab (imports the app so all renderers exist)."""
+    import main
+    from components import controls
+    from tabs import tab1, tab2, tab3, tab4
+
+    def conclusion(tab, mode_key):
+        def render(mode=None):
+            modes = {"tab2_mode": "gdp", "tab3_mode": "gdp"}
+            if mode_key:
+                modes[mode_key] = mode
+            return main.update_tab_conclusion(tab, modes["tab2_mode"], modes["tab3_mode"])
+        return render
+
+    return {
+        "tab-1": [
+            Binding("main.conclusion", conclusion("tab-1", None), [], ["tab-conclusion-container"], shard="static"),
+            Binding("tab1.stats", controls.render_stats, ["year"], ["stats-container"]),
+            Binding("tab1.map", tab1.render_map, ["year"], ["map-graph"]),
+            Binding("tab1.treemap", tab1.render_treemap, ["year"], ["treemap-graph"]),
+            Binding("tab1.modal", tab1.render_advanced_modal, ["iso1", "year"], ["modal-advanced-body"],
+                    shard="modal", country_arg="iso1", country_year="nearest"),
+        ],
+        "tab-2": [
+            Binding("main.conclusion", conclusion("tab-2", "tab2_mode"), ["tab2_mode"],
+                    ["tab-conclusion-container"], shard="static"),
+            Binding("tab2.text", tab2.update_tab2_text, ["tab2_mode"], [
+                "tab2-map-title-gdp", "tab2-map-description-gdp", "tab2-lines-title-gdp",
+                "tab2-lines-description-gdp", "tab2-map-title-life", "tab2-map-description-life",
+                "tab2-lines-title-life", "tab2-lines-description-life", "tab2-modal-title",
+                "tab2-modal-intro", "advanced-button-text"], shard="static"),
+            Binding("tab2.cards", tab2.render_gdp_cards, ["year", "gdp_view", "tab2_mode"], ["gdp-stats-container"]),
+            # One graph per view: each binding only renders (and ships) its own mode
+            Binding("tab2.map", tab2.render_gdp_map, ["year", "gdp_view", "tab2_mode"], ["gdp-map"],
+                    when={"tab2_mode": "gdp"}),
+            Binding("tab2.map", tab2.render_gdp_map, ["year", "gdp_view", "tab2_mode"], ["gdp-map-life"],
+                    when={"tab2_mode": "life"}),
+            Binding("tab2.lines", tab2.render_country_lines, ["iso2", "year", "tab2_mode", "tab2_avg", "tab2_trend"],
+                    ["gdp-country-lines"], country_arg="iso2", country_year="fixed", when={"tab2_mode": "gdp"}),
+            Binding("tab2.lines", tab2.render_country_lines, ["iso2", "year", "tab2_mode", "tab2_avg", "tab2_trend"],
+                    ["gdp-country-lines-life"], country_arg="iso2", country_year="fixed", when={"tab2_mode": "life"}),
+            Binding("tab2.continental", tab2.render_continental_progress, ["year", "tab2_avg", "tab2_trend"],
+                    ["tab2-continental-chart-container"], when={"tab2_mode": "life"}),
+            Binding("tab2.modal.gdp", tab2.create_gdp_advanced_analysis, ["year"], ["modal-advanced-body-gdp"],
+                    shard="modal", when={"tab2_mode": "gdp"}),
+            Binding("tab2.modal.life", tab2.create_life_expectancy_advanced_analysis, ["year"],
+                    ["modal-advanced-body-gdp"], shard="modal", when={"tab2_mode": "life"}),
+        ],
+        "tab-3": [
+            Binding("main.conclusion", conclusion("tab-3", "tab3_mode"), ["tab3_mode"],
+                    ["tab-conclusion-container"], shard="static"),
+            Binding("tab3.text", tab3.update_chart_header, ["tab3_mode"], [
+                "bubble-chart-title", "bubble-chart-description", "stats-description",
+                "trajectory-description", "advanced-analysis-description", "corr-open-advanced-text"],
+                    shard="static"),
+            Binding("tab3.bubble", tab3.render_bubble, ["year", "tab3_mode"],
+                    ["corr-bubble-graph", "corr-value-display", "corr-explanation-display"], ring="iso3"),
+            Binding("tab3.trajectory", tab3.update_trajectory,
+                    ["iso3", "tab3_mode", "tab3_trend"], ["corr-trajectory-graph"], shard="static", country_arg="iso3"),
+            Binding("tab3.modal.gdp", tab3.create_decoupling_analysis, ["year"], _TAB3_MODAL_OUTPUTS,
+                    shard="modal", when={"tab3_mode": "gdp"}),
+            Binding("tab3.modal.life", tab3.create_life_progress_analysis, ["year"], _TAB3_MODAL_OUTPUTS,
+                    shard="modal", when={"tab3_mode": "life"}),
+        ],
+        "tab-4": [
+            Binding("main.conclusion", conclusion("tab-4", None), [], ["tab-conclusion-container"], shard="static"),
+            Binding("tab4.bump", tab4.render_rank_bump, ["rank_metric", "rank_top", "year"], ["rank-bump-graph"]),
+        ],
+    }
+
+
+_TAB3_MODAL_OUTPUTS = ["corr-decoupling-graph", "modal-title", "modal-subtitle", "modal-description",
+                       "top-countries-section"]
+
+# Client-side wiring that replaces the UI-only callbacks (toggles, clicks, modals)
+TAB_UI = {
+    "tab-1": {
+        "clicks": [{"graph": "map-graph", "set": {"iso1": "location"},
+                    "open": "modal-advanced"}],
+        "buttons": [{"id": "reset-global-btn", "set": {"iso1": None},
+                     "open": "modal-advanced"}],
+        "modals": {"modal-advanced": ["close-advanced"]},
+    },
+    "tab-2": {
+        "modes": [{"key": "tab2_mode", "buttons": {"gdp": "btn-tab2-view-gdp", "life": "btn-tab2-view-life"},
+                   "show": {"gdp": ["gdp-layout-container", "gdp-controls-row"], "life": ["life-layout-container"]}}],
+        "radios": {"gdp-view": "gdp_view", "tab2-average": "tab2_avg", "tab2-trend": "tab2_trend"},
+        # Population-weighted means only apply to intensive metrics (see tab2.toggle_average_control)
+        "constraints": [{"when": {"tab2_mode": "gdp", "gdp_view": "total"},
+                         "hide": ["tab2-average-control"], "set": {"tab2_avg": "mean"}}],
+        "clicks": [{"graph": "gdp-map", "set": {"iso2": "location"}},
+                   {"graph": "gdp-map-life", "set": {"iso2": "location"}}],
+        "buttons": [{"id": "advanced-button-text", "open": "modal-advanced-gdp"}],
+        "modals": {"modal-advanced-gdp": ["close-advanced-gdp"]},
+    },
+    "tab-3": {
+        "modes": [{"key": "tab3_mode", "buttons": {"gdp": "btn-view-gdp", "life": "btn-view-life"}, "show": {}}],
+        "radios": {"tab3-trend": "tab3_trend"},
+        "clicks": [{"graph": "corr-bubble-graph", "set": {"iso3": "customdata.0"}}],
+        "buttons": [{"id": "corr-open-advanced-text", "open": "corr-modal-advanced"}],
+        "modals": {"corr-modal-advanced": ["corr-close-advanced"]},
+    },
+    "tab-4": {
+        "radios": {"rank-metric": "rank_metric", "rank-top": "rank_top"},
+    },
+}
+
+
+def make_domains():
+    """Values of every client state key (country keys hold (value, ISO) pairs)."""
+    from prepare_data import (
+        YEARS, AVERAGE_STATS, TRENDS, df_totals, df_gdp_total, df_life_expectancy, TAB3_GDP_MERGED, TAB3_LIFE_MERGED,
+    )
+    from tabs.tab4 import RANK_METRICS, TOP_NS
+
+    def isos(*frames):
+        codes = set().union(*(set(f["ISOcode"].dropna()) for f in frames))
+        return [(iso, iso) for iso in sorted(codes)]
+
+    return {
+        "year": list(YEARS),
+        "gdp_view": ["total", "capita"],
+        "tab2_mode": ["gdp", "life"],
+        "tab3_mode": ["gdp", "life"],
+        "tab2_avg": list(AVERAGE_STATS),
+        "tab2_trend": list(TRENDS),
+        "tab3_trend": list(TRENDS),
+        "rank_metric": list(RANK_METRICS),
+        "rank_top": list(TOP_NS),
+        "iso1": isos(df_totals),
+        "iso2": isos(df_gdp_total, df_life_expectancy),
+        "iso3": isos(TAB3_GDP_MERGED, TAB3_LIFE_MERGED),
+    }
+
+
+def shard_key(name, values):
+    """Key of one output inside a shard (mirrored by key() in site.js)."""
+    return "|".join([name] + ["None" if v is None else str(v) for v in values])
+
+
+# =============================================================================
+# Component JSON -> HTML
+# =============================================================================
+
+_VOID_TAGS = {"hr", "br", "img", "input"}
+_BOOTSTRAP_BLOCKS = {
+    "Row": "row", "Card": "card", "CardBody": "card-body", "CardHeader": "card-header",
+    "ButtonGroup": "btn-group", "ModalHeader": "modal-header", "ModalBody": "modal-body",
+    "ModalFooter": "modal-footer", "Container": "container-fluid",
+}
+
+
+def _style(style):
+    if not style:
+        return ""
+    css = ";".join(
+        "".join("-" + c.lower() if c.isupper() else c for c in k) + f":{v}" for k, v in style.items()
+    )
+    return css
+
+
+def _attrs(**attrs):
+    out = []
+    for key, value in attrs.items():
+        if value is None or value is False or value == "":
+            continue
+        key = key.rstrip("_").replace("_", "-")
+        out.append(f' {key}="{html_lib.escape(str(value), quote=True)}"' if value is not True else f" {key}")
+    return "".join(out)
+
+
+def _classes(*parts):
+    return " ".join(p for p in parts if p)
+
+
+def to_html(node, figures):
+    """Render Dash component JSON to HTML; Graph figures are appended to ``figures``."""
+    if node is None:
+        return ""
+    if isinstance(node, (list, tuple)):
+        return "".join(to_html(child, figures) for child in node)
+    if not isinstance(node, dict) or "type" not in node:
+        return html_lib.escape(str(node))
+
+    kind, namespace, props = node["type"], node.get("namespace"), node.get("props", {})
+    children = lambda: to_html(props.get("children"), figures)  # noqa: E731
+    cls, style, id_ = props.get("className"), _style(props.get("style")), props.get("id")
+
+    if namespace == "dash_html_components":
+        tag = kind.lower()
+        if tag in _VOID_TAGS:
+            return f"<{tag}{_attrs(id=id_, class_=cls, style=style)}>"
+        return f"<{tag}{_attrs(id=id_, class_=cls, style=style)}>{children()}</{tag}>"
+
+    if namespace == "dash_core_components":
+        if kind == "Graph":
+            index = ""
+            if props.get("figure") is not None:
+                figures.append(props["figure"])
+                index = len(figures) - 1
+            return f"<div{_attrs(id=id_, class_=_classes('js-graph', cls), style=style, data_figure=index)}></div>"
+        if kind == "Slider":
+            marks = "".join(f"<span>{html_lib.escape(str(m.get('label', k)))}</span>"
+                            for k, m in (props.get("marks") or {}).items())
+            return (f"<div class=\"d-flex align-items-center gap-2\">"
+                    f"<input{_attrs(type='range', id=id_, class_='form-range', min=props.get('min'), max=props.get('max'), step=props.get('step'), value=props.get('value'))}>"
+                    f"<span class=\"badge bg-primary\" data-year-label></span></div>"
+                    f"<div class=\"d-flex justify-content-between small text-muted\">{marks}</div>")
+        return ""  # Store, Interval: state lives in site.js
+
+    if namespace == "dash_bootstrap_components":
+        if kind == "Col":
+            width = props.get("width")
+            return f"<div{_attrs(id=id_, class_=_classes(f'col-{width}' if width else 'col', cls), style=style)}>{children()}</div>"
+        if kind in _BOOTSTRAP_BLOCKS:
+            close = ""
+            if kind == "ModalHeader" and props.get("close_button", True):
+                close = '<button type="button" class="btn-close" data-modal-close></button>'
+            return f"<div{_attrs(id=id_, class_=_classes(_BOOTSTRAP_BLOCKS[kind], cls), style=style)}>{children()}{close}</div>"
+        if kind == "ModalTitle":
+            return f"<h5{_attrs(id=id_, class_=_classes('modal-title', cls))}>{children()}</h5>"
+        if kind == "Modal":
+            dialog = _classes("modal-dialog", f"modal-{props['size']}" if props.get("size") else "",
+                              "modal-dialog-centered" if props.get("centered") else "",
+                              "modal-dialog-scrollable" if props.get("scrollable") else "")
+            return (f"<div{_attrs(id=id_, class_='modal', tabindex='-1')}><div class=\"{dialog}\">"
+                    f"<div class=\"modal-content\">{children()}</div></div></div>")
+        if kind == "Button":
+            color = props.get("color") or "primary"
+            variant = f"outline-{color}" if props.get("outline") else color
+            size = f"btn-{props['size']}" if props.get("size") in ("sm", "lg") else ""
+            return f"<button{_attrs(type='button', id=id_, class_=_classes('btn', f'btn-{variant}', size, cls), style=style)}>{children()}</button>"
+        if kind == "Alert":
+            return f"<div{_attrs(id=id_, class_=_classes('alert', 'alert-' + (props.get('color') or 'primary'), cls))}>{children()}</div>"
+        if kind == "RadioItems":
+            items = []
+            for option in props.get("options", []):
+                checked = option["value"] == props.get("value")
+                items.append(
+                    f"<div class=\"form-check{' form-check-inline' if props.get('inline') else ''}\">"
+                    f"<input{_attrs(class_='form-check-input', type='radio', name=id_, value=option['value'], checked=checked)}>"
+                    f"<label class=\"form-check-label\">{html_lib.escape(str(option['label']))}</label></div>")
+            return f"<div{_attrs(id=id_, class_=cls)}>{''.join(items)}</div>"
+        if kind == "Tabs":
+            links = []
+            for tab in props.get("children") or []:
+                tab_id = tab["props"]["tab_id"]
+                active = " active" if tab_id == props.get("active_tab") else ""
+                links.append(f"<li class=\"nav-item\"><a class=\"nav-link{active}\" href=\"{PAGES[tab_id]}\" data-tab-link>"
+                             f"{html_lib.escape(tab['props']['label'])}</a></li>")
+            return f"<ul{_attrs(id=id_, class_=_classes('nav nav-tabs', cls))}>{''.join(links)}</ul>"
+
+    # Unknown component: keep its children so the content still shows
+    return f"<div{_attrs(id=id_, class_=cls, style=style)}>{children()}</div>"
+
+
+def to_static(value):
+    """One callback output -> {"figure": ...} or {"html": ..., "figures": [...]}."""
+    value = json.loads(to_json(value))
+    if isinstance(value, dict) and "data" in value and "layout" in value:
+        return {"figure": value}
+    figures = []
+    return {"html": to_html(value, figures), "figures": figures}
+
+
+def render_output(binding, values):
+    """Render a binding for one set of argument values into per-output entries."""
+    result = binding.func(*values)
+    if len(binding.outputs) > 1 and isinstance(result, (tuple, list)) and len(result) == len(binding.outputs):
+        return [to_static(r) for r in result]
+    return [to_static(result)] * len(binding.outputs) if len(binding.outputs) > 1 else [to_static(result)]
+
+
+# =============================================================================
+# Export
+# =============================================================================
+
+def render_page(tab, app_layout, tab_layout, manifest):
+    """Full HTML page for one tab: app shell with the tab layout inside."""
+    shell = json.loads(to_json(app_layout))
+
+    def fill(node):
+        if isinstance(node, list):
+            for child in node:
+                fill(child)
+        elif isinstance(node, dict) and "props" in node:
+            props = node["props"]
+            if props.get("id") == "tabs":
+                props["active_tab"] = tab
+            if props.get("id") == "tabs-content":
+                props["children"] = json.loads(to_json(tab_layout))
+            fill(props.get("children"))
+
+    fill(shell)
+    body = to_html(shell, [])
+
+    import dash_bootstrap_components as dbc
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>ALLSTAT: CO2 Emissions Dashboard</title>
+<link rel="stylesheet" href="{dbc.themes.FLATLY}">
+<link rel="stylesheet" href="assets/site.css">
+<script src="assets/plotly.min.js"></script>
+</head>
+<body>
+{body}
+<script>window.SPESHEET = {json.dumps(manifest)};</script>
+<script src="assets/site.js"></script>
+</body>
+</html>
+"""
+
+
+def _write_json(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    return os.path.getsize(path)
+
+
+def export(out_dir, country_years=None):
+    """Write the static site for every tab into ``out_dir``."""
+    import main
+    from prepare_data import min_year, max_year
+    from tabs import tab1, tab2, tab3, tab4
+    from components import geo
+
+    layouts = {"tab-1": tab1.layout(), "tab-2": tab2.layout(), "tab-3": tab3.layout(), "tab-4": tab4.layout()}
+    bindings = make_bindings()
+    domains = make_domains()
+    country_years = sorted(country_years or [max_year])
+
+    os.makedirs(os.path.join(out_dir, "assets"), exist_ok=True)
+    shutil.copy(os.path.join(RUNTIME_DIR, "site.js"), os.path.join(out_dir, "assets", "site.js"))
+    shutil.copy(os.path.join(RUNTIME_DIR, "site.css"), os.path.join(out_dir, "assets", "site.css"))
+    shutil.copy(os.path.join(os.path.dirname(plotly.__file__), "package_data", "plotly.min.js"),
+                os.path.join(out_dir, "assets", "plotly.min.js"))
+    plot_config = {}
+    if geo.has_local_topojson():
+        shutil.copytree(geo.TOPOJSON_DIR, os.path.join(out_dir, "assets", "topojson"), dirs_exist_ok=True)
+        plot_config["topojsonURL"] = "assets/topojson/"
+
+    country_shards = {}
+    total_bytes = 0
+    for tab, tab_bindings in bindings.items():
+        t0 = time.perf_counter()
+        static, shards = {}, {}
+        for b in tab_bindings:
+            plain_args = [a for a in b.args if a != b.country_arg]
+
+            # Country-free entries (country arg = None)
+            for combo in itertools.product(*(domains[a] for a in plain_args)):
+                named = dict(zip(plain_args, combo))
+                if not b.applies(named):
+                    continue
+                values = [named.get(a) for a in b.args]
+                entry = render_output(b, values)
+                key = shard_key(b.name, values)
+                if b.shard == "static":
+                    static[key] = entry
+                else:
+                    suffix = ".modal.json" if b.shard == "modal" else ".json"
+                    shards.setdefault(f"{named['year']}{suffix}", {})[key] = entry
+
+            # Clicked-country entries, one shard per ISO
+            if b.country_arg:
+                years = {"fixed": [max_year], "nearest": country_years}.get(b.country_year, [None])
+                other = [a for a in plain_args if a != "year"]
+                for (country, iso), year in itertools.product(domains[b.country_arg], years):
+                    for combo in itertools.product(*(domains[a] for a in other)):
+                        named = dict(zip(other, combo), year=year, **{b.country_arg: country})
+                        if not b.applies(named):
+                            continue
+                        values = [named.get(a) for a in b.args]
+                        country_shards.setdefault(iso, {})[shard_key(b.name, values)] = render_output(b, values)
+
+        for filename, payload in shards.items():
+            total_bytes += _write_json(os.path.join(out_dir, "data", TAB_DIRS[tab], filename), payload)
+
+        manifest = {
+            "tab": tab,
+            "data_dir": f"data/{TAB_DIRS[tab]}",
+            "min_year": min_year,
+            "max_year": max_year,
+            "country_years": country_years,
+            "bindings": [b.manifest() for b in tab_bindings],
+            "ui": TAB_UI[tab],
+            "static": static,
+            "plot_config": plot_config,
+        }
+        page = render_page(tab, main.app.layout, layouts[tab], manifest)
+        with open(os.path.join(out_dir, PAGES[tab]), "w", encoding="utf-8") as f:
+            f.write(page)
+        total_bytes += len(page.encode("utf-8"))
+        print(f"{tab:<8}{len(shards):>5} shards {time.perf_counter() - t0:>8.1f}s")
+
+    for iso, payload in country_shards.items():
+        total_bytes += _write_json(os.path.join(out_dir, "data", "country", f"{iso}.json"), payload)
+    print(f"country {len(country_shards):>5} shards")
+    print(f"Wrote {out_dir}: {total_bytes / 1e6:.1f} MB")
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Export the dashboard as a static site.")
+    parser.add_argument("--out", default="site")
+    parser.add_argument("--country-years", nargs="*", type=int,
+                        help="years rendered for the Tab 1 country modal (default: last year)")
+    args = parser.parse_args(argv)
+    export(args.out, args.country_years)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    cli()
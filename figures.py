@@ -0,0 +1,374 @@
+"""
+Thin figure builders that write Plotly figure dicts straight from arrays.
+
+Plotly Express re-validates and regroups the whole DataFrame on every call.
+The builders below skip that step: callbacks hand over already filtered
+arrays and get back a plain ``{"data": [...], "layout": {...}}`` dict that
+Dash serializes as-is. Output mirrors the px figures used before (same trace
+types, coloraxis, template and hover fields).
+
+Numeric trace arrays are rounded to display precision and sent as base64
+typed arrays (``{"dtype", "bdata"}``, decoded natively by plotly.js) instead
+of full-precision JSON number lists.
+
+Run ``python scripts/bench_figures.py`` to compare both paths.
+"""
+import base64
+from functools import lru_cache
+
+import numpy as np
+import plotly.io as pio
+from dash import Patch, no_update
+from plotly.colors import get_colorscale
+
+
+# Rendering mode for bubble charts: WebGL above this many points
+BUBBLE_RENDER_MODE = "auto"   # "auto", "svg" or "webgl"
+WEBGL_ROW_THRESHOLD = 1000
+BUBBLE_SIZE_MAX = 60
+
+# Numeric arrays travel as typed arrays (set to False to emit plain JSON lists)
+COMPACT_ARRAYS = True
+# float32 keeps ~7 significant digits: used when the rounded values fit in them
+F4_EXACT_LIMIT = 2 ** 24
+# Trace attributes that may carry numeric arrays
+_ARRAY_ATTRS = ("x", "y", "z", "values", "marker.size", "customdata")
+
+
+# =============================================================================
+# Shared pieces
+# =============================================================================
+
+@lru_cache(maxsize=None)
+def template(name=None):
+    """Return a Plotly template as a plain dict (resolved once per name)."""
+    return pio.templates[name or pio.templates.default].to_plotly_json()
+
+
+@lru_cache(maxsize=None)
+def colorscale(name):
+    """Return a named colorscale as the [[pos, color], ...] list px would emit."""
+    return get_colorscale(name)
+
+
+def merge(base: dict, overrides: dict) -> dict:
+    """Recursively merge ``overrides`` into ``base`` (in place) and return it."""
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+
+def vline(x, color="red", dash="dot", width=1):
+    """Vertical reference line shape (same dict fig.add_vline produces)."""
+    return dict(type="line", x0=x, x1=x, xref="x", y0=0, y1=1, yref="y domain",
+                line=dict(color=color, dash=dash, width=width))
+
+
+def scatter_type(n_rows, render_mode=BUBBLE_RENDER_MODE):
+    """Return "scattergl" or "scatter" for the requested mode and row count."""
+    if render_mode == "webgl" or (render_mode == "auto" and n_rows > WEBGL_ROW_THRESHOLD):
+        return "scattergl"
+    return "scatter"
+
+
+def patch_data(fig, attrs=None):
+    """Return a dash.Patch that only replaces the traces of ``fig``.
+
+    Used by year-driven callbacks: layout, geo settings, colorbars and
+    annotations stay on the client and only the data arrays travel. Works on
+    builder dicts and on figures served from the response store alike.
+
+    With ``attrs`` (e.g. ("z",)) only those attributes of each trace are
+    replaced; meant for traces whose other arrays do not change between
+    years, such as choropleths built on a fixed location list.
+    """
+    patch = Patch()
+    if attrs is None:
+        patch["data"] = fig["data"]
+        return patch
+    for i, trace in enumerate(fig["data"]):
+        for attr in attrs:
+            if attr in trace:
+                patch["data"][i][attr] = trace[attr]
+    return patch
+
+
+def patch_or_full(fig, key, held_key, year_tick, attrs=None):
+    """(figure output, guard store output) of a year-driven figure callback.
+
+    A Patch only swaps arrays of the figure the client already holds, so it
+    is sent only for a year tick when the graph's guard store (a dcc.Store
+    read as a State) holds ``key``: the view / metric the trace layout of
+    ``fig`` depends on. Otherwise (first render, view switch, a full render
+    that was dropped or superseded, a hidden graph that was skipped) the full
+    figure goes out and the store takes its key. Empty figures get no key, so
+    the next tick sends a full figure again.
+    """
+    if year_tick and key is not None and held_key == key:
+        return patch_data(fig, attrs), no_update
+    return fig, (key if fig["data"] else None)
+
+
+def typed_array(values, decimals=None):
+    """Encode a numeric array as a plotly.js typed array spec.
+
+    Values are rounded to ``decimals`` first (display precision), then stored
+    with the narrowest exact dtype: int8/16/32 for whole numbers, float32
+    when the rounded values fit in its mantissa, float64 otherwise.
+    Non-numeric input is returned unchanged.
+    """
+    arr = np.asarray(values)
+    if arr.dtype.kind not in "iuf" or arr.size == 0:
+        return values
+    if arr.dtype.kind == "f" and decimals is not None:
+        arr = np.round(arr, decimals)
+
+    finite = arr[np.isfinite(arr)] if arr.dtype.kind == "f" else arr
+    peak = float(np.abs(finite).max()) if finite.size else 0.0
+    whole = finite.size == arr.size and (arr.dtype.kind in "iu" or bool(np.all(finite == np.round(finite))))
+    if whole and peak < 2 ** 31:
+        dtype = "i1" if peak < 2 ** 7 else "i2" if peak < 2 ** 15 else "i4"
+    elif decimals is not None and peak * 10 ** decimals < F4_EXACT_LIMIT:
+        dtype = "f4"
+    else:
+        dtype = "f8"
+
+    spec = {"dtype": dtype, "bdata": base64.b64encode(arr.astype("<" + dtype).tobytes()).decode("ascii")}
+    if arr.ndim > 1:
+        spec["shape"] = ",".join(str(n) for n in arr.shape)
+    return spec
+
+
+def decode(values):
+    """Inverse of typed_array (plain lists and arrays pass through as ndarrays)."""
+    if isinstance(values, dict) and "bdata" in values:
+        arr = np.frombuffer(base64.b64decode(values["bdata"]), dtype="<" + values["dtype"])
+        if "shape" in values:
+            arr = arr.reshape([int(n) for n in str(values["shape"]).split(",")])
+        return arr
+    return np.asarray(values)
+
+
+def compact(data, precision=None):
+    """Encode the numeric arrays of every trace in place.
+
+    Args:
+        data: List of trace dicts.
+        precision: {attr path: decimals}, e.g. {"z": 2, "marker.size": 0}.
+    """
+    if not COMPACT_ARRAYS:
+        return data
+    precision = precision or {}
+    for trace in data:
+        for path in _ARRAY_ATTRS:
+            *parents, leaf = path.split(".")
+            owner = trace
+            for key in parents:
+                owner = owner.get(key) if isinstance(owner, dict) else None
+            if isinstance(owner, dict) and isinstance(owner.get(leaf), np.ndarray):
+                owner[leaf] = typed_array(owner[leaf], precision.get(path))
+    return data
+
+
+def _figure(data, template_name, layout, precision=None):
+    fig = {"data": compact(data, precision),
+           "layout": {"template": template(template_name), "legend": {"tracegroupgap": 0}}}
+    merge(fig["layout"], layout)
+    return fig
+
+
+# =============================================================================
+# Builders
+# =============================================================================
+
+def choropleth(locations, z, hovertext, colorscale_name="Viridis", colorbar=None,
+               customdata=None, hovertemplate=None, template_name=None, precision=None, **layout):
+    """Country choropleth coloured through a shared coloraxis.
+
+    Args:
+        locations: ISO-3 codes.
+        z: Colour values (same order as ``locations``).
+        hovertext: Display names shown in bold on hover.
+        colorscale_name: Named continuous colour scale.
+        colorbar: Extra colorbar settings (title, thickness, len...).
+        customdata: Optional per-point values referenced by ``hovertemplate``.
+        hovertemplate: Hover template; defaults to name + ISO + value.
+        template_name: Plotly template (defaults to the global default).
+        precision: {attr: decimals} display precision, e.g. {"z": 2}.
+        **layout: Layout overrides (height, margin, geo, annotations...).
+    """
+    trace = {
+        "type": "choropleth",
+        "locations": locations,
+        "z": np.asarray(z),
+        "hovertext": hovertext,
+        "coloraxis": "coloraxis",
+        "geo": "geo",
+        "name": "",
+        "hovertemplate": hovertemplate or "<b>%{hovertext}</b><br><br>ISOcode=%{location}<br>Value=%{z}<extra></extra>",
+    }
+    if customdata is not None:
+        trace["customdata"] = np.asarray(customdata)
+
+    base = {
+        "geo": {"domain": {"x": [0.0, 1.0], "y": [0.0, 1.0]}, "center": {}},
+        "uirevision": "geo",  # keeps zoom/pan when z or the resolution is patched
+        "coloraxis": {"colorscale": colorscale(colorscale_name), "colorbar": dict(colorbar or {})},
+    }
+    return _figure([trace], template_name, merge(base, layout), precision)
+
+
+def treemap_hierarchy(leaf_labels, leaf_groups, leaf_values, root="World"):
+    """Build ids/labels/parents/values for a root -> group -> leaf treemap.
+
+    Group totals are computed with one bincount instead of px's per-level groupby.
+    Returns a dict of arrays plus the per-node group name (root gets "").
+    """
+    leaf_labels = np.asarray(leaf_labels, dtype=object)
+    leaf_groups = np.asarray(leaf_groups, dtype=object)
+    leaf_values = np.asarray(leaf_values, dtype=float)
+
+    groups, codes = np.unique(leaf_groups, return_inverse=True)
+    group_values = np.bincount(codes, weights=leaf_values, minlength=len(groups))
+    group_ids = np.array([f"{root}/{g}" for g in groups], dtype=object)
+
+    leaf_ids = group_ids[codes] + "/" + leaf_labels
+    return {
+        "ids": np.concatenate([[root], group_ids, leaf_ids]),
+        "labels": np.concatenate([[root], groups, leaf_labels]),
+        "parents": np.concatenate([[""], np.full(len(groups), root, dtype=object), group_ids[codes]]),
+        "values": np.concatenate([[leaf_values.sum()], group_values, leaf_values]),
+        "group": np.concatenate([[""], groups, leaf_groups]),
+    }
+
+
+def treemap(ids, labels, parents, values, colors=None, hovertemplate=None,
+            template_name=None, precision=None, **layout):
+    """Treemap with branchvalues="total" (parents carry the sum of children)."""
+    trace = {
+        "type": "treemap",
+        "ids": ids,
+        "labels": labels,
+        "parents": parents,
+        "values": np.asarray(values),
+        "branchvalues": "total",
+        "domain": {"x": [0.0, 1.0], "y": [0.0, 1.0]},
+        "name": "",
+        "hovertemplate": hovertemplate or "labels=%{label}<br>Value=%{value}<br>parent=%{parent}<br>id=%{id}<extra></extra>",
+    }
+    if colors is not None:
+        trace["marker"] = {"colors": colors}
+    return _figure([trace], template_name, layout, precision)
+
+
+def group_colors(groups, color_map=None, template_name=None):
+    """Map group names to colours (explicit map first, template colorway otherwise)."""
+    colorway = template(template_name)["layout"].get("colorway", [])
+    names = [g for g in dict.fromkeys(groups) if g]
+    palette = {g: colorway[i % len(colorway)] for i, g in enumerate(names)} if colorway else {}
+    palette.update(color_map or {})
+    return [palette.get(g) for g in groups]
+
+
+def bubble_arrays(x, y, size, groups, hovertext, customdata, group_order=None,
+                  size_max=BUBBLE_SIZE_MAX):
+    """Split bubble arrays into per-group trace attributes.
+
+    With an explicit ``group_order`` every group gets a trace (empty when it
+    has no points), so trace indices stay stable across years and the
+    result can be sent as a patch. Returns a list of (group, attrs) pairs.
+    """
+    x, y, size = (np.asarray(a, dtype=float) for a in (x, y, size))
+    groups = np.asarray(groups, dtype=object)
+    hovertext = np.asarray(hovertext, dtype=object)
+    customdata = np.asarray(customdata, dtype=object)
+
+    sizeref = 2.0 * np.nanmax(size) / (size_max ** 2) if len(size) else 1.0
+    keep_empty = group_order is not None
+    order = group_order if keep_empty else list(dict.fromkeys(groups))
+
+    out = []
+    for group in order:
+        mask = groups == group
+        if not keep_empty and not mask.any():
+            continue
+        out.append((group, {
+            "x": x[mask],
+            "y": y[mask],
+            "marker.size": size[mask],
+            "marker.sizeref": sizeref,
+            "hovertext": hovertext[mask],
+            "customdata": customdata[mask].reshape(-1, 1),
+        }))
+    return out
+
+
+def bubble(x, y, size, groups, hovertext, customdata, hovertemplate, color_map=None,
+           group_order=None, size_max=BUBBLE_SIZE_MAX, render_mode=BUBBLE_RENDER_MODE,
+           template_name=None, precision=None, **layout):
+    """Area-scaled bubble chart with one trace per group (e.g. region).
+
+    Args:
+        x, y, size: Numeric arrays for axes and bubble area.
+        groups: Group label per point (one trace and legend entry per group).
+        hovertext: Display name per point.
+        customdata: Per-point payload returned in clickData (ISO codes).
+        hovertemplate: Hover template shared by every group trace.
+        color_map: Optional group -> colour mapping.
+        group_order: Fixed trace order (empty groups kept); defaults to order
+            of first appearance.
+        size_max: Pixel diameter of the largest bubble.
+        render_mode: "auto", "svg" or "webgl".
+        precision: {attr: decimals}, e.g. {"x": 0, "y": 3, "marker.size": 0}.
+    """
+    trace_type = scatter_type(len(x), render_mode)
+
+    data = []
+    for group, attrs in bubble_arrays(x, y, size, groups, hovertext, customdata, group_order, size_max):
+        marker = {"size": attrs["marker.size"], "sizemode": "area", "sizeref": attrs["marker.sizeref"]}
+        if color_map and group in color_map:
+            marker["color"] = color_map[group]
+        data.append({
+            "type": trace_type,
+            "mode": "markers",
+            "name": group,
+            "legendgroup": group,
+            "showlegend": True,
+            "x": attrs["x"],
+            "y": attrs["y"],
+            "marker": marker,
+            "hovertext": attrs["hovertext"],
+            "customdata": attrs["customdata"],
+            "hovertemplate": hovertemplate,
+        })
+    return _figure(data, template_name, layout, precision)
+
+
+def line(series, hovertemplate=None, markers=False, template_name=None, precision=None, **layout):
+    """Multi-series line chart.
+
+    Args:
+        series: Iterable of dicts with name, x, y and optional color / dash / width.
+        hovertemplate: Hover template shared by every series.
+        markers: Draw markers on top of the lines.
+        precision: {attr: decimals}, e.g. {"y": 2}.
+    """
+    data = []
+    for s in series:
+        trace = {
+            "type": "scatter",
+            "mode": "lines+markers" if markers else "lines",
+            "name": s["name"],
+            "legendgroup": s["name"],
+            "showlegend": s.get("showlegend", True),
+            "x": np.asarray(s["x"]),
+            "y": np.asarray(s["y"]),
+            "line": {k: s[k] for k in ("color", "dash", "width") if s.get(k) is not None},
+        }
+        if hovertemplate:
+            trace["hovertemplate"] = hovertemplate
+        data.append(trace)
+    return _figure(data, template_name, layout, precision)
@@ -0,0 +1,37 @@
+"""
+Gunicorn configuration (read automatically by ``gunicorn`` from this folder).
+
+    gunicorn                                   # threaded WSGI workers (default)
+    SPESHEET_SERVER=asgi gunicorn              # uvicorn workers on asgi.py
+    SPESHEET_SERVER=sync gunicorn              # one request per worker at a time
+
+gthread: each worker runs SPESHEET_THREADS request threads, so cheap slider
+lookups are answered while another thread renders a slow modal.
+asgi: each worker is an event loop handing requests to a thread pool
+(asgi.py, needs ``pip install uvicorn a2wsgi``).
+
+The app is loaded once before forking (preload_app): the Excel workbook is
+parsed a single time and the workers share it copy-on-write.
+"""
+import multiprocessing
+import os
+
+SERVER = os.environ.get("SPESHEET_SERVER", "gthread")
+
+bind = os.environ.get("BIND", f"0.0.0.0:{os.environ.get('PORT', '8050')}")
+workers = int(os.environ.get("WEB_CONCURRENCY", min(4, multiprocessing.cpu_count())))
+preload_app = True
+# Cold modal renders can take several seconds on a busy worker
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+keepalive = 5
+
+if SERVER == "asgi":
+    wsgi_app = "asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+elif SERVER == "sync":
+    wsgi_app = "main:server"
+    worker_class = "sync"
+else:
+    wsgi_app = "main:server"
+    worker_class = "gthread"
+    threads = int(os.environ.get("SPESHEET_THREADS", "8"))
@@ -0,0 +1,177 @@
+"""
+Ingest validation and stage timing for prepare_data.
+
+Every source goes through ``check`` once it is parsed: schema, row count,
+duplicate keys, NaN ratio, ISO coverage and year range, each computed in a
+single vectorized pass over the frame. Load steps run inside ``stage`` so
+their wall time is recorded, and ``finish`` (end of prepare_data) returns the
+report. The first failed check raises DataValidationError: a malformed file
+stops the import, so gunicorn (preload_app), ``response_store.py build`` and
+the static export fail at start-up instead of serving empty figures.
+
+    python ingest.py                    # JSON report on stdout, exit code 1 on failures
+    python ingest.py --out report.json
+
+SPESHEET_INGEST_REPORT=path also writes the report on every import;
+SPESHEET_INGEST_STRICT=0 only prints the failures (the app then starts with
+whatever could be loaded). A source missing its columns or rows always stops
+the import.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+
+STRICT = os.environ.get("SPESHEET_INGEST_STRICT", "1") != "0"
+REPORT_PATH = os.environ.get("SPESHEET_INGEST_REPORT", "")
+
+# Years outside these bounds are parsing errors (a header or a code read as a year)
+YEAR_BOUNDS = (1900, 2100)
+
+_stages = {}
+_sources = {}
+
+
+class DataValidationError(ValueError):
+    """A source file failed its ingest checks."""
+
+
+@contextmanager
+def stage(name):
+    """Record the wall time of the block under ``name`` (seconds, accumulated)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _stages[name] = _stages.get(name, 0.0) + time.perf_counter() - t0
+
+
+def _result(ok, value, limit=None):
+    result = {"ok": bool(ok), "value": value}
+    if limit is not None:
+        result["limit"] = limit
+    return result
+
+
+def check(name, df, columns, keys=(), value_col=None, max_nan_ratio=None, isos=None,
+          min_coverage=None, years=None, min_rows=1):
+    """Validate one source frame and add it to the report.
+
+    Args:
+        name: Report entry (e.g. "co2.totals").
+        df: The parsed frame.
+        columns: Columns that must be present.
+        keys: Columns that identify a row (no duplicates allowed).
+        value_col: Numeric value column (dtype and NaN ratio checks).
+        max_nan_ratio: Largest accepted share of NaN in ``value_col`` and ``keys``.
+        isos: Reference ISO codes; the share found in ``df["ISOcode"]`` must be
+            at least ``min_coverage``. Codes outside the reference are reported.
+        years: Years that must all have rows (``df["Year"]``); every year must
+            also lie within YEAR_BOUNDS.
+        min_rows: Fewest rows accepted.
+
+    Returns the entry's checks ({check: {"ok", "value", "limit"}}).
+    """
+    checks = {}
+    missing = [c for c in columns if c not in df.columns]
+    checks["schema"] = _result(not missing, missing)
+    checks["rows"] = _result(len(df) >= min_rows, int(len(df)), min_rows)
+
+    if not missing:
+        if value_col is not None:
+            kind = df[value_col].dtype.kind
+            checks["numeric"] = _result(kind in "iuf", str(df[value_col].dtype))
+        if keys:
+            duplicates = int(df.duplicated(list(keys)).sum())
+            checks["duplicate_keys"] = _result(duplicates == 0, duplicates, 0)
+        if max_nan_ratio is not None and len(df):
+            cols = [c for c in (*keys, value_col) if c is not None]
+            ratio = float(df[cols].isna().to_numpy().mean())
+            checks["nan_ratio"] = _result(ratio <= max_nan_ratio, round(ratio, 4), max_nan_ratio)
+        if isos is not None and "ISOcode" in df.columns:
+            found = np.isin(np.asarray(sorted(isos), dtype=object), df["ISOcode"].unique())
+            coverage = float(found.mean()) if len(found) else 0.0
+            checks["iso_coverage"] = _result(coverage >= (min_coverage or 0.0), round(coverage, 4), min_coverage)
+            unknown = int((~df["ISOcode"].drop_duplicates().isin(isos)).sum())
+            checks["unknown_isos"] = _result(True, unknown)
+        if years is not None and "Year" in df.columns:
+            present = df["Year"].to_numpy(dtype=float)
+            present = present[~np.isnan(present)]
+            out_of_bounds = int(((present < YEAR_BOUNDS[0]) | (present > YEAR_BOUNDS[1])).sum())
+            gaps = np.setdiff1d(np.asarray(years), present.astype(int)).tolist()
+            checks["year_bounds"] = _result(out_of_bounds == 0, out_of_bounds, list(YEAR_BOUNDS))
+            checks["year_coverage"] = _result(not gaps, gaps, [int(min(years)), int(max(years))])
+            if len(present):
+                checks["year_range"] = _result(True, [int(present.min()), int(present.max())])
+
+    _sources[name] = checks
+    # Without its columns or rows a source cannot be parsed further: stop even when not strict
+    fatal = not (checks["schema"]["ok"] and checks["rows"]["ok"])
+    if fatal or STRICT and not all(result["ok"] for result in checks.values()):
+        finish(strict=True)  # writes the report, then raises
+    return checks
+
+
+def failures():
+    """["source.check", ...] of every failed check so far."""
+    return [f"{name}.{check_name}" for name, checks in _sources.items()
+            for check_name, result in checks.items() if not result["ok"]]
+
+
+def report():
+    """Machine-readable report: stage timings, per-source checks and the failures."""
+    return {
+        "ok": not failures(),
+        "failures": failures(),
+        "stages": {name: round(seconds, 4) for name, seconds in _stages.items()},
+        "sources": _sources,
+    }
+
+
+def finish(strict=None):
+    """End of ingest: write the report (SPESHEET_INGEST_REPORT) and fail fast on errors.
+
+    ``strict`` defaults to STRICT.
+    """
+    result = report()
+    if REPORT_PATH:
+        with open(REPORT_PATH, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if result["failures"]:
+        message = "Data validation failed: " + ", ".join(result["failures"])
+        if STRICT if strict is None else strict:
+            raise DataValidationError(message)
+        print(message, file=sys.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", help="write the report to this file instead of stdout")
+    args = parser.parse_args()
+
+    # Collect every failure instead of stopping at the first one (this file
+    # runs as __main__: prepare_data reports to the imported module)
+    import ingest
+    ingest.STRICT = False
+    try:
+        import prepare_data  # noqa: F401
+    except ingest.DataValidationError:
+        pass  # a source could not be parsed at all; its failure is in the report
+    result = ingest.report()
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    sys.exit(0 if result["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
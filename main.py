@@ -2,9 +2,17 @@ import dash_bootstrap_components as dbc
 from dash import Dash, html, dcc, Input, Output, callback, no_update
 from prepare_data import min_year, max_year
 import charts 
+from tabs import tab4
+import metrics
+import dispatch
+from components import geo
 
-app = Dash(__name__, external_stylesheets=[dbc.themes.FLATLY], suppress_callback_exceptions=True)
+# compress=True: gzip/brotli responses through flask-compress
+app = Dash(__name__, external_stylesheets=[dbc.themes.FLATLY], suppress_callback_exceptions=True, compress=True)
 server = app.server
+metrics.init_app(server)
+geo.init_app(server)
+dispatch.init_app(server)
 
 app.layout = dbc.Container([
 
@@ -22,6 +30,7 @@ app.layout = dbc.Container([
                 dbc.Tab(label='Emissions Map', tab_id='tab-1'),
                 dbc.Tab(label='Nation Prosperity', tab_id='tab-2'),
                 dbc.Tab(label='Correlation Emission Prosperity', tab_id='tab-3'),
+                dbc.Tab(label='Rankings', tab_id='tab-4'),
             ], id="tabs", active_tab='tab-1', className="mb-2 nav-justified"),
         ], width=12)
     ]),
@@ -96,7 +105,9 @@ A deeper analysis requires a distinction between green growth and dirty growth.
 To provide a deeper analysis, we differentiate between high-cost progress and sustainable progress. High-cost progress is when a country successfully improves life expectancy but at the expense of increasing pollution. While sustainable progress is when a country improves both life quality and emission reductions simultaneously.
 
 In the scatter plot, a clear distinction is visible between North America and Europe versus developing regions. People in more developed nations are seeing gains in health alongside increased environmental awareness. In contrast, many developing countries are achieving health improvements by polluting more. However, some African nations are leading the way in life expectancy growth within the sustainable progress zone. For instance, countries like Angola, Eritrea, and Liberia have managed to decrease pollution while increasing life expectancy over specific 20-year periods within the last half-century."""
-        }
+        },
+
+        'tab-4': tab4.ranking_insight(),
     }
 
     tab2_view_mode = tab2_view_mode or 'gdp'
@@ -0,0 +1,90 @@
+"""
+Server-side payload metrics for the Dash callbacks.
+
+Every ``/_dash-update-component`` response is measured per callback (keyed
+by its output spec): JSON bytes produced by the callback and bytes actually
+sent after gzip/brotli compression.
+
+    metrics.init_app(server)        # done in main.py
+    metrics.payload_report()        # {output: {calls, raw_bytes, sent_bytes, max_raw}}
+    print(metrics.format_payload_report())
+
+With SPESHEET_PAYLOAD_REPORT=1 the report is also served as JSON at
+/_spesheet/payloads.
+"""
+import os
+import threading
+from collections import defaultdict
+
+from flask import g, jsonify, request
+
+
+UPDATE_PATH = "_dash-update-component"
+REPORT_ROUTE = "/_spesheet/payloads"
+
+_lock = threading.Lock()
+_payloads = defaultdict(lambda: {"calls": 0, "raw_bytes": 0, "sent_bytes": 0, "max_raw": 0})
+
+
+def _output_key():
+    body = request.get_json(silent=True) or {}
+    return body.get("output", "?")
+
+
+def _measure_raw(response):
+    """Runs before compression: size of the JSON the callback produced."""
+    if request.path.endswith(UPDATE_PATH) and not response.direct_passthrough:
+        g.spesheet_raw_bytes = len(response.get_data())
+    return response
+
+
+def _measure_sent(response):
+    """Runs after compression: size of the body that goes on the wire."""
+    raw = g.pop("spesheet_raw_bytes", None)
+    if raw is None:
+        return response
+    sent = len(response.get_data())
+    with _lock:
+        entry = _payloads[_output_key()]
+        entry["calls"] += 1
+        entry["raw_bytes"] += raw
+        entry["sent_bytes"] += sent
+        entry["max_raw"] = max(entry["max_raw"], raw)
+    return response
+
+
+def init_app(server):
+    """Register the payload hooks on the Flask server (after Dash enabled compression)."""
+    # Flask runs after_request hooks in reverse registration order: appending
+    # runs first (before compression), inserting at the front runs last.
+    hooks = server.after_request_funcs.setdefault(None, [])
+    hooks.append(_measure_raw)
+    hooks.insert(0, _measure_sent)
+
+    if os.environ.get("SPESHEET_PAYLOAD_REPORT"):
+        server.add_url_rule(REPORT_ROUTE, "spesheet_payloads", lambda: jsonify(payload_report()))
+
+
+def payload_report():
+    """Per-callback payload totals since start (or the last reset)."""
+    with _lock:
+        return {key: dict(entry) for key, entry in _payloads.items()}
+
+
+def reset_payloads():
+    with _lock:
+        _payloads.clear()
+
+
+def format_payload_report(report=None):
+    """Plain-text table of payload_report(), largest average payload first."""
+    report = payload_report() if report is None else report
+    rows = sorted(report.items(), key=lambda kv: kv[1]["raw_bytes"] / max(kv[1]["calls"], 1), reverse=True)
+    lines = [f"{'callback output':<60}{'calls':>7}{'avg KB':>9}{'max KB':>9}{'sent KB':>9}{'ratio':>7}"]
+    for key, e in rows:
+        calls = max(e["calls"], 1)
+        ratio = e["sent_bytes"] / e["raw_bytes"] if e["raw_bytes"] else 1.0
+        label = key if len(key) <= 58 else key[:55] + "..."
+        lines.append(f"{label:<60}{e['calls']:>7}{e['raw_bytes'] / calls / 1024:>9.1f}"
+                     f"{e['max_raw'] / 1024:>9.1f}{e['sent_bytes'] / calls / 1024:>9.1f}{ratio:>7.2f}")
+    return "\n".join(lines)
@@ -1,7 +1,10 @@
+import os
+
 import pandas as pd
 import numpy as np
-import plotly.express as px
-from dash import Dash, html, dcc, Input, Output, dash_table
+
+from caching import memoize
+import ingest
 
 # data
 file_path = 'Data/CO2.xlsx'
@@ -37,6 +40,21 @@ ISO_MAP = {
     'Sudan and South Sudan': 'SDN'
 }
 
+# The same merges by ISO code: absorbed territory -> ISO of its group. Sources
+# are matched on codes since their names differ (the life expectancy CSV uses
+# Spanish names)
+MEMBER_ISO_TO_GROUP = {
+    'LIE': 'CHE',
+    'AND': 'ESP',
+    'SMR': 'ITA',
+    'VAT': 'ITA',
+    'MCO': 'FRA',
+    'SRB': 'SCG',
+    'MNE': 'SCG',
+    'PSE': 'ISR',
+    'SSD': 'SDN'
+}
+
 VALID_REGIONS = {
     "East Asia & Pacific",
     "Europe & Central Asia",
@@ -47,7 +65,8 @@ VALID_REGIONS = {
     "Sub-Saharan Africa",
 }
 
-xl = pd.ExcelFile(file_path)
+with ingest.stage("co2"):
+    xl = pd.ExcelFile(file_path)
 
 def load_metadata_and_regions(meta_p: str):
     """
@@ -55,31 +74,100 @@ def load_metadata_and_regions(meta_p: str):
     1. ISOs válidos (set)
     2. Diccionario ISO -> Región (para colorear gráficos)
     """
-    try:
-        meta = pd.read_csv(meta_p, dtype=str)
-        meta.columns = [c.strip() for c in meta.columns]
-        
-        meta["Country Code"] = meta["Country Code"].fillna("").str.strip()
-        meta["Region"] = meta["Region"].fillna("").str.strip()
-        
-        # Filtramos regiones oficiales
-        real = meta[meta["Region"].isin(VALID_REGIONS)].copy()
-        
-        valid_isos = set(real["Country Code"])
-        iso_region_map = dict(zip(real["Country Code"], real["Region"]))
-        
-        # --- AÑADIMOS MANUALMENTE LOS GRUPOS ESPECIALES ---
-        for group_name, iso in ISO_MAP.items():
-            valid_isos.add(iso)
-            if iso not in iso_region_map:
-                iso_region_map[iso] = "Europe & Central Asia" # Default si falta
-        
-        return valid_isos, iso_region_map
-    except Exception as e:
-        print(f"Error loading metadata: {e}")
-        return set(), {}
-
-def safe_load_and_melt(keyword, id_vars):
+    meta = pd.read_csv(meta_p, dtype=str)
+    meta.columns = [c.strip() for c in meta.columns]
+    ingest.check("metadata", meta, columns=["Country Code", "Region"], keys=["Country Code"])
+
+    meta["Country Code"] = meta["Country Code"].fillna("").str.strip()
+    meta["Region"] = meta["Region"].fillna("").str.strip()
+
+    # Filtramos regiones oficiales
+    real = meta[meta["Region"].isin(VALID_REGIONS)].copy()
+    ingest.check("metadata.regions", real, columns=["Country Code", "Region"], min_rows=100)
+
+    valid_isos = set(real["Country Code"])
+    iso_region_map = dict(zip(real["Country Code"], real["Region"]))
+
+    # --- AÑADIMOS MANUALMENTE LOS GRUPOS ESPECIALES ---
+    for group_name, iso in ISO_MAP.items():
+        valid_isos.add(iso)
+        if iso not in iso_region_map:
+            iso_region_map[iso] = "Europe & Central Asia" # Default si falta
+
+    return valid_isos, iso_region_map
+
+# =============================================================================
+# Entity consolidation
+# =============================================================================
+# The CO2 sheets report a few territories together with a neighbour (Spain and
+# Andorra, France and Monaco...). Every dataset is consolidated onto those
+# groups the same way: the rows of a group's members (MEMBER_ISO_TO_GROUP) and
+# of the group itself take the group's name and ISO code, then the rows sharing
+# (ISOcode, extra keys, Year) are reduced with one np.bincount over their cell
+# codes. Extensive metrics (totals) are summed; intensive ones (per capita
+# values, life expectancy) take the members' population-weighted mean.
+
+# Group ISO -> group name
+GROUP_NAMES = {iso: name for name, iso in ISO_MAP.items()}
+
+
+def consolidate_entities(df, value_col, keys=(), population=None, sort=True):
+    """Merge the MEMBER_ISO_TO_GROUP members of ``df`` into their group rows.
+
+    Only the rows of a group that has members in ``df`` are reduced; every
+    other row passes through untouched.
+
+    Args:
+        df: Long frame with Country, ISOcode, ``keys``, Year and ``value_col``
+            (no missing values, one row per country, keys and year).
+        value_col: Column reduced per group.
+        keys: Extra identifying columns (e.g. ("Sector",)).
+        population: Frame of ISOcode, Year, Population (one row per pair,
+            pre-merge ISO codes). When given the metric is intensive and the
+            members are averaged with population weights (simple mean where
+            no member has one); otherwise they are summed.
+        sort: Order the result like a groupby on (Country, ISOcode, *keys,
+            Year); False keeps the other rows in place and appends the groups.
+
+    Returns:
+        A new frame with one row per (Country, ISOcode, *keys, Year).
+    """
+    columns = ["Country", "ISOcode", *keys, "Year"]
+    df = df[columns + [value_col]]
+    group_iso = df["ISOcode"].map(MEMBER_ISO_TO_GROUP)
+    is_member = group_iso.notna()
+    if not is_member.any():
+        return df.sort_values(columns, kind="stable", ignore_index=True) if sort else df.reset_index(drop=True)
+
+    # Rows of the groups with members: the members plus the group's own row
+    # (Spain for Spain and Andorra)
+    merged = (is_member | df["ISOcode"].isin(set(group_iso[is_member]))).to_numpy()
+    rows = df[merged]
+    iso = group_iso[merged].fillna(rows["ISOcode"])
+    codes, cells = pd.MultiIndex.from_arrays([iso, *(rows[key] for key in keys), rows["Year"]]).factorize()
+    values = rows[value_col].to_numpy(dtype=float)
+    size = len(cells)
+
+    reduced = np.bincount(codes, weights=values, minlength=size)
+    if population is not None:
+        weights = (population.set_index(["ISOcode", "Year"])["Population"]
+                   .reindex(pd.MultiIndex.from_arrays([rows["ISOcode"], rows["Year"]])).to_numpy(dtype=float))
+        weights = np.where(np.isfinite(weights) & (weights > 0), weights, 0.0)
+        weight_sum = np.bincount(codes, weights=weights, minlength=size)
+        weighted = np.bincount(codes, weights=values * weights, minlength=size)
+        count = np.bincount(codes, minlength=size)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            reduced = np.where(weight_sum > 0, weighted / weight_sum, reduced / count)
+
+    out = cells.to_frame(index=False, name=["ISOcode", *keys, "Year"])
+    out.insert(0, "Country", out["ISOcode"].map(GROUP_NAMES))
+    out[value_col] = reduced
+    out = pd.concat([df[~merged], out], ignore_index=True)
+    return out.sort_values(columns, kind="stable", ignore_index=True) if sort else out
+
+
+def safe_load_and_melt(keyword, id_vars, population=None):
+    """Long frame of the CO2 sheet matching ``keyword``, consolidated (see consolidate_entities)."""
     sheet_name = next((s for s in xl.sheet_names if keyword.lower() in s.lower()), None)
     if sheet_name:
         df = xl.parse(sheet_name)
@@ -87,7 +175,13 @@ def safe_load_and_melt(keyword, id_vars):
         df_melted = df.melt(id_vars=id_vars, var_name='Year', value_name='Value')
         df_melted['Year'] = pd.to_numeric(df_melted['Year'], errors='coerce')
         df_melted['Value'] = pd.to_numeric(df_melted['Value'], errors='coerce')
-        return df_melted.dropna(subset=['Year', 'Value'])
+        ingest.check(f"co2.{keyword}.raw", df_melted, columns=id_vars + ['Year', 'Value'],
+                     keys=[c for c in id_vars if c != 'Country'] + ['Year'], value_col='Value', max_nan_ratio=0.05)
+        df_melted = df_melted.dropna(subset=['Year', 'Value'])
+        # The sheets already report the groups: keep their row order
+        keys = [c for c in id_vars if c not in ('Country', 'ISOcode')]
+        return consolidate_entities(df_melted, 'Value', keys, population, sort=False)
+    ingest.check(f"co2.{keyword}.raw", pd.DataFrame(columns=id_vars + ['Year', 'Value']), columns=id_vars)
     return pd.DataFrame(columns=id_vars + ['Year', 'Value'])
 
 def get_correlation_data():
@@ -114,9 +208,9 @@ def get_sector_summary(year):
     dff = df_sectors[df_sectors['Year'] == year]
     return dff.groupby('Sector')['Value'].sum().reset_index()
 
-def load_gdp(csv_path: str):
+def read_world_bank(csv_path: str):
     """
-    Carga el CSV del World Bank (NY.GDP.PCAP.KD) y lo convierte a formato largo:
+    Lee un CSV del World Bank en formato largo, sin agrupar:
     Country, ISOcode, Year, Value
     """
     df_wide = pd.read_csv(csv_path, skiprows=4)
@@ -137,19 +231,34 @@ def load_gdp(csv_path: str):
 
     df_long["Year"] = pd.to_numeric(df_long["Year"], errors="coerce")
     df_long["Value"] = pd.to_numeric(df_long["Value"], errors="coerce")
-    df_long = df_long.dropna(subset=["Year", "Value"])
+    # Early years are missing for many countries
+    ingest.check(f"world_bank.{os.path.basename(csv_path)}.raw", df_long, columns=["Country", "ISOcode", "Year", "Value"],
+                 keys=["ISOcode", "Year"], value_col="Value", max_nan_ratio=0.4)
+    return df_long.dropna(subset=["Year", "Value"])
 
-    # 1. Renombrar países individuales al nombre compuesto (Spain -> Spain and Andorra)
-    df_long["Country"] = df_long["Country"].replace(COUNTRY_MERGE_MAP)
 
-    # 2. Actualizar ISOs de esos grupos
-    for group_name, iso in ISO_MAP.items():
-        df_long.loc[df_long["Country"] == group_name, "ISOcode"] = iso
+def world_bank_population():
+    """Population of every World Bank entity (total GDP / GDP per capita) per ISOcode and Year.
+
+    Used as the weights when merging intensive metrics (see consolidate_entities).
+    """
+    pop = pd.merge(read_world_bank(gdp_total_path), read_world_bank(gdp_path),
+                   on=["ISOcode", "Year"], suffixes=("_total", "_capita"))
+    pop["Population"] = pop["Value_total"] / pop["Value_capita"].where(pop["Value_capita"] > 0)
+    return pop[["ISOcode", "Year", "Population"]].dropna()
+
 
-    # 3. SUMAR VALORES (Lo más importante: Spain + Andorra)
-    df_long = df_long.groupby(["Country", "ISOcode", "Year"], as_index=False)["Value"].sum()
+def load_gdp(csv_path: str, population=None):
+    """
+    Carga el CSV del World Bank (NY.GDP.PCAP.KD o total) en formato largo:
+    Country, ISOcode, Year, Value
 
-    # 4. Filtrar por rango de años y países reales
+    Los países agrupados (Spain + Andorra...) se suman para el PIB total y se
+    promedian ponderando por población (``population``) para el PIB per cápita.
+    """
+    df_long = consolidate_entities(read_world_bank(csv_path), "Value", population=population)
+
+    # Filtrar por rango de años y países reales
     if 'min_year' in globals():
         df_long = df_long[(df_long["Year"] >= min_year) & (df_long["Year"] <= max_year)]
     
@@ -159,13 +268,18 @@ def load_gdp(csv_path: str):
     return df_long
 
 ## Data structure initialization
-df_totals = safe_load_and_melt('totals', ['Country', 'ISOcode'])
-df_capita = safe_load_and_melt('capita', ['Country', 'ISOcode'])
-df_sectors = safe_load_and_melt('sector', ['Country', 'ISOcode', 'Sector'])
-REAL_COUNTRY_ISO3, ISO_TO_REGION = load_metadata_and_regions(meta_path)
+with ingest.stage("world_bank"):
+    WB_POPULATION = world_bank_population()
+with ingest.stage("co2"):
+    df_totals = safe_load_and_melt('totals', ['Country', 'ISOcode'])
+    df_capita = safe_load_and_melt('capita', ['Country', 'ISOcode'], population=WB_POPULATION)
+    df_sectors = safe_load_and_melt('sector', ['Country', 'ISOcode', 'Sector'])
+with ingest.stage("metadata"):
+    REAL_COUNTRY_ISO3, ISO_TO_REGION = load_metadata_and_regions(meta_path)
 
 min_year = int(df_totals['Year'].min())
 max_year = int(df_totals['Year'].max())
+YEARS = tuple(range(min_year, max_year + 1))
 
 # Enriquecemos los dataframes con la columna 'Continent' para facilitar los gráficos por región
 df_totals['Continent'] = df_totals['ISOcode'].map(ISO_TO_REGION)
@@ -177,138 +291,482 @@ df_totals = df_totals[df_totals['ISOcode'].isin(REAL_COUNTRY_ISO3)]
 df_capita = df_capita[df_capita['ISOcode'].isin(REAL_COUNTRY_ISO3)]
 df_sectors = df_sectors[df_sectors['ISOcode'].isin(REAL_COUNTRY_ISO3)]
 
-df_gdp_capita = load_gdp(gdp_path)
-df_gdp_total = load_gdp(gdp_total_path)
+with ingest.stage("world_bank"):
+    df_gdp_capita = load_gdp(gdp_path, population=WB_POPULATION)
+    df_gdp_total = load_gdp(gdp_total_path)
 df_correlation = get_correlation_data()
 df_cumulative = get_cumulative_data()
 
 # --- Life Expectancy Data ---
 def load_life_expectancy():
     """Carga y procesa el archivo LIFE_EXPECTANCY.csv"""
-    try:
-        # El CSV tiene un formato especial: cada línea completa está entre comillas
-        # y los valores internos usan comillas dobles escapadas
-        # Formato: "valor1,""valor2"",""valor3"",..."
-        
-        rows = []
-        with open('Data/LIFE_EXPECTANCY.csv', 'r', encoding='utf-8') as f:
-            for i, line in enumerate(f):
-                if i < 4:  # Saltar metadata
-                    continue
-                
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # Remover la comilla inicial y final de toda la línea
-                if line.startswith('"') and line.endswith('"'):
-                    line = line[1:-1]
-                
-                # Ahora parsear considerando que los valores están con ""
-                # Dividir por ,"" que es el separador entre campos
-                parts = []
-                current = ""
-                i = 0
-                while i < len(line):
-                    if i < len(line) - 2 and line[i:i+3] == ',""':
-                        # Fin de un campo, inicio de otro
-                        parts.append(current)
-                        current = ""
-                        i += 3
-                    elif i < len(line) - 1 and line[i:i+2] == '""':
-                        # Comillas dobles dentro de un valor - ignorar
-                        i += 2
-                    else:
-                        current += line[i]
-                        i += 1
-                
-                # Agregar el último campo
-                if current:
+    # El CSV tiene un formato especial: cada línea completa está entre comillas
+    # y los valores internos usan comillas dobles escapadas
+    # Formato: "valor1,""valor2"",""valor3"",..."
+    
+    rows = []
+    with open('Data/LIFE_EXPECTANCY.csv', 'r', encoding='utf-8') as f:
+        for i, line in enumerate(f):
+            if i < 4:  # Saltar metadata
+                continue
+            
+            line = line.strip()
+            if not line:
+                continue
+            
+            # Remover la comilla inicial y final de toda la línea
+            if line.startswith('"') and line.endswith('"'):
+                line = line[1:-1]
+            
+            # Ahora parsear considerando que los valores están con ""
+            # Dividir por ,"" que es el separador entre campos
+            parts = []
+            current = ""
+            i = 0
+            while i < len(line):
+                if i < len(line) - 2 and line[i:i+3] == ',""':
+                    # Fin de un campo, inicio de otro
                     parts.append(current)
-                
-                # Filtrar campos vacíos o con solo puntos y comas
-                parts = [p for p in parts if p and not p.startswith(';;;;')]
-                
-                if parts and len(parts) > 2:
-                    rows.append(parts)
-        
-        if len(rows) < 2:
-            raise ValueError(f"Solo {len(rows)} filas leídas")
-        
-        # Primera fila = headers
-        headers = rows[0]
-        data_rows = rows[1:]
-        
-        # Ajustar filas para que todas tengan el mismo número de columnas
-        max_cols = len(headers)
-        for row in data_rows:
-            while len(row) < max_cols:
-                row.append('')
-            if len(row) > max_cols:
-                row[:] = row[:max_cols]
-        
-        # Crear dataframe
-        df = pd.DataFrame(data_rows, columns=headers)
-        
-        # Renombrar primeras columnas
-        cols = df.columns.tolist()
-        df = df.rename(columns={cols[0]: 'Country', cols[1]: 'ISOcode'})
-        
-        # Buscar columnas de años
-        year_cols = [col for col in df.columns if col.isdigit() and len(col) == 4]
-        
-        if not year_cols:
-            raise ValueError("No se encontraron columnas de años")
-        
-        # Filtrar solo Country, ISOcode y años
-        df = df[['Country', 'ISOcode'] + year_cols]
-        
-        # Convertir a formato long
-        df_melted = df.melt(
-            id_vars=['Country', 'ISOcode'],
-            var_name='Year',
-            value_name='Life_Expectancy'
-        )
-        
-        # Convertir tipos
-        df_melted['Year'] = pd.to_numeric(df_melted['Year'], errors='coerce')
-        df_melted['Life_Expectancy'] = pd.to_numeric(df_melted['Life_Expectancy'], errors='coerce')
-        df_melted['ISOcode'] = df_melted['ISOcode'].str.strip()
-        
-        # Eliminar nulos
-        df_melted = df_melted.dropna(subset=['Year', 'Life_Expectancy'])
-        
-        # --- APLICAR MERGE DE PAÍSES (igual que GDP) ---
-        # 1. Renombrar países individuales al nombre compuesto
-        df_melted["Country"] = df_melted["Country"].replace(COUNTRY_MERGE_MAP)
-        
-        # 2. Actualizar ISOs de esos grupos
-        for group_name, iso in ISO_MAP.items():
-            df_melted.loc[df_melted["Country"] == group_name, "ISOcode"] = iso
-        
-        # 3. PROMEDIAR VALORES de esperanza de vida para países agrupados
-        # (usamos promedio ponderado o simple promedio)
-        df_melted = df_melted.groupby(["Country", "ISOcode", "Year"], as_index=False)["Life_Expectancy"].mean()
-        # --- CLEAN COUNTRY NAMES ---
-        # Remove stray leading/trailing quotes and whitespace left by the custom CSV parser
-        df_melted['Country'] = df_melted['Country'].astype(str).str.strip().str.strip('"').str.strip()
-
-        # Standardize country names by preferring the `Country` name present in df_totals (if available)
-        try:
-            iso_to_country = df_totals.groupby('ISOcode')['Country'].first().to_dict()
-            df_melted['Country'] = df_melted.apply(lambda r: iso_to_country.get(r['ISOcode'], r['Country']), axis=1)
-        except Exception:
-            # If df_totals is not available or another error occurs, keep cleaned names
-            pass
-        
-        return df_melted
-        
-    except Exception as e:
-        print(f"Error loading life expectancy data: {e}")
-        return pd.DataFrame(columns=['Country', 'ISOcode', 'Year', 'Life_Expectancy'])
+                    current = ""
+                    i += 3
+                elif i < len(line) - 1 and line[i:i+2] == '""':
+                    # Comillas dobles dentro de un valor - ignorar
+                    i += 2
+                else:
+                    current += line[i]
+                    i += 1
+            
+            # Agregar el último campo
+            if current:
+                parts.append(current)
+            
+            # Filtrar campos vacíos o con solo puntos y comas
+            parts = [p for p in parts if p and not p.startswith(';;;;')]
+            
+            if parts and len(parts) > 2:
+                rows.append(parts)
+    
+    if len(rows) < 2:
+        raise ValueError(f"Solo {len(rows)} filas leídas")
+    
+    # Primera fila = headers
+    headers = rows[0]
+    data_rows = rows[1:]
+    
+    # Ajustar filas para que todas tengan el mismo número de columnas
+    max_cols = len(headers)
+    for row in data_rows:
+        while len(row) < max_cols:
+            row.append('')
+        if len(row) > max_cols:
+            row[:] = row[:max_cols]
+    
+    # Crear dataframe
+    df = pd.DataFrame(data_rows, columns=headers)
+    
+    # Renombrar primeras columnas
+    cols = df.columns.tolist()
+    df = df.rename(columns={cols[0]: 'Country', cols[1]: 'ISOcode'})
+    
+    # Buscar columnas de años
+    year_cols = [col for col in df.columns if col.isdigit() and len(col) == 4]
+    
+    if not year_cols:
+        raise ValueError("No se encontraron columnas de años")
+    
+    # Filtrar solo Country, ISOcode y años
+    df = df[['Country', 'ISOcode'] + year_cols]
+    
+    # Convertir a formato long
+    df_melted = df.melt(
+        id_vars=['Country', 'ISOcode'],
+        var_name='Year',
+        value_name='Life_Expectancy'
+    )
+    
+    # Convertir tipos
+    df_melted['Year'] = pd.to_numeric(df_melted['Year'], errors='coerce')
+    df_melted['Life_Expectancy'] = pd.to_numeric(df_melted['Life_Expectancy'], errors='coerce')
+    df_melted['ISOcode'] = df_melted['ISOcode'].str.strip()
+    ingest.check("life_expectancy.raw", df_melted, columns=['Country', 'ISOcode', 'Year', 'Life_Expectancy'],
+                 keys=['ISOcode', 'Year'], value_col='Life_Expectancy', max_nan_ratio=0.4)
+    
+    # Eliminar nulos
+    df_melted = df_melted.dropna(subset=['Year', 'Life_Expectancy'])
+    
+    # --- APLICAR MERGE DE PAÍSES (igual que GDP) ---
+    # Esperanza de vida de los grupos: media ponderada por población
+    df_melted = consolidate_entities(df_melted, "Life_Expectancy", population=WB_POPULATION)
+    # --- CLEAN COUNTRY NAMES ---
+    # Remove stray leading/trailing quotes and whitespace left by the custom CSV parser
+    df_melted['Country'] = df_melted['Country'].astype(str).str.strip().str.strip('"').str.strip()
+
+    # Standardize country names by preferring the `Country` name present in df_totals
+    iso_to_country = df_totals.groupby('ISOcode')['Country'].first()
+    df_melted['Country'] = df_melted['ISOcode'].map(iso_to_country).fillna(df_melted['Country'])
+    
+    return df_melted
 
 # Cargar datos de esperanza de vida
-df_life_expectancy = load_life_expectancy()   
+with ingest.stage("life_expectancy"):
+    df_life_expectancy = load_life_expectancy()
+
+# Validate the loaded frames: a broken file stops the import here (see ingest.py)
+with ingest.stage("validation"):
+    for _name, _df, _value_col, _keys in (
+        ("co2.totals", df_totals, "Value", []),
+        ("co2.capita", df_capita, "Value", []),
+        ("co2.sectors", df_sectors, "Value", ["Sector"]),
+        ("gdp.capita", df_gdp_capita, "Value", []),
+        ("gdp.total", df_gdp_total, "Value", []),
+        ("life_expectancy", df_life_expectancy, "Life_Expectancy", []),
+    ):
+        ingest.check(_name, _df, columns=["Country", "ISOcode", *_keys, "Year", _value_col],
+                     keys=["ISOcode", *_keys, "Year"], value_col=_value_col, max_nan_ratio=0.0,
+                     isos=REAL_COUNTRY_ISO3, min_coverage=0.85, years=YEARS)
+
+# =============================================================================
+# Per-country index
+# =============================================================================
+# Country clicks used to scan a whole frame for one ISO (or name). Each frame
+# is sorted once by (ISOcode, Year); a country's rows are then one contiguous
+# block, found through a dict of row ranges and returned as a positional slice.
+
+class CountryIndex:
+    """Rows of ``df`` grouped per ISO code, each group sorted by year."""
+
+    def __init__(self, df):
+        self.frame = df.sort_values(["ISOcode", "Year"], kind="stable").reset_index(drop=True)
+        codes = self.frame["ISOcode"].to_numpy()
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.array([], dtype=int)
+        stops = np.r_[starts[1:], len(codes)]
+        self._ranges = {code: (start, stop) for code, start, stop in zip(codes[starts], starts, stops)}
+
+    def __contains__(self, iso):
+        return iso in self._ranges
+
+    def series(self, iso):
+        """All rows of ``iso`` in year order (empty frame when unknown)."""
+        start, stop = self._ranges.get(iso, (0, 0))
+        return self.frame.iloc[start:stop]
+
+
+def clean_iso(iso):
+    """ISO code as sent back by the browser (stray quotes / spaces removed)."""
+    return str(iso).strip().replace('"', '')
+
+
+with ingest.stage("indexes"):
+    COUNTRY_INDEX = {
+        "totals": CountryIndex(df_totals),
+        "capita": CountryIndex(df_capita),
+        "sectors": CountryIndex(df_sectors),
+        "gdp_total": CountryIndex(df_gdp_total),
+        "gdp_capita": CountryIndex(df_gdp_capita),
+        "life": CountryIndex(df_life_expectancy),
+    }
+
+# The one name table: ISO -> display name (CO2 names win over GDP / life ones)
+ISO_TO_COUNTRY = {}
+for _df in (df_life_expectancy, df_gdp_capita, df_gdp_total, df_sectors, df_capita, df_totals):
+    _pairs = _df[["ISOcode", "Country"]].dropna().drop_duplicates()
+    ISO_TO_COUNTRY.update(zip(_pairs["ISOcode"], _pairs["Country"]))
+
+
+def country_name(iso):
+    """Display name of ``iso`` (the code itself when unknown)."""
+    return ISO_TO_COUNTRY.get(iso, iso)
+
+
+def country_series(metric, iso):
+    """Rows of ``iso`` in the ``metric`` frame (a COUNTRY_INDEX key), sorted by year."""
+    return COUNTRY_INDEX[metric].series(clean_iso(iso))
+
+
+# =============================================================================
+# Per-year rankings
+# =============================================================================
+# Stat cards, leaderboards, default selections and the rank trajectories of
+# Tab 4 need a year's top / bottom rows, ranks and summary statistics. Each
+# metric is sorted once by (Year, value descending); a year is then one block
+# in rank order, and its count, sum, mean, median, min and max are computed
+# once per year at load time.
+
+class YearRanking:
+    """Rows of ``df`` with a ``value_col``, per year in descending value order."""
+
+    def __init__(self, df, value_col):
+        self.value_col = value_col
+        ranked = df.dropna(subset=[value_col])
+        self.frame = ranked.sort_values(["Year", value_col], ascending=[True, False],
+                                        kind="stable").reset_index(drop=True)
+        years = self.frame["Year"].to_numpy()
+        values = self.frame[value_col].to_numpy(dtype=float)
+        starts = np.flatnonzero(np.r_[True, years[1:] != years[:-1]]) if len(years) else np.array([], dtype=int)
+        stops = np.r_[starts[1:], len(years)]
+        self._ranges = {int(year): (start, stop) for year, start, stop in zip(years[starts], starts, stops)}
+        # Rank within the year (1 = highest): offset of each row in its block
+        self.frame["Rank"] = np.arange(len(years)) - np.repeat(starts, stops - starts) + 1
+        self._stats = {}
+        for year, (start, stop) in self._ranges.items():
+            block = values[start:stop]
+            self._stats[year] = {
+                "count": len(block), "sum": float(block.sum()), "mean": float(block.mean()),
+                "median": float(np.median(block)), "max": float(block[0]), "min": float(block[-1]),
+            }
+
+    def ranked(self, year):
+        """All rows of ``year``, highest value first."""
+        start, stop = self._ranges.get(year, (0, 0))
+        return self.frame.iloc[start:stop]
+
+    def top(self, year, k):
+        """The ``k`` highest rows of ``year`` (like ``nlargest``)."""
+        start, stop = self._ranges.get(year, (0, 0))
+        return self.frame.iloc[start:min(start + k, stop)]
+
+    def bottom(self, year, k):
+        """The ``k`` lowest rows of ``year``, lowest first (like ``nsmallest``)."""
+        start, stop = self._ranges.get(year, (0, 0))
+        return self.frame.iloc[max(start, stop - k):stop].iloc[::-1]
+
+    def stats(self, year):
+        """count / sum / mean / median / min / max of ``year`` (None without data)."""
+        return self._stats.get(year)
+
+    def trajectories(self, isos):
+        """Rank of each of ``isos`` in every year of YEARS (NaN where unranked).
+
+        One vectorized pass over the ranked rows; returns an array of shape
+        (len(isos), len(YEARS)).
+        """
+        rows = pd.Categorical(self.frame["ISOcode"], categories=list(isos)).codes
+        cols = self.frame["Year"].to_numpy().astype(int) - YEARS[0]
+        picked = (rows >= 0) & (cols >= 0) & (cols < len(YEARS))
+        ranks = np.full((len(isos), len(YEARS)), np.nan)
+        ranks[rows[picked], cols[picked]] = self.frame["Rank"].to_numpy()[picked]
+        return ranks
+
+
+# =============================================================================
+# Series transforms
+# =============================================================================
+# Trend lines can show a metric raw or smoothed. Every metric is laid out once
+# as a dense country x year array, and each transform (trailing rolling mean,
+# EWMA, year-over-year change, CAGR) is computed over all rows of that array
+# at load time. A chart then reads the transformed row of its country and
+# never smooths at request time. Years without data stay NaN in every
+# transform (no gap filling).
+
+ROLLING_WINDOW = 5   # years, trailing
+EWMA_ALPHA = 0.3     # weight of the current year
+CAGR_YEARS = 10
+
+# Trend modes offered next to the raw / smoothed charts
+TRENDS = {"raw": "Raw", "rolling": f"{ROLLING_WINDOW}-yr rolling mean", "ewma": "EWMA"}
+# Every precomputed transform: TRENDS plus the rates of change (in %)
+TRANSFORMS = (*TRENDS, "yoy", "cagr")
+
+
+def _shift(values, n, fill=np.nan):
+    """``values`` moved ``n`` columns to the right (``fill`` in the first ``n``)."""
+    shifted = np.full_like(values, fill)
+    if n < values.shape[1]:
+        shifted[:, n:] = values[:, :-n]
+    return shifted
+
+
+def transform_rows(values, kind):
+    """``kind`` transform (a TRANSFORMS key) of every row of a (rows, years) array.
+
+    Columns are consecutive years; NaN marks a year without data and stays
+    NaN. The rolling mean and EWMA use the valid years they reach; ``yoy``
+    and ``cagr`` are growth rates in % against 1 and CAGR_YEARS years before
+    (NaN when either end is missing or not positive).
+    """
+    values = np.asarray(values, dtype=float)
+    valid = np.isfinite(values)
+    if kind == "raw":
+        return values
+    if kind == "rolling":
+        sums = np.cumsum(np.where(valid, values, 0.0), axis=1)
+        counts = np.cumsum(valid, axis=1).astype(float)
+        window_sums = sums - _shift(sums, ROLLING_WINDOW, 0.0)
+        window_counts = counts - _shift(counts, ROLLING_WINDOW, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(valid, window_sums / window_counts, np.nan)
+    if kind == "ewma":
+        smoothed = np.full_like(values, np.nan)
+        level = np.full(values.shape[0], np.nan)
+        for t in range(values.shape[1]):
+            x = values[:, t]
+            # A country's first valid year starts its level; gaps keep it
+            level = np.where(valid[:, t], np.where(np.isnan(level), x, EWMA_ALPHA * x + (1 - EWMA_ALPHA) * level), level)
+            smoothed[:, t] = np.where(valid[:, t], level, np.nan)
+        return smoothed
+    if kind in ("yoy", "cagr"):
+        years = 1 if kind == "yoy" else CAGR_YEARS
+        base = _shift(values, years)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rate = ((values / base) ** (1 / years) - 1) * 100
+        return np.where((values > 0) & (base > 0), rate, np.nan)
+    raise ValueError(f"unknown transform: {kind}")
+
+
+class SeriesPanel:
+    """``value_col`` of ``df`` as a country x year array, in every TRANSFORMS variant."""
+
+    def __init__(self, df, value_col):
+        d = df.dropna(subset=[value_col])
+        codes, isos = pd.factorize(d["ISOcode"], sort=True)
+        years = d["Year"].to_numpy().astype(int)
+        first, last = (years.min(), years.max()) if len(years) else (YEARS[0], YEARS[0])
+        self.years = np.arange(first, last + 1)
+        raw = np.full((len(isos), len(self.years)), np.nan)
+        raw[codes, years - first] = d[value_col].to_numpy(dtype=float)
+        self._rows = {iso: i for i, iso in enumerate(isos)}
+        self._arrays = {kind: transform_rows(raw, kind) for kind in TRANSFORMS}
+
+    def __contains__(self, iso):
+        return iso in self._rows
+
+    def get(self, kind):
+        """(countries, len(years)) array of the ``kind`` transform."""
+        return self._arrays[kind]
+
+    def series(self, iso, kind):
+        """(years, values) of ``iso`` over the years where the transform is defined."""
+        if iso not in self._rows:
+            return self.years[:0], np.array([])
+        row = self._arrays[kind][self._rows[iso]]
+        has_data = np.isfinite(row)
+        return self.years[has_data], row[has_data]
+
+    def at(self, iso, kind, years):
+        """``kind`` values of ``iso`` in ``years`` (NaN outside the data)."""
+        columns = np.asarray(years, dtype=int) - self.years[0]
+        inside = (columns >= 0) & (columns < len(self.years))
+        values = np.full(len(columns), np.nan)
+        if iso in self._rows:
+            values[inside] = self._arrays[kind][self._rows[iso], columns[inside]]
+        return values
+
+
+def with_trend(df, trend, **columns):
+    """Rows of one country (``df``) with each column replaced by its ``trend`` values.
+
+    ``columns`` maps a column of ``df`` to its SERIES_PANELS metric; "raw"
+    returns ``df`` unchanged.
+    """
+    if trend == "raw" or df.empty:
+        return df
+    iso, years = df["ISOcode"].iloc[0], df["Year"].to_numpy()
+    return df.assign(**{col: SERIES_PANELS[metric].at(iso, trend, years) for col, metric in columns.items()})
+
+
+# =============================================================================
+# Region and world rollups
+# =============================================================================
+# Region x year aggregates of every metric, materialized once from
+# ISO_TO_REGION: count, sum, mean and population-weighted mean, plus the same
+# statistics over the whole world. Each statistic is an array of shape
+# (len(REGIONS), number of years of the metric) filled by np.bincount over a
+# flat region * year index, so region and world charts read their series
+# directly, weighted or not.
+
+REGIONS = tuple(sorted(VALID_REGIONS))
+# Averaging modes offered next to world / region averages
+AVERAGE_STATS = {"mean": "Simple", "wmean": "Population-weighted"}
+
+
+def _rollup(flat, values, weights, size):
+    """count / sum / mean / wmean of ``values`` per cell of ``flat`` (length ``size``)."""
+    count = np.bincount(flat, minlength=size)
+    total = np.bincount(flat, weights=values, minlength=size)
+    weight_sum = np.bincount(flat, weights=weights, minlength=size)
+    weighted = np.bincount(flat, weights=values * weights, minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(count > 0, total / count, np.nan)
+        wmean = np.where(weight_sum > 0, weighted / weight_sum, np.nan)
+    return {"count": count, "sum": total, "mean": mean, "wmean": wmean}
+
+
+class RegionCube:
+    """Per-region and world statistics of the metrics in ``frames``, per year.
+
+    ``frames`` maps a metric name to (df, value_col); ``population`` is a
+    frame with ISOcode, Year and Population used as the weights of
+    ``wmean`` (rows without a population weigh nothing). Region cells leave
+    out the countries outside ISO_TO_REGION; the world cells count every
+    country. The year axis of a metric spans its own data (life expectancy
+    covers more years than the CO2 sheets).
+    """
+
+    STATS = ("count", "sum", "mean", "wmean")
+
+    def __init__(self, frames, population):
+        region_code = {region: i for i, region in enumerate(REGIONS)}
+        weights_by_key = population.dropna(subset=["Population"]).set_index(["ISOcode", "Year"])["Population"]
+        self._cube, self._world, self._years = {}, {}, {}
+        for metric, (df, value_col) in frames.items():
+            d = df.dropna(subset=[value_col])
+            years = d["Year"].to_numpy().astype(int)
+            first, last = (years.min(), years.max()) if len(years) else (YEARS[0], YEARS[0])
+            self._years[metric] = np.arange(first, last + 1)
+            n_years = last - first + 1
+            values = d[value_col].to_numpy(dtype=float)
+            weights = weights_by_key.reindex(pd.MultiIndex.from_frame(d[["ISOcode", "Year"]])).to_numpy()
+            weights = np.where(np.isfinite(weights) & (weights > 0), weights, 0.0)
+
+            self._world[metric] = _rollup(years - first, values, weights, n_years)
+
+            regions = d["ISOcode"].map(ISO_TO_REGION).map(region_code).to_numpy(dtype=float)
+            keep = ~np.isnan(regions)
+            flat = regions[keep].astype(int) * n_years + years[keep] - first
+            cells = _rollup(flat, values[keep], weights[keep], len(REGIONS) * n_years)
+            self._cube[metric] = {stat: array.reshape(len(REGIONS), n_years) for stat, array in cells.items()}
+
+    def years(self, metric):
+        """Year axis of ``metric`` (the columns of its arrays)."""
+        return self._years[metric]
+
+    def get(self, metric, stat):
+        """(len(REGIONS), len(years(metric))) array of ``stat`` for ``metric``."""
+        return self._cube[metric][stat]
+
+    def year(self, metric, stat, year):
+        """``stat`` of every region in ``year`` (Series indexed by region, NaN without data)."""
+        years = self._years[metric]
+        column = year - years[0]
+        values = self._cube[metric][stat][:, column] if 0 <= column < len(years) else np.nan
+        return pd.Series(values, index=list(REGIONS), name=stat, dtype=float)
+
+    def series(self, metric, stat, transform="raw"):
+        """{region: (years, values)} over the years where the region's ``stat`` is defined.
+
+        A weighted mean is undefined in the years without population weights.
+        ``transform`` (a TRANSFORMS key) is applied along the years.
+        """
+        years = self._years[metric]
+        cells = self._cube[metric]
+        values = transform_rows(np.where(cells["count"] > 0, cells[stat], np.nan), transform)
+        has_data = np.isfinite(values)
+        return {region: (years[has_data[i]], values[i][has_data[i]])
+                for i, region in enumerate(REGIONS) if has_data[i].any()}
+
+    def world(self, metric, stat, transform="raw"):
+        """(years, values) of the world ``stat`` (``transform`` applied) where it is defined."""
+        cells = self._world[metric]
+        values = transform_rows(np.where(cells["count"] > 0, cells[stat], np.nan)[None, :], transform)[0]
+        has_data = np.isfinite(values)
+        return self._years[metric][has_data], values[has_data]
+
+    def frame(self, metric, stat):
+        """Long frame (Year, Region, ``stat``) of the cells with data."""
+        count = self._cube[metric]["count"]
+        rows, cols = np.nonzero(count)
+        return pd.DataFrame({"Year": self._years[metric][cols], "Region": np.asarray(REGIONS)[rows],
+                             stat: self._cube[metric][stat][rows, cols]})
 
 # --- Helper precomputed merges for UI convenience ---
 
@@ -391,6 +849,26 @@ def get_merged_life_progress():
 
     return df_merged
 
+# =============================================================================
+# Fixed choropleth locations
+# =============================================================================
+# Maps are built on one location list per dataset (every country with a value
+# in any year; NaN colour where a year has none). Consecutive years then share
+# `locations` and `hovertext`, so a year tick only replaces the colour arrays.
+
+def map_locations(df, value_col="Value"):
+    """Return (ISOcode, Country) of every country with a value in ``df``, sorted by ISO."""
+    rows = df.dropna(subset=[value_col]).drop_duplicates("ISOcode", keep="last")
+    return rows.sort_values("ISOcode")[["ISOcode", "Country"]].reset_index(drop=True)
+
+
+def on_map_locations(dff, locations, columns):
+    """Align a one-year slice on a fixed location list (NaN where the year has no row)."""
+    return locations.join(dff.set_index("ISOcode")[columns], on="ISOcode")
+
+
+TAB1_MAP_LOCATIONS = map_locations(df_totals)
+
 # =============================================================================
 # Tab 2 helpers (GDP & Life Expectancy tab)
 # =============================================================================
@@ -399,33 +877,62 @@ def get_merged_life_progress():
 
 TAB2_SMALL_COUNTRY_ISOS = {'AND', 'MCO', 'LIE', 'SMR', 'VAT', 'MNE', 'PSE', 'SSD'}
 
-# Precomputed global averages (used in Tab 2 line charts)
-TAB2_GDP_TOTAL_AVG_BY_YEAR = (
-    df_gdp_total.dropna(subset=["Value"])
-    .groupby("Year", as_index=False)["Value"]
-    .mean()
+# Per-year rankings (see YearRanking); the cards leave the micro-states out
+with ingest.stage("indexes"):
+    YEAR_RANKINGS = {
+        "totals": YearRanking(df_totals, "Value"),
+        "gdp_total": YearRanking(df_gdp_total, "Value"),
+        "gdp_capita": YearRanking(df_gdp_capita, "Value"),
+        "life": YearRanking(df_life_expectancy, "Life_Expectancy"),
+        "life_cards": YearRanking(df_life_expectancy[~df_life_expectancy["ISOcode"].isin(TAB2_SMALL_COUNTRY_ISOS)],
+                                  "Life_Expectancy"),
+    }
+
+# Region x year rollups (see RegionCube); population is the CO2 total / per
+# capita proxy used by the bubble charts
+with ingest.stage("indexes"):
+    _population = df_totals[["ISOcode", "Year", "Value"]].merge(
+        df_capita[["ISOcode", "Year", "Value"]], on=["ISOcode", "Year"], suffixes=("_total", "_capita"))
+    _population["Population"] = _population["Value_total"] / _population["Value_capita"].where(_population["Value_capita"] > 0)
+    REGION_CUBE = RegionCube({
+        "totals": (df_totals, "Value"),
+        "capita": (df_capita, "Value"),
+        "gdp_total": (df_gdp_total, "Value"),
+        "gdp_capita": (df_gdp_capita, "Value"),
+        "life": (df_life_expectancy, "Life_Expectancy"),
+    }, _population)
+
+# Country x year arrays of the trend-line metrics, every transform precomputed
+# (see SeriesPanel)
+with ingest.stage("indexes"):
+    SERIES_PANELS = {
+        "capita": SeriesPanel(df_capita, "Value"),
+        "gdp_total": SeriesPanel(df_gdp_total, "Value"),
+        "gdp_capita": SeriesPanel(df_gdp_capita, "Value"),
+        "life": SeriesPanel(df_life_expectancy, "Life_Expectancy"),
+    }
+
+# Choropleth location lists (see map_locations)
+TAB2_GDP_MAP_LOCATIONS = {"total": map_locations(df_gdp_total), "capita": map_locations(df_gdp_capita)}
+TAB2_LIFE_MAP_LOCATIONS = map_locations(
+    df_life_expectancy[~df_life_expectancy["ISOcode"].isin(TAB2_SMALL_COUNTRY_ISOS)], "Life_Expectancy"
 )
 
-TAB2_GDP_CAPITA_AVG_BY_YEAR = (
-    df_gdp_capita.dropna(subset=["Value"])
-    .groupby("Year", as_index=False)["Value"]
-    .mean()
-)
-
-TAB2_LIFE_AVG_BY_YEAR = (
-    df_life_expectancy.dropna(subset=["Life_Expectancy"])
-    .groupby("Year", as_index=False)["Life_Expectancy"]
-    .mean()
-)
-
-# Precomputed continental progress series (used in Tab 2 'Continental Progress')
-TAB2_LIFE_CONTINENT_AVG = (
-    df_life_expectancy.dropna(subset=["Life_Expectancy"])
-    .assign(Continent=lambda d: d["ISOcode"].map(ISO_TO_REGION).fillna("Other"))
-    .query("Continent != 'Other'")
-    .groupby(["Year", "Continent"], as_index=False)["Life_Expectancy"]
-    .mean()
-)
+# Precomputed global averages (used in Tab 2 line charts), per AVERAGE_STATS
+# mode and TRENDS mode: {mode: {trend: (years, values)}}. Population weights
+# only make sense for intensive metrics: total GDP keeps the simple mean,
+# {trend: (years, values)}. Weighted series cover the years of the population
+# proxy only.
+TAB2_GDP_TOTAL_AVG_BY_YEAR = {trend: REGION_CUBE.world("gdp_total", "mean", trend) for trend in TRENDS}
+TAB2_GDP_CAPITA_AVG_BY_YEAR = {stat: {trend: REGION_CUBE.world("gdp_capita", stat, trend) for trend in TRENDS}
+                               for stat in AVERAGE_STATS}
+TAB2_LIFE_AVG_BY_YEAR = {stat: {trend: REGION_CUBE.world("life", stat, trend) for trend in TRENDS}
+                         for stat in AVERAGE_STATS}
+
+# Precomputed continental progress series (used in Tab 2 'Continental Progress'),
+# per AVERAGE_STATS and TRENDS mode: {mode: {trend: {continent: (years, values)}}}
+TAB2_LIFE_CONTINENT_AVG = {stat: {trend: REGION_CUBE.series("life", stat, trend) for trend in TRENDS}
+                           for stat in AVERAGE_STATS}
 
 # Fixed color mapping (kept here so Tab 2 stays compact)
 TAB2_LIFE_CONTINENT_COLOR_MAP = {
@@ -438,6 +945,7 @@ TAB2_LIFE_CONTINENT_COLOR_MAP = {
     'Sub-Saharan Africa': '#f1c40f',          # Yellow
 }
 
+@memoize()
 def tab2_get_gdp_year_df(year: int, view: str):
     """Return GDP dataframe filtered to a given year.
 
@@ -448,6 +956,7 @@ def tab2_get_gdp_year_df(year: int, view: str):
     base = df_gdp_total if view == "total" else df_gdp_capita
     return base[base["Year"] == year].dropna(subset=["Value"]).copy()
 
+@memoize()
 def tab2_get_gdp_map_df(year: int, view: str):
     """Return GDP dataframe ready for the choropleth (includes log10 color)."""
     dff = tab2_get_gdp_year_df(year, view)
@@ -456,6 +965,7 @@ def tab2_get_gdp_map_df(year: int, view: str):
         dff["ColorValue"] = np.log10(dff["Value"])
     return dff
 
+@memoize()
 def tab2_get_life_year_df(year: int, filter_small_isos: bool = True):
     """Return life expectancy dataframe filtered to a given year."""
     dff = df_life_expectancy[df_life_expectancy["Year"] == year].dropna(subset=["Life_Expectancy"]).copy()
@@ -465,23 +975,18 @@ def tab2_get_life_year_df(year: int, filter_small_isos: bool = True):
 
 def tab2_get_default_iso_gdp(year: int):
     """Fallback ISO: country with max GDP (total) for the given year."""
-    dff = df_gdp_total[df_gdp_total["Year"] == year].dropna(subset=["Value"])
-    if dff.empty:
-        return None
-    return dff.loc[dff["Value"].idxmax(), "ISOcode"]
+    top = YEAR_RANKINGS["gdp_total"].top(year, 1)
+    return None if top.empty else top["ISOcode"].iloc[0]
 
 def tab2_get_default_iso_life(year: int):
     """Fallback ISO: country with max life expectancy for the given year."""
-    dff = tab2_get_life_year_df(year, filter_small_isos=False)
-    if dff.empty:
-        return None
-    return dff.loc[dff["Life_Expectancy"].idxmax(), "ISOcode"]
+    top = YEAR_RANKINGS["life"].top(year, 1)
+    return None if top.empty else top["ISOcode"].iloc[0]
 
-def tab2_get_gdp_country_series(iso: str):
-    """Return (total_series, capita_series, country_name) for a given ISO."""
-    iso = str(iso).strip().replace('"', '')
-    c_total = df_gdp_total[df_gdp_total["ISOcode"] == iso].dropna(subset=["Value"]).copy()
-    c_cap = df_gdp_capita[df_gdp_capita["ISOcode"] == iso].dropna(subset=["Value"]).copy()
+def tab2_get_gdp_country_series(iso: str, trend: str = "raw"):
+    """Return (total_series, capita_series, country_name) for a given ISO (``trend``: TRENDS key)."""
+    c_total = with_trend(country_series("gdp_total", iso).dropna(subset=["Value"]), trend, Value="gdp_total")
+    c_cap = with_trend(country_series("gdp_capita", iso).dropna(subset=["Value"]), trend, Value="gdp_capita")
     name = None
     if not c_total.empty:
         name = c_total["Country"].iloc[0]
@@ -489,10 +994,10 @@ def tab2_get_gdp_country_series(iso: str):
         name = c_cap["Country"].iloc[0]
     return c_total, c_cap, name
 
-def tab2_get_life_country_series(iso: str):
-    """Return life expectancy series for a given ISO."""
-    iso = str(iso).strip().replace('"', '')
-    return df_life_expectancy[df_life_expectancy["ISOcode"] == iso].dropna(subset=["Life_Expectancy"]).copy()
+def tab2_get_life_country_series(iso: str, trend: str = "raw"):
+    """Return life expectancy series for a given ISO (``trend``: TRENDS key)."""
+    return with_trend(country_series("life", iso).dropna(subset=["Life_Expectancy"]), trend,
+                      Life_Expectancy="life")
 
 
 # =============================================================================
@@ -502,7 +1007,8 @@ def tab2_get_life_country_series(iso: str):
 # heavy joins / aggregations on every interaction. They are *only* used by Tab 3.
 
 
-# Fixed region color mapping used by the Life Expectancy bubble chart.
+# Fixed region color mapping used by both Tab 3 bubble charts (GDP and Life
+# Expectancy views), so a region keeps its colour when the view is switched.
 TAB3_LIFE_REGION_COLOR_MAP = {
     'Europe & Central Asia': '#3498db',
     'East Asia & Pacific': '#e74c3c',
@@ -515,34 +1021,109 @@ TAB3_LIFE_REGION_COLOR_MAP = {
 }
 
 
+# Merged panels built once at import time (every Tab 3 helper reads from these)
+with ingest.stage("tab3_panels"):
+    TAB3_GDP_MERGED = get_merged_for_correlation()
+    TAB3_LIFE_MERGED = get_merged_life_progress()
+    COUNTRY_INDEX["tab3_gdp"] = CountryIndex(TAB3_GDP_MERGED)
+    COUNTRY_INDEX["tab3_life"] = CountryIndex(TAB3_LIFE_MERGED)
+
+
+@memoize()
 def tab3_get_gdp_bubble_year_df(year: int) -> pd.DataFrame:
     """Return the pre-merged GDP/CO2-per-capita dataframe filtered to one year."""
-    df = get_merged_for_correlation()
+    df = TAB3_GDP_MERGED
     return df[df["Year"] == year].copy()
 
 
+@memoize()
 def tab3_get_life_bubble_year_df(year: int) -> pd.DataFrame:
     """Return the pre-merged Life/CO2-per-capita dataframe filtered to one year."""
-    df = get_merged_life_progress()
+    df = TAB3_LIFE_MERGED
     return df[df["Year"] == year].copy()
 
 
-def tab3_get_gdp_country_trajectory_df(iso: str) -> pd.DataFrame:
-    """Return the historical trajectory (all years) for a country in GDP view."""
-    iso = str(iso).strip().replace('"', '')
-    df = get_merged_for_correlation()
-    df_c = df[df["ISOcode"] == iso].sort_values("Year").copy()
+def tab3_get_gdp_country_trajectory_df(iso: str, trend: str = "raw") -> pd.DataFrame:
+    """Return the historical trajectory (all years) for a country in GDP view (``trend``: TRENDS key)."""
+    df_c = country_series("tab3_gdp", iso)
     # Defensive filters for log scales
-    return df_c[(df_c["GDP_pc"] > 0) & (df_c["CO2_pc"] > 0)]
+    df_c = df_c[(df_c["GDP_pc"] > 0) & (df_c["CO2_pc"] > 0)]
+    return with_trend(df_c, trend, GDP_pc="gdp_capita", CO2_pc="capita")
 
 
-def tab3_get_life_country_trajectory_df(iso: str) -> pd.DataFrame:
-    """Return the historical trajectory (all years) for a country in Life view."""
-    iso = str(iso).strip().replace('"', '')
-    df = get_merged_life_progress()
-    df_c = df[df["ISOcode"] == iso].sort_values("Year").copy()
+def tab3_get_life_country_trajectory_df(iso: str, trend: str = "raw") -> pd.DataFrame:
+    """Return the historical trajectory (all years) for a country in Life view (``trend``: TRENDS key)."""
+    df_c = country_series("tab3_life", iso)
     # Defensive filters for log scales / invalid life expectancy
-    return df_c[(df_c["Value_capita"] > 0) & (df_c["Life_Expectancy"] > 0)]
+    df_c = df_c[(df_c["Value_capita"] > 0) & (df_c["Life_Expectancy"] > 0)]
+    return with_trend(df_c, trend, Value_capita="capita", Life_Expectancy="life")
+
+
+def _tab3_batch_regression(df: pd.DataFrame, x_col: str, y_col: str,
+                           log_x: bool = True, log_y: bool = False) -> pd.DataFrame:
+    """Pearson r and least-squares fit for every year in one grouped pass.
+
+    Only the grouped sums of x, y, x², y² and xy are needed, so all years are
+    solved at once instead of calling np.corrcoef / np.polyfit per request.
+
+    Args:
+        df: Merged panel containing Year and both value columns.
+        x_col: Column on the horizontal axis.
+        y_col: Column on the vertical axis.
+        log_x: Apply log10 to x before fitting.
+        log_y: Apply log10 to y before fitting.
+
+    Returns:
+        DataFrame indexed by Year with n, r, slope, intercept, x_min, x_max
+        (x_min / x_max are in the fitted space, i.e. log10 when log_x).
+    """
+    x = np.log10(df[x_col].to_numpy(dtype=float)) if log_x else df[x_col].to_numpy(dtype=float)
+    y = np.log10(df[y_col].to_numpy(dtype=float)) if log_y else df[y_col].to_numpy(dtype=float)
+
+    sums = pd.DataFrame({
+        "Year": df["Year"].to_numpy(),
+        "n": 1.0, "sx": x, "sy": y, "sxx": x * x, "syy": y * y, "sxy": x * y,
+    }).groupby("Year")
+    stats = sums[["n", "sx", "sy", "sxx", "syy", "sxy"]].sum()
+    stats["x_min"] = sums["sx"].min()
+    stats["x_max"] = sums["sx"].max()
+
+    n = stats["n"]
+    cov = n * stats["sxy"] - stats["sx"] * stats["sy"]
+    var_x = n * stats["sxx"] - stats["sx"] ** 2
+    var_y = n * stats["syy"] - stats["sy"] ** 2
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stats["slope"] = cov / var_x
+        stats["intercept"] = (stats["sy"] - stats["slope"] * stats["sx"]) / n
+        stats["r"] = cov / np.sqrt(var_x * var_y)
+
+    stats["n"] = n.astype(int)
+    return stats[["n", "r", "slope", "intercept", "x_min", "x_max"]]
+
+
+# Correlation / trend-line statistics for every year (log-log for GDP, log-x for Life)
+with ingest.stage("tab3_panels"):
+    TAB3_GDP_CORR_BY_YEAR = _tab3_batch_regression(TAB3_GDP_MERGED, "GDP_pc", "CO2_pc", log_x=True, log_y=True)
+    TAB3_LIFE_CORR_BY_YEAR = _tab3_batch_regression(TAB3_LIFE_MERGED, "Value_capita", "Life_Expectancy", log_x=True)
+
+
+def tab3_get_correlation_series(view: str = "gdp") -> pd.DataFrame:
+    """Return the correlation time series (one row per year) for a Tab 3 view.
+
+    Args:
+        view: "gdp" or "life".
+    """
+    stats = TAB3_LIFE_CORR_BY_YEAR if view == "life" else TAB3_GDP_CORR_BY_YEAR
+    return stats.reset_index()
+
+
+def tab3_get_year_fit(year: int, view: str = "gdp"):
+    """Return the precomputed fit for one year as a dict, or None if missing."""
+    stats = TAB3_LIFE_CORR_BY_YEAR if view == "life" else TAB3_GDP_CORR_BY_YEAR
+    if year not in stats.index:
+        return None
+    return stats.loc[year].to_dict()
 
 
 def _tab3_aggregate_iso(df: pd.DataFrame, year: int, value_col: str, agg: str) -> pd.Series:
@@ -568,6 +1149,7 @@ def _tab3_attach_country_region(df_delta: pd.DataFrame, source_df: pd.DataFrame)
     return df_delta
 
 
+@memoize()
 def tab3_get_decoupling_delta(selected_year: int, start_year: int = 1970):
     """Build the decoupling delta dataframe for Tab 3 (GDP total vs CO2 total).
 
@@ -603,6 +1185,7 @@ def tab3_get_decoupling_delta(selected_year: int, start_year: int = 1970):
     return df_delta
 
 
+@memoize()
 def tab3_get_life_progress_delta(selected_year: int, start_year: int = 1970):
     """Build the life progress delta dataframe for Tab 3 (Life vs CO2 per-capita).
 
@@ -639,3 +1222,7 @@ def tab3_get_life_progress_delta(selected_year: int, start_year: int = 1970):
     df_delta["Sustainability_Score"] = df_delta["dLife"] - (df_delta["dCO2"] / 10)
 
     return df_delta
+
+
+# Ingest report (stage timings and checks, see ingest.py)
+INGEST_REPORT = ingest.finish()
@@ -0,0 +1,224 @@
+"""
+Offline store of precomputed callback outputs.
+
+The dashboard's input space is tiny (3 tabs x ~50 years x gdp/life modes x
+total/capita views), so every output that does not depend on a clicked
+country can be rendered ahead of time. Renderers register themselves with
+the ``precomputed`` decorator together with the domain of each argument:
+
+    @precomputed("tab1.map", year=YEARS)
+    def render_map(year): ...
+
+Build the store once (after any data change):
+
+    python response_store.py build [--out Data/responses.sqlite]
+
+At runtime, if the store file exists (path in SPESHEET_RESPONSE_STORE,
+default Data/responses.sqlite), registered renderers return the stored JSON
+instead of computing; arguments outside the domain (e.g. a selected
+country) fall through to the live function.
+
+The store records a fingerprint of the source files in Data/ and one of
+the modules that render them (RENDERER_SOURCES). When either differs from
+the running tree (data updated, any renderer or helper edited) the store is
+ignored with a warning on stderr and every output is rendered live until it
+is rebuilt.
+"""
+import argparse
+import glob
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = "Data"
+DEFAULT_STORE_PATH = os.path.join(DATA_DIR, "responses.sqlite")
+STORE_PATH = os.environ.get("SPESHEET_RESPONSE_STORE", DEFAULT_STORE_PATH)
+
+DATA_FILES = ("*.xlsx", "*.csv")
+# Modules whose code shapes a stored output (relative to ROOT): the data
+# layer, the figure builders, the tabs and this file's storage format
+RENDERER_SOURCES = ("ingest.py", "prepare_data.py", "figures.py", "response_store.py",
+                    "components/*.py", "tabs/*.py")
+
+_REGISTRY = {}
+_local = threading.local()
+_stats = {"hits": 0, "misses": 0}
+
+
+def _key(name, args):
+    return f"{name}|" + "|".join(repr(a) for a in args)
+
+
+def _fingerprint(directory, patterns):
+    """SHA-256 over the relative names and contents of the files matching ``patterns``."""
+    digest = hashlib.sha256()
+    paths = sorted({p for pattern in patterns for p in glob.glob(os.path.join(directory, pattern))})
+    for path in paths:
+        digest.update(os.path.relpath(path, directory).replace(os.sep, "/").encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def data_fingerprint(data_dir=DATA_DIR):
+    """SHA-256 of the source data files in ``data_dir``."""
+    return _fingerprint(data_dir, DATA_FILES)
+
+
+def source_fingerprint():
+    """SHA-256 of the RENDERER_SOURCES modules."""
+    return _fingerprint(ROOT, RENDERER_SOURCES)
+
+
+def _metadata():
+    return {"data_fingerprint": data_fingerprint(), "source_fingerprint": source_fingerprint()}
+
+
+_NO_CONN = object()
+_checked = {}  # store path -> None when current, else the reason it is ignored
+
+
+def _stale(conn):
+    """Why ``conn``'s store does not match this tree (None when it does)."""
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+    except sqlite3.DatabaseError:
+        return "it has no metadata (built by an older version)"
+    for key, expected in _metadata().items():
+        if meta.get(key) != expected:
+            return f"its {key} does not match"
+    return None
+
+
+def _conn():
+    """Read-only connection to the store (None when no current store has been built)."""
+    conn = getattr(_local, "conn", _NO_CONN)
+    # Forked processes (background jobs, preloaded workers) open their own
+    if conn is _NO_CONN or getattr(_local, "pid", None) != os.getpid():
+        conn = None
+        if os.path.exists(STORE_PATH):
+            conn = sqlite3.connect(f"file:{STORE_PATH}?mode=ro", uri=True)
+            # Checked once per process; the data and source files are hashed only here
+            if STORE_PATH not in _checked:
+                _checked[STORE_PATH] = _stale(conn)
+                if _checked[STORE_PATH]:
+                    print(f"Ignoring response store {STORE_PATH}: {_checked[STORE_PATH]}; "
+                          "rebuild it with `python response_store.py build`.", file=sys.stderr)
+            if _checked[STORE_PATH]:
+                conn.close()
+                conn = None
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+
+def lookup(name, args):
+    """Return the stored output for ``name(*args)`` or None."""
+    conn = _conn()
+    if conn is None:
+        return None
+    row = conn.execute("SELECT value FROM responses WHERE key = ?", (_key(name, args),)).fetchone()
+    if row is None:
+        _stats["misses"] += 1
+        return None
+    _stats["hits"] += 1
+    return json.loads(zlib.decompress(row[0]))
+
+
+def store_stats():
+    """Hit/miss counters of the store lookups in this worker."""
+    loaded = _conn() is not None
+    return dict(_stats, path=STORE_PATH, loaded=loaded, ignored=_checked.get(STORE_PATH))
+
+
+def precomputed(name, **domain):
+    """Register a renderer and serve it from the store when possible.
+
+    Args:
+        name: Store namespace (e.g. "tab2.map").
+        **domain: Iterable of values for every positional argument, in order.
+
+    The wrapped function must be called positionally. Returned values are plain
+    JSON structures when served from the store, so callers must accept both
+    go.Figure / components and their dict form.
+    """
+    def decorator(func):
+        def wrapper(*args):
+            stored = lookup(name, args)
+            if stored is not None:
+                return stored
+            return func(*args)
+
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__wrapped__ = func
+        _REGISTRY[name] = (func, domain)
+        return wrapper
+
+    return decorator
+
+
+# =============================================================================
+# Build command
+# =============================================================================
+
+def build(out_path, names=None):
+    """Render every registered output over its full domain into ``out_path``."""
+    from dash._utils import to_json
+    import main  # noqa: F401  (registers every tab, callback and renderer)
+    from response_store import _REGISTRY  # the registry filled by those imports
+
+    tmp_path = out_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("CREATE TABLE responses (key TEXT PRIMARY KEY, value BLOB)")
+    conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.executemany("INSERT INTO meta VALUES (?, ?)", _metadata().items())
+
+    total_raw = total_zip = 0
+    for name, (func, domain) in sorted(_REGISTRY.items()):
+        if names and name not in names:
+            continue
+        t0 = time.perf_counter()
+        count = 0
+        for args in itertools.product(*domain.values()):
+            payload = to_json(func(*args)).encode("utf-8")
+            blob = zlib.compress(payload, 9)
+            conn.execute("INSERT INTO responses VALUES (?, ?)", (_key(name, args), blob))
+            total_raw += len(payload)
+            total_zip += len(blob)
+            count += 1
+        conn.commit()
+        print(f"{name:<28}{count:>6} entries {time.perf_counter() - t0:>8.1f}s")
+
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp_path, out_path)
+    print(f"Wrote {out_path}: {total_raw / 1e6:.1f} MB raw -> {total_zip / 1e6:.1f} MB compressed")
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute dashboard responses.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("build", help="render every (tab, year, view) combination")
+    b.add_argument("--out", default=STORE_PATH)
+    b.add_argument("--only", nargs="*", help="restrict to these renderer names")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        build(args.out, args.only)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    cli()
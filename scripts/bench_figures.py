@@ -0,0 +1,153 @@
+"""
+Benchmark: Plotly Express vs. the direct figure builders in figures.py.
+
+Builds the Tab 1 map/treemap, the Tab 2 map/continent lines and the Tab 3
+bubble chart through both paths for every year and reports the mean build
+time and serialized payload size.
+
+    python scripts/bench_figures.py [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dash._utils import to_json  # noqa: E402
+
+import figures  # noqa: E402
+from prepare_data import (  # noqa: E402
+    df_totals, min_year, max_year,
+    tab2_get_gdp_map_df, TAB2_LIFE_CONTINENT_AVG, TAB2_LIFE_CONTINENT_COLOR_MAP,
+    tab3_get_gdp_bubble_year_df,
+)
+
+# Continental series of the Tab 2 chart (simple mean, raw) and the long frame px needs
+CONTINENT_SERIES = TAB2_LIFE_CONTINENT_AVG["mean"]["raw"]
+CONTINENT_FRAME = pd.concat([pd.DataFrame({"Year": years, "Life_Expectancy": values, "Continent": continent})
+                             for continent, (years, values) in CONTINENT_SERIES.items()])
+
+
+# =============================================================================
+# Reference (Plotly Express) implementations, as the callbacks used to do it
+# =============================================================================
+
+def px_map(year):
+    dff = df_totals[df_totals["Year"] == year]
+    fig = px.choropleth(dff, locations="ISOcode", color="Value", hover_name="Country",
+                        color_continuous_scale="Viridis", height=450)
+    fig.update_layout(margin={"r": 0, "t": 25, "l": 0, "b": 0}, transition_duration=100,
+                      coloraxis_colorbar=dict(title="CO2 (Mt)", thickness=15, len=0.8))
+    return fig
+
+
+def px_treemap(year):
+    dff = df_totals[df_totals["Year"] == year].copy()
+    fig = px.treemap(dff, path=[px.Constant("World"), "Continent", "Country"], values="Value",
+                     color="Continent", hover_data={"Value": ":,.2f Mt"}, height=420)
+    fig.update_layout(margin={"r": 5, "t": 5, "l": 5, "b": 5}, template="plotly_white", uirevision="constant")
+    return fig
+
+
+def px_gdp_map(year):
+    dff = tab2_get_gdp_map_df(year, "total")
+    return px.choropleth(dff, locations="ISOcode", color="ColorValue", hover_name="Country",
+                         hover_data={"Value": ":,.2f", "ColorValue": False},
+                         color_continuous_scale="Viridis", height=550)
+
+
+def px_lines(year):
+    fig = px.line(CONTINENT_FRAME, x="Year", y="Life_Expectancy", color="Continent",
+                  template="plotly_white", markers=True, color_discrete_map=TAB2_LIFE_CONTINENT_COLOR_MAP)
+    fig.add_vline(x=year, line_width=1, line_dash="dot", line_color="red")
+    return fig
+
+
+def px_bubble(year):
+    dff = tab3_get_gdp_bubble_year_df(year)
+    return px.scatter(dff, x="GDP_pc", y="CO2_pc", size="Population", color="Region", hover_name="Country",
+                      size_max=60, template="plotly_white", log_x=True, log_y=True, custom_data=["ISOcode"])
+
+
+# =============================================================================
+# Builder implementations
+# =============================================================================
+
+def fb_map(year):
+    dff = df_totals[df_totals["Year"] == year]
+    return figures.choropleth(dff["ISOcode"].to_numpy(), dff["Value"].to_numpy(), dff["Country"].to_numpy(),
+                              colorbar=dict(title=dict(text="CO2 (Mt)"), thickness=15, len=0.8),
+                              height=450, margin={"r": 0, "t": 25, "l": 0, "b": 0}, transition={"duration": 100})
+
+
+def fb_treemap(year):
+    dff = df_totals[df_totals["Year"] == year]
+    nodes = figures.treemap_hierarchy(dff["Country"], dff["Continent"], dff["Value"])
+    return figures.treemap(nodes["ids"], nodes["labels"], nodes["parents"], nodes["values"],
+                           colors=figures.group_colors(nodes["group"]), template_name="plotly_white",
+                           height=420, margin={"r": 5, "t": 5, "l": 5, "b": 5}, uirevision="constant")
+
+
+def fb_gdp_map(year):
+    dff = tab2_get_gdp_map_df(year, "total")
+    return figures.choropleth(dff["ISOcode"].to_numpy(), dff["ColorValue"].to_numpy(), dff["Country"].to_numpy(),
+                              customdata=dff[["Value"]].to_numpy(), height=550)
+
+
+def fb_lines(year):
+    return figures.line(
+        [dict(name=c, x=years, y=values, color=TAB2_LIFE_CONTINENT_COLOR_MAP.get(c))
+         for c, (years, values) in CONTINENT_SERIES.items()],
+        markers=True, template_name="plotly_white", shapes=[figures.vline(year)])
+
+
+def fb_bubble(year):
+    dff = tab3_get_gdp_bubble_year_df(year)
+    return figures.bubble(dff["GDP_pc"], dff["CO2_pc"], dff["Population"], dff["Region"],
+                          hovertext=dff["Country"], customdata=dff["ISOcode"], hovertemplate="%{hovertext}",
+                          template_name="plotly_white",
+                          xaxis=dict(type="log"), yaxis=dict(type="log"))
+
+
+CASES = [
+    ("choropleth (tab1 map)", px_map, fb_map),
+    ("treemap (tab1)", px_treemap, fb_treemap),
+    ("choropleth (tab2 map)", px_gdp_map, fb_gdp_map),
+    ("line (tab2 continents)", px_lines, fb_lines),
+    ("bubble (tab3 gdp)", px_bubble, fb_bubble),
+]
+
+
+def _measure(builder, years, repeat):
+    timings, sizes = [], []
+    for _ in range(repeat):
+        for year in years:
+            t0 = time.perf_counter()
+            fig = builder(year)
+            payload = to_json(fig)
+            timings.append(time.perf_counter() - t0)
+            sizes.append(len(payload))
+    return np.mean(timings) * 1000, np.mean(sizes) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    years = list(range(min_year, max_year + 1))
+    print(f"{'figure':<26}{'px ms':>10}{'builder ms':>12}{'speedup':>10}{'px KB':>10}{'builder KB':>12}")
+    for name, px_fn, fb_fn in CASES:
+        px_ms, px_kb = _measure(px_fn, years, args.repeat)
+        fb_ms, fb_kb = _measure(fb_fn, years, args.repeat)
+        print(f"{name:<26}{px_ms:>10.2f}{fb_ms:>12.2f}{px_ms / fb_ms:>9.1f}x{px_kb:>10.1f}{fb_kb:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Minimal client for Dash's callback protocol, used by the scripts in this folder.
+
+Reads /_dash-dependencies once and builds /_dash-update-component bodies
+from plain ``{"component.prop": value}`` dicts:
+
+    client = DashClient.for_app(main.app)          # or DashClient.for_url("http://127.0.0.1:8050")
+    status, body = client.call("map-graph.figure",
+                               {"tabs.active_tab": "tab-1", "year-slider.value": 2000},
+                               changed=["year-slider.value"])
+"""
+import json
+import urllib.error
+import urllib.request
+
+
+class DashClient:
+    def __init__(self, get, post):
+        """``get(path) -> (status, bytes)``, ``post(path, payload, headers) -> (status, bytes, headers)``."""
+        self.get = get
+        self._post = post
+        status, body = get("/_dash-dependencies")
+        if status != 200:
+            raise RuntimeError(f"/_dash-dependencies returned {status}")
+        self.dependencies = json.loads(body)
+
+    @classmethod
+    def for_app(cls, app, headers=None):
+        """Client over Flask's test client (no server process needed)."""
+        test_client = app.server.test_client()
+        test_client.get("/")
+
+        def get(path):
+            r = test_client.get(path)
+            return r.status_code, r.data
+
+        def post(path, payload, extra_headers):
+            r = test_client.post(path, json=payload, headers={**(headers or {}), **(extra_headers or {})})
+            return r.status_code, r.data, dict(r.headers)
+
+        return cls(get, post)
+
+    @classmethod
+    def for_url(cls, base_url, headers=None):
+        """Client over HTTP against a running server (e.g. ``http://127.0.0.1:8050``)."""
+        base_url = base_url.rstrip("/")
+        headers = {"Content-Type": "application/json", **(headers or {})}
+
+        def get(path):
+            with urllib.request.urlopen(base_url + path) as r:
+                return r.status, r.read()
+
+        def post(path, payload, extra_headers):
+            req = urllib.request.Request(base_url + path, data=json.dumps(payload).encode(),
+                                         headers={**headers, **(extra_headers or {})})
+            try:
+                with urllib.request.urlopen(req) as r:
+                    return r.status, r.read(), dict(r.headers)
+            except urllib.error.HTTPError as e:
+                return e.code, e.read(), dict(e.headers)
+
+        return cls(get, post)
+
+    def spec(self, output):
+        """Dependency entry whose output spec contains ``output`` ("id.prop")."""
+        for dep in self.dependencies:
+            outputs = dep["output"].strip(".").split("...")
+            if output in outputs:
+                return dep
+        raise KeyError(output)
+
+    def body(self, output, inputs, changed, state=None):
+        """Request body; State values are looked up in ``state``, then in ``inputs``."""
+        dep = self.spec(output)
+
+        def values(specs, given):
+            return [dict(id=s["id"], property=s["property"], value=given.get(f"{s['id']}.{s['property']}"))
+                    for s in specs]
+
+        outputs = [dict(zip(("id", "property"), o.rsplit(".", 1))) for o in dep["output"].strip(".").split("...")]
+        return {
+            "output": dep["output"],
+            "outputs": outputs if dep["output"].startswith("..") else outputs[0],
+            "inputs": values(dep["inputs"], inputs),
+            "state": values(dep["state"], dict(inputs, **(state or {}))),
+            "changedPropIds": list(changed),
+        }
+
+    def call(self, output, inputs, changed, state=None, headers=None):
+        """POST one callback; returns (status, body bytes, response headers)."""
+        return self._post("/_dash-update-component", self.body(output, inputs, changed, state), headers)
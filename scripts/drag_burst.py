@@ -0,0 +1,108 @@
+"""
+Server-side work for one fast drag of the year slider.
+
+With ``updatemode="drag"`` and no client debounce, the renderer sends one
+request per intermediate year, and requests for the same callback overlap on
+a threaded server. This script replays such a burst against a local threaded
+server (one browser session, one request every --gap ms) for the year-driven
+callbacks of a tab, once without and once with request coalescing
+(dispatch.py), and reports how many requests were computed, how many were
+abandoned as superseded, and when the last year's figures arrived.
+
+    python scripts/drag_burst.py                      # tab-1, 1960 -> 2020, 10 ms apart
+    python scripts/drag_burst.py --tab tab-3 --years 1990 2020 --gap 5
+    SPESHEET_COALESCE_MS=30 python scripts/drag_burst.py
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+os.environ.setdefault("SPESHEET_RESPONSE_STORE", "")
+
+from dash_client import DashClient  # noqa: E402
+from sweep_count import component_props, dispatched, outputs_of, specs  # noqa: E402
+
+
+def burst(client, deps, page, tab, years, gap):
+    """Fire every dep for every year, ``gap`` seconds apart; returns (statuses, seconds to last year)."""
+    statuses = Counter()
+    done_at = {}
+    lock = threading.Lock()
+
+    def fire(dep, year):
+        inputs = {spec: page.get(spec.split(".")[0], {}).get(spec.split(".")[1])
+                  for spec in specs(dep["inputs"]) + specs(dep["state"])}
+        inputs.update({"tabs.active_tab": tab, "year-slider.value": year})
+        status, _, _ = client.call(outputs_of(dep)[0], inputs, ["year-slider.value"])
+        with lock:
+            statuses[status] += 1
+            if year == years[-1]:
+                done_at[dep["output"]] = time.perf_counter()
+
+    threads = []
+    t0 = time.perf_counter()
+    for year in years:
+        for dep in deps:
+            thread = threading.Thread(target=fire, args=(dep, year))
+            thread.start()
+            threads.append(thread)
+        time.sleep(gap)
+    for thread in threads:
+        thread.join()
+    return statuses, max(done_at.values()) - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tab", default="tab-1")
+    parser.add_argument("--years", type=int, nargs=2, metavar=("FIRST", "LAST"))
+    parser.add_argument("--gap", type=float, default=10, help="ms between drag events")
+    args = parser.parse_args()
+
+    from dash._utils import to_json
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    import main as app_main
+    import charts
+    import dispatch
+    from prepare_data import min_year, max_year
+
+    first, last = args.years or (min_year, max_year)
+    years = list(range(first, last + 1))
+    shell = component_props(json.loads(to_json(app_main.app.layout)))
+    page = dict(shell, **component_props(json.loads(to_json(charts.render_tab_layout(args.tab)))))
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, app_main.server, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    client = DashClient.for_url(base_url, {"Cookie": f"{dispatch.SESSION_COOKIE}=drag-burst"})
+    deps = dispatched(client, "year-slider.value", page)
+
+    print(f"{args.tab}: {len(deps)} year-driven callbacks, {len(years)} years, "
+          f"{args.gap:.0f} ms apart, coalescing window {dispatch.COALESCE_WINDOW * 1000:.0f} ms\n")
+    print(f"{'coalescing':<12}{'requests':>9}{'computed':>10}{'superseded':>12}{'last year (s)':>15}")
+    for enabled in (False, True):
+        dispatch.COALESCE = enabled
+        dispatch.reset_invocations()
+        statuses, last_at = burst(client, deps, page, args.tab, years, args.gap / 1000)
+        report = dispatch.invocation_report().values()
+        superseded = sum(e["superseded"] for e in report)
+        computed = sum(e["calls"] - e["skipped"] - e["superseded"] for e in report)
+        print(f"{'on' if enabled else 'off':<12}{sum(statuses.values()):>9}{computed:>10}"
+              f"{superseded:>12}{last_at:>15.2f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Download the world topology files used by the choropleths into assets/topojson/.
+
+plotly.js otherwise fetches them from its CDN on every first map render. Once
+the files are here, the maps load them from the dashboard server (and the
+static export copies them), see components/geo.py.
+
+    python scripts/fetch_topojson.py [--base-url https://cdn.plot.ly/un/]
+"""
+import argparse
+import os
+import sys
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from components.geo import TOPOJSON_DIR, TOPOJSON_FILES  # noqa: E402
+
+# Default topojsonURL of the plotly.js bundled with plotly 6+/Dash 3+
+DEFAULT_BASE_URL = "https://cdn.plot.ly/un/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    args = parser.parse_args()
+
+    os.makedirs(TOPOJSON_DIR, exist_ok=True)
+    for name in TOPOJSON_FILES:
+        url = args.base_url.rstrip("/") + "/" + name
+        with urllib.request.urlopen(url, timeout=60) as response:
+            payload = response.read()
+        with open(os.path.join(TOPOJSON_DIR, name), "wb") as f:
+            f.write(payload)
+        print(f"{name:<18}{len(payload) / 1024:>8.0f} KB  <- {url}")
+
+
+if __name__ == "__main__":
+    main()
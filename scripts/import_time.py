@@ -0,0 +1,85 @@
+"""
+Import-time check: what each entry point loads before it can serve.
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter
+per entry point and parses the timings from stderr. It prints the slowest
+top-level packages and fails when a module shows up where it should not:
+the data layer (prepare_data, ingest) imports only NumPy / pandas, and the
+app (main) loads Plotly Express on the first modal, not at start-up.
+
+    python scripts/import_time.py             # exit code 1 on a forbidden import
+    python scripts/import_time.py --top 15
+
+The check is on module names, not on seconds, so it gives the same answer
+on any machine; the timings are printed for reference. prepare_data's own
+time is the data loading (see ``python ingest.py`` for its stages).
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry point -> packages it must not import (a package covers its submodules)
+FORBIDDEN = {
+    "ingest": ("dash", "flask", "plotly", "statsmodels"),
+    "prepare_data": ("dash", "flask", "plotly", "statsmodels"),
+    "main": ("plotly.express", "statsmodels"),
+}
+
+
+def import_times(module):
+    """{module name: (self µs, cumulative µs)} of one ``import module`` in a fresh interpreter."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True,
+                            env=dict(os.environ, SPESHEET_INGEST_REPORT=""))
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def forbidden(times, packages):
+    """Modules of ``times`` that belong to one of ``packages``."""
+    return sorted(name for name in times
+                  if any(name == p or name.startswith(p + ".") for p in packages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=list(FORBIDDEN), help="entry points to check")
+    parser.add_argument("--top", type=int, default=8, help="top-level packages listed per entry point")
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        times = import_times(module)
+        total = times.get(module, (0, 0))[1]
+        print(f"\n{module}: {total / 1e6:.2f} s ({len(times)} modules)")
+        # Top-level packages by cumulative time (the largest entry of each)
+        packages = {}
+        for name, (_, cumulative) in times.items():
+            root = name.split(".")[0]
+            if root != module:
+                packages[root] = max(packages.get(root, 0), cumulative)
+        for root, cumulative in sorted(packages.items(), key=lambda kv: -kv[1])[:args.top]:
+            print(f"  {root:<32}{cumulative / 1000:>9.0f} ms")
+
+        bad = forbidden(times, FORBIDDEN.get(module, ()))
+        if bad:
+            failed = True
+            shown = ", ".join(bad[:5]) + (f" (+{len(bad) - 5})" if len(bad) > 5 else "")
+            print(f"  FAIL: imports {shown}")
+        else:
+            print("  ok")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Throughput of the serving modes under concurrent autoplay sessions.
+
+Starts gunicorn once per mode (gunicorn.conf.py: sync, gthread, asgi) with
+the same number of worker processes, then runs --sessions autoplay sessions
+against it at once, spread over the three tabs. On every year tick a session
+sends the tick's callbacks in parallel, as the renderer does, and waits for
+all of them before the next tick (no pause: the server is the bottleneck).
+Every few ticks a session also opens its tab's advanced modal, the slow
+request the cheap lookups would otherwise queue behind.
+
+    python scripts/load_test.py                               # sync, gthread, asgi; 8 sessions
+    python scripts/load_test.py --modes gthread asgi --sessions 16 --workers 2
+    python scripts/load_test.py --url http://127.0.0.1:8050   # an already running server
+
+Background jobs are disabled in the spawned servers so that modals run in
+the request workers.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dash_client import DashClient  # noqa: E402
+from sweep_count import component_props, dispatched, outputs_of, specs  # noqa: E402
+
+TABS = ("tab-1", "tab-2", "tab-3")
+# Request that opens each tab's advanced modal: (output, changed prop, inputs for a year)
+MODALS = {
+    "tab-1": ("modal-advanced-body.children", "modal-advanced.is_open",
+              lambda year: {"selected-country-store.data": None, "year-slider.value": year,
+                            "modal-advanced.is_open": True}),
+    "tab-2": ("modal-advanced-body-gdp.children", "tab2-modal-request.data",
+              lambda year: {"tab2-modal-request.data": {"year": year, "view_mode": "gdp"}}),
+    "tab-3": ("corr-decoupling-graph.figure", "corr-modal-request.data",
+              lambda year: {"corr-modal-request.data": {"year": year, "view_mode": "gdp"}}),
+}
+MODAL_EVERY = 5  # ticks
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(mode, workers):
+    """gunicorn in ``mode`` on a free port; returns (process, base url) once it answers."""
+    port = free_port()
+    env = dict(os.environ, SPESHEET_SERVER=mode, WEB_CONCURRENCY=str(workers),
+               BIND=f"127.0.0.1:{port}", SPESHEET_BACKGROUND="0")
+    process = subprocess.Popen([sys.executable, "-m", "gunicorn"], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn ({mode}) exited with {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                DashClient.for_url(url)
+                return process, url
+        except OSError:
+            time.sleep(0.5)
+    process.kill()
+    raise RuntimeError(f"gunicorn ({mode}) did not start")
+
+
+def tab_pages(client):
+    """{tab: {component id: props}} from the served layout and tab contents."""
+    shell = component_props(json.loads(client.get("/_dash-layout")[1]))
+    pages = {}
+    for tab in TABS:
+        _, body, _ = client.call("tabs-content.children", {"tabs.active_tab": tab}, ["tabs.active_tab"])
+        content = json.loads(body)["response"]["tabs-content"]["children"]
+        pages[tab] = dict(shell, **component_props(content))
+    return pages
+
+
+def autoplay(client, tab, page, years, ticks, latencies, errors):
+    """One session: every year tick on ``tab``.
+
+    Appends (seconds, requests) per tick to ``ticks`` and each request's
+    seconds to ``latencies["lookup"]`` or ``latencies["modal"]``.
+    """
+    deps = dispatched(client, "year-slider.value", page)
+    modal_output = MODALS[tab][0]
+
+    def fire(output, inputs, changed):
+        t0 = time.perf_counter()
+        status, _, _ = client.call(output, inputs, changed)
+        latencies["modal" if output == modal_output else "lookup"].append(time.perf_counter() - t0)
+        if status >= 400:
+            errors.append(status)
+
+    for i, year in enumerate(years):
+        requests = []
+        for dep in deps:
+            inputs = {spec: page.get(spec.split(".")[0], {}).get(spec.split(".")[1])
+                      for spec in specs(dep["inputs"]) + specs(dep["state"])}
+            inputs.update({"tabs.active_tab": tab, "year-slider.value": year})
+            requests.append((outputs_of(dep)[0], inputs, ["year-slider.value"]))
+        if i % MODAL_EVERY == 0:
+            output, changed, modal_inputs = MODALS[tab]
+            requests.append((output, dict(modal_inputs(year), **{"tabs.active_tab": tab}), [changed]))
+
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=fire, args=r) for r in requests]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        ticks.append((time.perf_counter() - t0, len(requests)))
+
+
+def percentile(seconds, q):
+    values = sorted(seconds)
+    return values[round(q / 100 * (len(values) - 1))] * 1000 if values else float("nan")
+
+
+def run(url, sessions, years):
+    """Run ``sessions`` concurrent autoplays; returns a result row."""
+    pages = tab_pages(DashClient.for_url(url))
+    ticks, errors, threads = [], [], []
+    latencies = {"lookup": [], "modal": []}
+    t0 = time.perf_counter()
+    for i in range(sessions):
+        tab = TABS[i % len(TABS)]
+        client = DashClient.for_url(url, {"Cookie": f"spesheet_sid=load-{i}"})
+        thread = threading.Thread(target=autoplay, args=(client, tab, pages[tab], years, ticks, latencies, errors))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - t0
+    return {
+        "requests": sum(n for _, n in ticks),
+        "req/s": sum(n for _, n in ticks) / elapsed,
+        "ticks/s": len(ticks) / elapsed,
+        "tick p50 ms": percentile([t for t, _ in ticks], 50),
+        "lookup p95 ms": percentile(latencies["lookup"], 95),
+        "modal p50 ms": percentile(latencies["modal"], 50),
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["sync", "gthread", "asgi"])
+    parser.add_argument("--url", help="test a running server instead of starting gunicorn")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn worker processes per mode")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--years", type=int, nargs=2, default=(1990, 2020), metavar=("FIRST", "LAST"))
+    args = parser.parse_args()
+    years = list(range(args.years[0], args.years[1] + 1))
+
+    columns = ("requests", "req/s", "ticks/s", "tick p50 ms", "lookup p95 ms", "modal p50 ms", "errors")
+    print(f"{args.sessions} autoplay sessions x {len(years)} years\n")
+    print(f"{'server':<14}" + "".join(f"{c:>14}" for c in columns))
+    targets = [(args.url, None)] if args.url else [(mode, mode) for mode in args.modes]
+    for label, mode in targets:
+        process = None
+        url = label
+        if mode is not None:
+            process, url = start_server(mode, args.workers)
+            label = f"{mode} x{args.workers}"
+        try:
+            row = run(url, args.sessions, years)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+        print(f"{label:<14}" + "".join(
+            f"{row[c]:>14.0f}" if isinstance(row[c], int) or row[c] >= 100 else f"{row[c]:>14.1f}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
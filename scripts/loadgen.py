@@ -0,0 +1,271 @@
+"""
+Headless load generator: scripted dashboard sessions over the Dash protocol.
+
+Each session behaves like a browser tab, without one. It loads the page,
+then on each tab:
+1. autoplays through the years, one tick per auto-stepper interval;
+2. clicks a country on the tab's main graph (map-graph, gdp-map,
+   corr-bubble-graph);
+3. opens the advanced modal, then closes it.
+The Rankings tab has no country click nor modal: only the year ticks.
+A small renderer emulation decides which callbacks each change fires.
+Inputs are the props currently mounted, outputs must be in the page, and
+callback outputs trigger their dependents in turn. Tab contents are
+remounted with their initial calls. Countries are picked from the figures
+the server sent.
+
+    python scripts/loadgen.py                          # 4 sessions on one gthread worker
+    python scripts/loadgen.py --sessions 8 --years 2000 2020
+    python scripts/loadgen.py --ramp 1 2 4 8 16        # sustainable sessions per worker
+    python scripts/loadgen.py --mode asgi --workers 2
+    python scripts/loadgen.py --url http://127.0.0.1:8050
+
+Reports p50/p95/p99 latency per callback and per user event. A load level
+is sustainable when the p95 of a year tick stays within the auto-stepper
+interval, i.e. autoplay keeps its pace, and no request failed. The spawned
+server runs modals inline (SPESHEET_BACKGROUND=0); against --url,
+background callbacks are timed up to their job submission.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dash_client import DashClient  # noqa: E402
+from load_test import start_server  # noqa: E402
+from sweep_count import component_props, outputs_of, specs  # noqa: E402
+
+TABS = ("tab-1", "tab-2", "tab-3", "tab-4")
+# Per tab: (graph clicked, button opening the advanced modal, button closing it)
+SCRIPT = {
+    "tab-1": ("map-graph", None, "close-advanced"),  # a map click opens the modal itself
+    "tab-2": ("gdp-map", "advanced-button-text", "close-advanced-gdp"),
+    "tab-3": ("corr-bubble-graph", "corr-open-advanced-text", "corr-close-advanced"),
+    "tab-4": (None, None, None),  # rankings: year ticks only
+}
+# Callback chains longer than this are cut (the dashboard's deepest is 3)
+MAX_WAVES = 6
+
+
+def percentile(seconds, q):
+    values = sorted(seconds)
+    return values[round(q / 100 * (len(values) - 1))] * 1000 if values else float("nan")
+
+
+def label(dep):
+    outputs = outputs_of(dep)
+    return outputs[0].split("@")[0] + (f" (+{len(outputs) - 1})" if len(outputs) > 1 else "")
+
+
+class Session:
+    """One emulated browser session; latencies go to the shared ``stats``."""
+
+    def __init__(self, client, stats, rng):
+        self.client = client
+        self.stats = stats
+        self.rng = rng
+        self.page = {}
+        self.deps = [d for d in client.dependencies if not d.get("clientside_function")]
+
+    # -- renderer emulation -------------------------------------------------
+    def value(self, spec):
+        component, prop = spec.rsplit(".", 1)
+        return self.page.get(component, {}).get(prop)
+
+    def mounted(self, dep):
+        return all(o.split("@")[0].rsplit(".", 1)[0] in self.page for o in outputs_of(dep))
+
+    def call(self, dep, changed, results):
+        inputs = {s: self.value(s) for s in specs(dep["inputs"]) + specs(dep["state"])}
+        t0 = time.perf_counter()
+        status, body, _ = self.client.call(outputs_of(dep)[0], inputs, changed)
+        self.stats.request(label(dep), time.perf_counter() - t0, status)
+        if status == 200:
+            results.append(json.loads(body).get("response", {}))
+
+    def fire(self, deps, changed):
+        """Fire ``deps`` in parallel; returns (changed "id.prop" specs, newly mounted ids)."""
+        results, threads = [], []
+        for dep in deps:
+            triggers = [s for s in specs(dep["inputs"]) if s in changed]
+            thread = threading.Thread(target=self.call, args=(dep, triggers, results))
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+
+        updated, new = set(), set()
+        for response in results:
+            for component, props in response.items():
+                for prop, value in props.items():
+                    if component == "tabs-content" and prop == "children":
+                        new |= self.mount(value)
+                    elif component in self.page and not (isinstance(value, dict) and "__dash_patch_update" in value):
+                        self.page[component][prop] = value
+                    updated.add(f"{component}.{prop}")
+        return updated, new
+
+    def mount(self, content):
+        """Replace the tab content; returns the ids mounted."""
+        tab_ids = set(self.page) - self.shell_ids
+        for component in tab_ids:
+            del self.page[component]
+        new = component_props(content)
+        self.page.update({k: dict(v) for k, v in new.items()})
+        return set(new)
+
+    def event(self, name, changes, mounted=()):
+        """Apply ``changes`` ({"id.prop": value}) and run the callbacks they trigger.
+
+        Callbacks with an input among the ``mounted`` ids get their initial
+        call, unless they set prevent_initial_call.
+        """
+        t0 = time.perf_counter()
+        for spec, value in changes.items():
+            component, prop = spec.rsplit(".", 1)
+            self.page.setdefault(component, {})[prop] = value
+        changed, new = set(changes), set(mounted)
+        for _ in range(MAX_WAVES):
+            deps = [d for d in self.deps if self.mounted(d) and (
+                any(s in changed for s in specs(d["inputs"]))
+                or not d.get("prevent_initial_call") and any(s.rsplit(".", 1)[0] in new for s in specs(d["inputs"])))]
+            if not deps:
+                break
+            changed, new = self.fire(deps, changed)
+        self.stats.event(name, time.perf_counter() - t0)
+
+    # -- scripted user actions ----------------------------------------------
+    def load(self):
+        layout = json.loads(self.client.get("/_dash-layout")[1])
+        self.page = {k: dict(v) for k, v in component_props(layout).items()}
+        self.shell_ids = set(self.page)
+        self.event("page load", {}, mounted=self.shell_ids)
+
+    def click(self, name, component, prop="n_clicks"):
+        self.event(name, {f"{component}.{prop}": (self.value(f"{component}.{prop}") or 0) + 1})
+
+    def click_point(self, graph):
+        """Click a random point of the figure currently in ``graph``."""
+        figure = self.value(f"{graph}.figure") or {}
+        traces = [t for t in figure.get("data", []) if isinstance(t, dict)]
+        points = []
+        for trace in traces:
+            columns = {k: trace[k] for k in ("locations", "hovertext", "customdata", "text")
+                       if isinstance(trace.get(k), list)}
+            size = min((len(v) for v in columns.values()), default=0)
+            points += [{("location" if k == "locations" else k): v[i] for k, v in columns.items()}
+                       for i in range(size)]
+        if points:
+            self.event("country click", {f"{graph}.clickData": {"points": [self.rng.choice(points)]}})
+
+    def run(self, years, interval):
+        self.load()
+        for tab in TABS:
+            if self.value("tabs.active_tab") != tab:
+                self.event("tab switch", {"tabs.active_tab": tab})
+            for year in years:
+                t0 = time.perf_counter()
+                self.event("year tick", {"year-slider.value": year})
+                time.sleep(max(0.0, interval - (time.perf_counter() - t0)))
+            graph, open_button, close_button = SCRIPT[tab]
+            if graph:
+                self.click_point(graph)
+            if open_button:
+                self.click("modal open", open_button)
+            if close_button:
+                self.click("modal close", close_button)
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = defaultdict(list)
+        self.events = defaultdict(list)
+        self.errors = 0
+
+    def request(self, name, seconds, status):
+        with self.lock:
+            self.requests[name].append(seconds)
+            self.errors += int(status >= 400)
+
+    def event(self, name, seconds):
+        with self.lock:
+            self.events[name].append(seconds)
+
+
+def run_level(url, sessions, years, interval, seed):
+    stats = Stats()
+    threads = []
+    for i in range(sessions):
+        client = DashClient.for_url(url, {"Cookie": f"spesheet_sid=loadgen-{i}"})
+        session = Session(client, stats, random.Random(seed + i))
+        thread = threading.Thread(target=session.run, args=(years, interval))
+        thread.start()
+        threads.append(thread)
+        time.sleep(interval / max(sessions, 1))  # stagger the ticks like independent users
+    for thread in threads:
+        thread.join()
+    return stats
+
+
+def print_table(title, samples):
+    print(f"\n{title:<58}{'n':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, seconds in sorted(samples.items(), key=lambda kv: -percentile(kv[1], 95)):
+        print(f"{name[:57]:<58}{len(seconds):>6}" + "".join(f"{percentile(seconds, q):>9.0f}" for q in (50, 95, 99)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="run against a running server instead of starting gunicorn")
+    parser.add_argument("--mode", default="gthread", help="gunicorn.conf.py SPESHEET_SERVER for the spawned server")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--ramp", type=int, nargs="+", help="session counts to try in turn")
+    parser.add_argument("--years", type=int, nargs=2, default=(2000, 2020), metavar=("FIRST", "LAST"))
+    parser.add_argument("--interval", type=float, help="seconds per autoplay tick (default: the auto-stepper's)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    years = list(range(args.years[0], args.years[1] + 1))
+
+    process, url = (None, args.url) if args.url else start_server(args.mode, args.workers)
+    try:
+        interval = args.interval
+        if interval is None:
+            probe = Session(DashClient.for_url(url), Stats(), random.Random(args.seed))
+            probe.load()
+            interval = probe.value("auto-stepper.interval") / 1000
+        workers = 1 if args.url else args.workers
+        target = args.url or f"{args.mode} x{workers}"
+        print(f"{target}: {len(years)} years per tab, {interval * 1000:.0f} ms per tick")
+
+        if not args.ramp:
+            stats = run_level(url, args.sessions, years, interval, args.seed)
+            print_table(f"callback ({args.sessions} sessions)", stats.requests)
+            print_table("user event", stats.events)
+            print(f"\nerrors: {stats.errors}")
+            return
+
+        print(f"\n{'sessions':>8}{'tick p50':>10}{'tick p95':>10}{'tick p99':>10}{'errors':>8}  keeps pace")
+        sustainable = 0
+        for sessions in args.ramp:
+            stats = run_level(url, sessions, years, interval, args.seed)
+            ticks = stats.events["year tick"]
+            ok = percentile(ticks, 95) <= interval * 1000 and stats.errors == 0
+            sustainable = sessions if ok else sustainable
+            print(f"{sessions:>8}" + "".join(f"{percentile(ticks, q):>10.0f}" for q in (50, 95, 99))
+                  + f"{stats.errors:>8}  {'yes' if ok else 'no'}")
+        print(f"\nsustainable: {sustainable} sessions ({sustainable / workers:.1f} per worker)")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Payload-size report per callback for a typical browsing session.
+
+Replays tab loads, view toggles and a run of year ticks on every tab through
+the callback protocol (Flask test client, gzip/br accepted like a browser)
+and prints metrics.format_payload_report().
+
+    python scripts/payload_report.py             # typed arrays (default)
+    python scripts/payload_report.py --plain     # plain JSON lists, for comparison
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+# Measure live rendering, not a previously built response store
+os.environ["SPESHEET_RESPONSE_STORE"] = ""
+
+from dash_client import DashClient  # noqa: E402
+
+
+def session(years):
+    """(output, inputs, changed) tuples covering every year-driven callback."""
+    steps = []
+    for tab in ("tab-1", "tab-2", "tab-3", "tab-4"):
+        for i, year in enumerate(years):
+            changed = ["tabs.active_tab"] if i == 0 else ["year-slider.value"]
+            base = {"tabs.active_tab": tab, "year-slider.value": year}
+            if tab == "tab-1":
+                steps += [("map-graph.figure", base, changed),
+                          ("treemap-graph.figure", base, changed),
+                          ("stats-container.children", base, changed)]
+            elif tab == "tab-2":
+                for mode in ("gdp", "life"):
+                    inputs = dict(base, **{"gdp-view.value": "total", "tab2-view-mode-store.data": mode})
+                    steps += [("gdp-map.figure", inputs, changed),
+                              ("gdp-stats-container.children", inputs, changed),
+                              ("gdp-country-lines.figure", inputs, changed)]
+                steps.append(("tab2-continental-chart-container.children",
+                              dict(base, **{"tab2-view-mode-store.data": "life"}), changed))
+            elif tab == "tab-3":
+                for mode in ("gdp", "life"):
+                    inputs = dict(base, **{"tab3-view-mode-store.data": mode})
+                    steps.append(("corr-bubble-graph.figure", inputs, changed))
+            else:
+                inputs = dict(base, **{"rank-metric.value": "totals", "rank-top.value": 10})
+                steps.append(("rank-bump-graph.figure", inputs, changed))
+    return steps
+
+
+def stores(body, headers):
+    """{"id.data": value} of the dcc.Store outputs in a (compressed) callback response."""
+    encoding = headers.get("Content-Encoding")
+    if encoding == "br":
+        import brotli
+        body = brotli.decompress(body)
+    elif encoding == "gzip":
+        body = gzip.decompress(body)
+    response = json.loads(body).get("response", {}) if body else {}
+    return {f"{component}.data": props["data"] for component, props in response.items() if "data" in props}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plain", action="store_true", help="disable typed-array encoding")
+    parser.add_argument("--years", type=int, nargs="*", default=[2000, 2001, 2002, 2003, 2004])
+    args = parser.parse_args()
+
+    import figures
+    figures.COMPACT_ARRAYS = not args.plain
+
+    import main as app_main
+    import metrics
+
+    client = DashClient.for_app(app_main.app, headers={"Accept-Encoding": "br, gzip"})
+    metrics.reset_payloads()
+    # Store values the browser would hold (e.g. the figure keys that allow a Patch)
+    held = {}
+    for output, inputs, changed in session(args.years):
+        status, body, headers = client.call(output, inputs, changed, state=held)
+        if status == 200:
+            held.update(stores(body, headers))
+        elif status != 204:
+            print(f"{output}: HTTP {status}")
+
+    print(metrics.format_payload_report())
+    report = metrics.payload_report()
+    raw = sum(e["raw_bytes"] for e in report.values())
+    sent = sum(e["sent_bytes"] for e in report.values())
+    print(f"\nsession total: {raw / 1024:.0f} KB raw, {sent / 1024:.0f} KB sent")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Callback invocations for one autoplay sweep on every tab.
+
+Emulates what the Dash renderer dispatches: on each year tick, every callback
+with ``year-slider.value`` as Input whose outputs are all in the mounted page
+(app shell + active tab); on each tab switch, the callbacks with
+``tabs.active_tab`` as Input while the previous tab is still mounted. Input
+values come from the layouts' initial props. Requests go through the Flask
+test client (no server needed); callbacks that did no work answer HTTP 204.
+
+It is also the check that hidden tabs do not compute: on every tab, the
+year-driven callbacks of the other tabs are fired as well (as a stale
+component of a hidden tab would) and must all answer 204. The script exits
+with code 1 when one of them did work.
+
+    python scripts/sweep_count.py                 # full year range, all tabs
+    python scripts/sweep_count.py --years 1990 2000
+
+Run it on an older checkout to compare before/after a change.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+os.environ.setdefault("SPESHEET_RESPONSE_STORE", "")
+
+from dash_client import DashClient  # noqa: E402
+
+TABS = ("tab-1", "tab-2", "tab-3", "tab-4")
+
+
+def component_props(layout_json, props=None):
+    """{component id: props} for every component with a string id."""
+    props = {} if props is None else props
+    if isinstance(layout_json, list):
+        for child in layout_json:
+            component_props(child, props)
+    elif isinstance(layout_json, dict) and "props" in layout_json:
+        node_props = layout_json["props"]
+        if isinstance(node_props.get("id"), str):
+            props[node_props["id"]] = node_props
+        for value in node_props.values():
+            if isinstance(value, (list, dict)):
+                component_props(value, props)
+    return props
+
+
+def specs(dep_specs):
+    return [f"{s['id']}.{s['property']}" for s in dep_specs]
+
+
+def outputs_of(dep):
+    return dep["output"].strip(".").split("...")
+
+
+def dispatched(client, trigger, mounted):
+    """Dependencies the renderer fires when ``trigger`` changes on a page with ``mounted`` ids."""
+    return [dep for dep in client.dependencies
+            if trigger in specs(dep["inputs"])
+            and all(o.rsplit(".", 1)[0] in mounted for o in outputs_of(dep))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, nargs=2, metavar=("FIRST", "LAST"))
+    args = parser.parse_args()
+
+    from dash._utils import to_json
+    import main as app_main
+    import charts
+    from prepare_data import min_year, max_year
+
+    first, last = args.years or (min_year, max_year)
+    shell = component_props(json.loads(to_json(app_main.app.layout)))
+    pages = {tab: dict(shell, **component_props(json.loads(to_json(charts.render_tab_layout(tab)))))
+             for tab in TABS}
+
+    client = DashClient.for_app(app_main.app)
+    counts = defaultdict(lambda: {"requests": 0, "no_work": 0, "bytes": 0})
+    hidden_work = []  # (active tab, output) of hidden-tab callbacks that computed
+
+    def fire(dep, page, values, changed, record=True):
+        inputs = {spec: page.get(spec.split(".")[0], {}).get(spec.split(".")[1]) for spec in
+                  specs(dep["inputs"]) + specs(dep["state"])}
+        inputs.update(values)
+        status, body, _ = client.call(outputs_of(dep)[0], inputs, [changed])
+        if record:
+            entry = counts[dep["output"]]
+            entry["requests"] += 1
+            entry["no_work"] += int(status == 204)
+            entry["bytes"] += len(body)
+        return status
+
+    t0 = time.perf_counter()
+    previous = None
+    for tab in TABS:
+        # Tab switch: callbacks listening to active_tab while the old page is still mounted
+        if previous is not None:
+            for dep in dispatched(client, "tabs.active_tab", pages[previous]):
+                fire(dep, pages[previous], {"tabs.active_tab": tab, "year-slider.value": last}, "tabs.active_tab")
+        previous = tab
+
+        # Autoplay sweep: the stepper moves the slider, then every year-driven callback fires
+        for year in range(first, last + 1):
+            values = {"tabs.active_tab": tab, "year-slider.value": year}
+            for dep in dispatched(client, "year-slider.value", pages[tab]):
+                fire(dep, pages[tab], values, "year-slider.value")
+
+        # Hidden tabs: their year-driven callbacks must not compute while ``tab`` is active
+        shell_deps = {dep["output"] for dep in dispatched(client, "year-slider.value", shell)}
+        for other in TABS:
+            if other == tab:
+                continue
+            for dep in dispatched(client, "year-slider.value", pages[other]):
+                if dep["output"] in shell_deps:
+                    continue
+                values = {"tabs.active_tab": tab, "year-slider.value": last}
+                if fire(dep, pages[other], values, "year-slider.value", record=False) != 204:
+                    hidden_work.append((tab, dep["output"]))
+
+    print(f"{'callback output':<60}{'requests':>9}{'no work':>9}{'KB':>9}")
+    for key, e in sorted(counts.items(), key=lambda kv: -kv[1]["requests"]):
+        label = key if len(key) <= 58 else key[:55] + "..."
+        print(f"{label:<60}{e['requests']:>9}{e['no_work']:>9}{e['bytes'] / 1024:>9.0f}")
+    total = {k: sum(e[k] for e in counts.values()) for k in ("requests", "no_work", "bytes")}
+    print(f"\nsweep {first}-{last} x {len(TABS)} tabs: {total['requests']} requests, "
+          f"{total['requests'] - total['no_work']} did work, {total['bytes'] / 1024:.0f} KB, "
+          f"{time.perf_counter() - t0:.1f}s")
+
+    import dispatch
+    report = dispatch.invocation_report()
+    if report:
+        print(f"\n{'tab callback':<50}{'calls':>7}{'skipped':>9}{'superseded':>12}")
+        for name, e in sorted(report.items()):
+            print(f"{name:<50}{e['calls']:>7}{e['skipped']:>9}{e['superseded']:>12}")
+
+    if hidden_work:
+        print(f"\nFAIL: {len(hidden_work)} hidden-tab callbacks computed:")
+        for tab, output in sorted(set(hidden_work)):
+            print(f"  {output} (active: {tab})")
+        sys.exit(1)
+    print("\nok: no hidden-tab callback computed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+/*
+ * Client runtime for the static export (see export_static.py).
+ *
+ * window.SPESHEET holds the tab manifest: bindings (renderer -> DOM ids),
+ * UI wiring (toggles, clicks, modals) and the entries embedded in the page.
+ * Every other output is read from the JSON shards next to this page.
+ */
+(function () {
+  "use strict";
+
+  const M = window.SPESHEET;
+  const UI = M.ui || {};
+  const params = new URLSearchParams(window.location.search);
+
+  const state = {
+    year: Number(params.get("year")) || M.max_year,
+    gdp_view: "total", tab2_avg: "mean", tab2_trend: "raw", tab3_trend: "raw",
+    tab2_mode: params.get("tab2_mode") || "gdp",
+    tab3_mode: params.get("tab3_mode") || "gdp",
+    rank_metric: "totals", rank_top: 10,
+    iso1: null, iso2: null, iso3: null,
+  };
+  const openModals = new Set();
+  const shards = new Map();
+  let refreshSeq = 0;
+
+  // ---------------------------------------------------------------------------
+  // Shards and keys (key() mirrors shard_key() in export_static.py)
+  // ---------------------------------------------------------------------------
+
+  function key(name, values) {
+    return [name].concat(values.map(v => (v === null || v === undefined ? "None" : String(v)))).join("|");
+  }
+
+  function load(url) {
+    if (!shards.has(url)) {
+      shards.set(url, fetch(url).then(r => (r.ok ? r.json() : {})).catch(() => ({})));
+    }
+    return shards.get(url);
+  }
+
+  function nearest(years, year) {
+    return years.reduce((best, y) => (Math.abs(y - year) < Math.abs(best - year) ? y : best), years[0]);
+  }
+
+  function isActive(b) {
+    if (b.shard === "modal" && openModals.size === 0) return false;
+    return Object.entries(b.when || {}).every(([k, v]) => state[k] === v);
+  }
+
+  async function resolve(b) {
+    const country = b.country_arg ? state[b.country_arg] : null;
+    if (country !== null && country !== undefined) {
+      const year = b.country_year === "fixed" ? M.max_year
+        : b.country_year === "nearest" ? nearest(M.country_years, state.year) : null;
+      const values = b.args.map(a => (a === "year" && year !== null ? year : state[a]));
+      const shard = await load(`data/country/${country}.json`);
+      return { entries: shard[key(b.name, values)], markerYear: b.country_year === "fixed" ? year : null };
+    }
+    const values = b.args.map(a => state[a]);
+    if (b.shard === "static") return { entries: M.static[key(b.name, values)] };
+    const suffix = b.shard === "modal" ? ".modal.json" : ".json";
+    const shard = await load(`${M.data_dir}/${state.year}${suffix}`);
+    return { entries: shard[key(b.name, values)] };
+  }
+
+  // ---------------------------------------------------------------------------
+  // Rendering
+  // ---------------------------------------------------------------------------
+
+  function moveYearMarker(fig, fromYear) {
+    (fig.layout.shapes || []).forEach(s => {
+      if (s.type === "line" && s.x0 === fromYear && s.x1 === fromYear) { s.x0 = state.year; s.x1 = state.year; }
+    });
+  }
+
+  const TYPED_ARRAYS = {
+    i1: Int8Array, u1: Uint8Array, i2: Int16Array, u2: Uint16Array,
+    i4: Int32Array, u4: Uint32Array, f4: Float32Array, f8: Float64Array,
+  };
+
+  // Decode a {"dtype", "bdata"} typed array spec (see figures.typed_array)
+  function decode(values) {
+    if (!values || !values.bdata) return values;
+    const bin = atob(values.bdata);
+    const bytes = new Uint8Array(bin.length);
+    for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+    return new TYPED_ARRAYS[values.dtype](bytes.buffer);
+  }
+
+  // Same logic as fill_selection_ring() in tabs/tab3.py: the ring is the last trace
+  function fillRing(fig, iso) {
+    const ring = fig.data[fig.data.length - 1];
+    if (!iso || !ring || fig.data.length < 3) return;
+    for (const trace of fig.data.slice(0, -2)) {
+      const i = (trace.customdata || []).findIndex(c => c[0] === iso);
+      if (i >= 0) { ring.x = [decode(trace.x)[i]]; ring.y = [decode(trace.y)[i]]; return; }
+    }
+  }
+
+  function plot(el, fig) {
+    Plotly.react(el, fig.data, fig.layout, Object.assign({ responsive: true }, M.plot_config));
+    bindClicks(el);
+  }
+
+  function apply(id, entry, b, markerYear) {
+    const el = document.getElementById(id);
+    if (!el) return;
+    // Shard entries are shared objects: the same entry means nothing changed
+    if (entry && el.spesheetEntry === entry && !b.ring && markerYear == null) return;
+    el.spesheetEntry = entry;
+    if (!entry) {
+      if (el.classList.contains("js-graph")) Plotly.purge(el); else el.innerHTML = "";
+      return;
+    }
+    if (entry.figure) {
+      const fig = JSON.parse(JSON.stringify(entry.figure));
+      if (markerYear !== null && markerYear !== undefined) moveYearMarker(fig, markerYear);
+      if (b.ring) fillRing(fig, state[b.ring]);
+      plot(el, fig);
+      return;
+    }
+    el.innerHTML = entry.html;
+    el.querySelectorAll("[data-figure]").forEach(g => {
+      if (g.dataset.figure !== "") plot(g, entry.figures[Number(g.dataset.figure)]);
+    });
+  }
+
+  // A constraint whose ``when`` matches the state hides its controls and forces its values
+  function matches(rule) {
+    return Object.entries(rule.when).every(([k, v]) => state[k] === v);
+  }
+
+  function applyConstraints() {
+    (UI.constraints || []).filter(matches).forEach(rule => Object.assign(state, rule.set || {}));
+  }
+
+  async function refresh() {
+    applyConstraints();
+    const seq = ++refreshSeq;
+    const active = M.bindings.filter(isActive);
+    const results = await Promise.all(active.map(resolve));
+    if (seq !== refreshSeq) return;  // a newer refresh superseded this one
+
+    const filled = new Set();
+    active.forEach((b, i) => {
+      const { entries, markerYear } = results[i];
+      b.outputs.forEach((id, j) => { apply(id, entries ? entries[j] : null, b, markerYear); filled.add(id); });
+    });
+    // Outputs of inactive bindings are cleared (e.g. continental chart in GDP mode)
+    M.bindings.filter(b => !isActive(b) && b.shard !== "modal").forEach(b => {
+      b.outputs.forEach(id => { if (!filled.has(id)) apply(id, null, b); });
+    });
+    updateControls();
+
+    // Prefetch the next year while playing
+    if (playTimer) load(`${M.data_dir}/${nextYear()}.json`);
+  }
+
+  // ---------------------------------------------------------------------------
+  // Controls: slider, play, modes, radios, clicks, modals
+  // ---------------------------------------------------------------------------
+
+  const slider = document.getElementById("year-slider");
+  const playButton = document.getElementById("play-button");
+  let playTimer = null;
+
+  function nextYear() {
+    return state.year < M.max_year ? state.year + 1 : M.min_year;
+  }
+
+  function setState(changes) {
+    Object.assign(state, changes);
+    refresh();
+  }
+
+  function updateControls() {
+    if (slider) slider.value = state.year;
+    document.querySelectorAll("[data-year-label]").forEach(el => { el.textContent = state.year; });
+    (UI.modes || []).forEach(mode => {
+      Object.entries(mode.buttons).forEach(([value, id]) => {
+        const btn = document.getElementById(id);
+        if (!btn) return;
+        btn.classList.toggle("btn-primary", state[mode.key] === value);
+        btn.classList.toggle("btn-outline-primary", state[mode.key] !== value);
+      });
+      Object.entries(mode.show).forEach(([value, ids]) => ids.forEach(id => {
+        const el = document.getElementById(id);
+        if (el) el.style.display = state[mode.key] === value ? "" : "none";
+      }));
+    });
+    (UI.constraints || []).forEach(rule => (rule.hide || []).forEach(id => {
+      const el = document.getElementById(id);
+      if (el) el.style.display = matches(rule) ? "none" : "";
+    }));
+    Object.entries(UI.radios || {}).forEach(([id, stateKey]) => {
+      document.querySelectorAll(`#${id} input[type=radio]`).forEach(input => {
+        input.checked = input.value === String(state[stateKey]);
+      });
+    });
+    document.querySelectorAll("[data-tab-link]").forEach(a => {
+      const url = new URL(a.getAttribute("href").split("?")[0], window.location.href);
+      ["year", "tab2_mode", "tab3_mode"].forEach(k => url.searchParams.set(k, state[k]));
+      a.href = url.pathname.split("/").pop() + url.search;
+    });
+  }
+
+  function setPlaying(playing) {
+    clearInterval(playTimer);
+    playTimer = playing ? setInterval(() => setState({ year: nextYear() }), 1000) : null;
+    if (playButton) playButton.textContent = playing ? "⏸ Pause" : "▶ Play";
+  }
+
+  function setModal(id, open) {
+    const modal = document.getElementById(id);
+    if (!modal) return;
+    modal.classList.toggle("show", open);
+    modal.style.display = open ? "block" : "none";
+    if (open) openModals.add(id); else openModals.delete(id);
+    document.body.classList.toggle("modal-open", openModals.size > 0);
+    let backdrop = document.querySelector(".modal-backdrop");
+    if (openModals.size > 0 && !backdrop) {
+      backdrop = document.createElement("div");
+      backdrop.className = "modal-backdrop fade show";
+      document.body.appendChild(backdrop);
+    } else if (openModals.size === 0 && backdrop) {
+      backdrop.remove();
+    }
+    if (open) refresh();
+  }
+
+  function pick(point, path) {
+    return path.split(".").reduce((v, k) => (v === null || v === undefined ? v : v[k]), point);
+  }
+
+  function bindClicks(el) {
+    const spec = (UI.clicks || []).find(c => c.graph === el.id);
+    if (!spec || el.dataset.clickBound) return;
+    el.dataset.clickBound = "1";
+    el.on("plotly_click", ev => {
+      const point = ev.points && ev.points[0];
+      if (!point) return;
+      const changes = {};
+      Object.entries(spec.set).forEach(([k, path]) => { changes[k] = pick(point, path); });
+      setState(changes);
+      if (spec.open) setModal(spec.open, true);
+    });
+  }
+
+  if (slider) slider.addEventListener("input", () => setState({ year: Number(slider.value) }));
+  if (playButton) playButton.addEventListener("click", () => setPlaying(!playTimer));
+
+  (UI.modes || []).forEach(mode => Object.entries(mode.buttons).forEach(([value, id]) => {
+    const btn = document.getElementById(id);
+    if (btn) btn.addEventListener("click", () => setState({ [mode.key]: value }));
+  }));
+
+  Object.entries(UI.radios || {}).forEach(([id, stateKey]) => {
+    document.querySelectorAll(`#${id} input[type=radio]`).forEach(input => {
+      input.addEventListener("change", () => { if (input.checked) setState({ [stateKey]: input.value }); });
+    });
+  });
+
+  (UI.buttons || []).forEach(spec => {
+    const btn = document.getElementById(spec.id);
+    if (!btn) return;
+    btn.addEventListener("click", () => {
+      if (spec.set) Object.assign(state, spec.set);
+      if (spec.open) setModal(spec.open, true); else refresh();
+    });
+  });
+
+  Object.entries(UI.modals || {}).forEach(([id, closeIds]) => {
+    const modal = document.getElementById(id);
+    closeIds.forEach(closeId => {
+      const btn = document.getElementById(closeId);
+      if (btn) btn.addEventListener("click", () => setModal(id, false));
+    });
+    if (modal) modal.querySelectorAll("[data-modal-close]").forEach(btn => {
+      btn.addEventListener("click", () => setModal(id, false));
+    });
+  });
+
+  // The dashboard starts playing on load (play-button starts with n_clicks=1)
+  setPlaying(true);
+  refresh();
+})();
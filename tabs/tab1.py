@@ -1,10 +1,14 @@
-from dash import html, dcc, callback, Input, Output, State, callback_context as ctx
+from dash import html, dcc, callback, Input, Output, State, no_update, callback_context as ctx
 import dash_bootstrap_components as dbc
-import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
-from prepare_data import df_totals, df_capita, df_sectors
-from components import controls
+from prepare_data import (df_totals, df_sectors, YEARS, TAB1_MAP_LOCATIONS, YEAR_RANKINGS, REGION_CUBE,
+                          AVERAGE_STATS, SERIES_PANELS, TRENDS, CAGR_YEARS, country_name, country_series,
+                          on_map_locations)
+from components import controls, geo
+from response_store import precomputed
+from dispatch import tab_callback
+import figures
 
 def layout():
     """
@@ -32,7 +36,7 @@ def layout():
                     ], className="text-muted small mb-2"),
                     
                     # The primary interactive map
-                    dcc.Graph(id='map-graph'),
+                    dcc.Graph(id='map-graph', config=geo.graph_config()),
                     
                     # Global status button triggers analysis when no country is clicked
                     dbc.Button("Global Analysis", id="reset-global-btn", n_clicks=0, color="primary", className="w-100 mt-2 shadow-sm", size="sm"),
@@ -63,39 +67,55 @@ def layout():
         # --- STATE MANAGEMENT ---
         # Store for maintaining the selected country identification (Name or ISO)
         dcc.Store(id='selected-country-store', data=None),
+        # Key of the full figure each graph holds (see figures.patch_or_full)
+        dcc.Store(id='map-graph-key', data=None),
+        dcc.Store(id='treemap-graph-key', data=None),
     ])
 
 
 # -----------------------------------------------------------------------------
 # 1. CALLBACK: GLOBAL MAP UPDATE
 # -----------------------------------------------------------------------------
-@callback(
+@tab_callback(
+    'tab-1',
     Output('map-graph', 'figure'),
-    Input('tabs', 'active_tab'),
-    Input('year-slider', 'value')
+    Output('map-graph-key', 'data'),
+    Input('year-slider', 'value'),
+    State('map-graph-key', 'data')
 )
-def update_map(tab, selected_year):
+def update_map(selected_year, held_key):
     """
     Updates the choropleth map based on the year slider.
     Only executes if Tab 1 is active.
     """
-    if tab != 'tab-1' or selected_year is None:
-        return go.Figure()
-    
-    # Filter data for the specific temporal snapshot
-    dff = df_totals[df_totals['Year'] == selected_year]
-    
+    if selected_year is None:
+        return go.Figure(), None
+
+    fig = render_map(selected_year)
+
+    # Year tick on an existing map: locations are fixed, only z travels
+    return figures.patch_or_full(fig, "tab1.map", held_key, ctx.triggered_id == 'year-slider', attrs=("z",))
+
+
+geo.register_zoom_resolution('map-graph')
+
+
+@precomputed("tab1.map", year=YEARS)
+def render_map(selected_year):
+    """Full choropleth of total emissions for one year (served from the response store when built)."""
+    # Filter data for the specific temporal snapshot, on the fixed location list
+    dff = on_map_locations(df_totals[df_totals['Year'] == selected_year], TAB1_MAP_LOCATIONS, ["Value"])
+
     # Generate the map using Viridis scale (standard for visibility)
-    fig_map = px.choropleth(
-        dff, locations="ISOcode", color="Value", hover_name="Country",
-        color_continuous_scale="Viridis", height=450 # Adjusted to match Tab 2
-    )
-    fig_map.update_layout(
-        margin={"r":0,"t":25,"l":0,"b":0}, 
-        transition_duration=100,
-        coloraxis_colorbar=dict(title="CO2 (Mt)", thickness=15, len=0.8)
+    return figures.choropleth(
+        dff["ISOcode"].to_numpy(), dff["Value"].to_numpy(), dff["Country"].to_numpy(),
+        colorscale_name="Viridis",
+        colorbar=dict(title=dict(text="CO2 (Mt)"), thickness=15, len=0.8),
+        precision={"z": 2},
+        height=450, # Adjusted to match Tab 2
+        margin={"r":0,"t":25,"l":0,"b":0},
+        transition={"duration": 100},
     )
-    return fig_map
 
 # -----------------------------------------------------------------------------
 # 2. CALLBACK: COUNTRY SELECTION MANAGEMENT
@@ -115,9 +135,9 @@ def update_country_store(clickData, n_clicks):
     if ctx.triggered_id == 'reset-global-btn':
         return None
     
-    # Retrieve country name from hovertext metadata in clickData
+    # The map's locations are ISO codes; names are looked up when rendering
     if clickData and 'points' in clickData:
-        return clickData['points'][0]['hovertext']
+        return clickData['points'][0].get('location')
     return None
 
 # -----------------------------------------------------------------------------
@@ -153,74 +173,112 @@ def toggle_advanced_modal(country_selected, n_global, n_close, is_open):
         
     return is_open
 
-@callback(
+@tab_callback(
+    'tab-1',
     Output('treemap-graph', 'figure'),
-    Input('tabs', 'active_tab'),
-    Input('year-slider', 'value')
+    Output('treemap-graph-key', 'data'),
+    Input('year-slider', 'value'),
+    State('treemap-graph-key', 'data')
 )
-def update_treemap(tab, selected_year):
+def update_treemap(selected_year, held_key):
     """
     Generates the regional distribution treemap for the current year.
     Uses uirevision to preserve zoom/path state across year changes.
     """
-    if tab != 'tab-1' or selected_year is None:
-        return go.Figure()
+    if selected_year is None:
+        return go.Figure(), None
 
-    dff_now = df_totals[df_totals['Year'] == selected_year].copy()
-    
-    fig_tree = px.treemap(
-        dff_now, path=[px.Constant("World"), 'Continent', 'Country'],
-        values='Value', color='Continent',
-        hover_data={'Value': ':,.2f Mt'},
-        height=420
-    )
-    fig_tree.update_layout(
+    fig = render_treemap(selected_year)
+
+    # Year tick: replace the node arrays only (uirevision keeps the zoom path)
+    return figures.patch_or_full(fig, "tab1.treemap", held_key, ctx.triggered_id == 'year-slider')
+
+
+@precomputed("tab1.treemap", year=YEARS)
+def render_treemap(selected_year):
+    """Full World -> Continent -> Country treemap for one year."""
+    dff_now = df_totals[df_totals['Year'] == selected_year]
+
+    # World -> Continent -> Country hierarchy (continent totals via one bincount)
+    nodes = figures.treemap_hierarchy(dff_now['Country'], dff_now['Continent'], dff_now['Value'])
+
+    return figures.treemap(
+        nodes["ids"], nodes["labels"], nodes["parents"], nodes["values"],
+        colors=figures.group_colors(nodes["group"]),
+        hovertemplate="labels=%{label}<br>Value=%{value:,.2f} Mt<br>parent=%{parent}<br>id=%{id}<extra></extra>",
+        template_name='plotly_white',
+        precision={"values": 2},
+        height=420,
         margin={"r":5,"t":5,"l":5,"b":5},
-        template='plotly_white',
         uirevision='constant' # Maintains zoom/path state
     )
-    return fig_tree
 
 # -----------------------------------------------------------------------------
 # 5. CALLBACK: ADVANCED MODAL CONTENT (DEEP ANALYSIS)
 # -----------------------------------------------------------------------------
-@callback(
+@tab_callback(
+    'tab-1',
     Output("modal-advanced-body", "children"),
     Input("selected-country-store", "data"),
-    Input('year-slider', 'value')
+    Input('year-slider', 'value'),
+    Input("modal-advanced", "is_open")
 )
-def update_advanced_modal(country_selected, selected_year):
+def update_advanced_modal(iso_selected, selected_year, is_open):
     """
     Renders complex analytical content for the modal:
     Historical per capita trends, sectoral breakdowns, and radar profile benchmarking.
+    Only rendered while the modal is open (opening it triggers the render).
     """
-    # Baseline data preparation
-    dff_now = df_totals[df_totals['Year'] == selected_year].copy()
-    df_1970 = df_totals[df_totals['Year'] == 1970][['Country', 'Value']].rename(columns={'Value': 'Value_1970'})
+    if not is_open:
+        return no_update
+    return render_advanced_modal(iso_selected, selected_year)
+
+
+# The global view (no country selected) is precomputed for every year;
+# country selections are rendered live.
+@precomputed("tab1.modal", iso=(None,), year=YEARS)
+def render_advanced_modal(iso_selected, selected_year):
+    """Modal body for one country ISO code (or the global view when None) and year."""
+    import plotly.express as px  # loaded on the first modal, not at start-up
+    # Baseline data preparation (countries are keyed by ISO code throughout)
+    dff_now = df_totals[df_totals['Year'] == selected_year]
+    df_1970 = df_totals[df_totals['Year'] == 1970][['ISOcode', 'Value']].rename(columns={'Value': 'Value_1970'})
     
     # Cumulative calculation (Historical Debt)
-    df_cumulative_sum = df_totals[df_totals['Year'] <= selected_year].groupby('Country')['Value'].sum().reset_index()
-    df_cumulative_sum.columns = ['Country', 'Cumulative_Debt']
+    df_cumulative_sum = df_totals[df_totals['Year'] <= selected_year].groupby('ISOcode')['Value'].sum().reset_index()
+    df_cumulative_sum.columns = ['ISOcode', 'Cumulative_Debt']
 
-    if country_selected:
+    country_selected = country_name(iso_selected) if iso_selected else None
+    if iso_selected:
         # Historical Intensity (per person)
-        df_capita_sel = df_capita[df_capita['Country'] == country_selected]
-        fig_capita = px.line(df_capita_sel, x='Year', y='Value', title=f"CO2 per Capita: {country_selected}")
+        df_capita_sel = country_series("capita", iso_selected)
+        cagr = SERIES_PANELS["capita"].at(iso_selected, "cagr", [selected_year])[0]
+        cagr_text = f" ({CAGR_YEARS}-yr CAGR {cagr:+.1f}%)" if pd.notnull(cagr) else ""
+        fig_capita = px.line(df_capita_sel, x='Year', y='Value', title=f"CO2 per Capita: {country_selected}{cagr_text}")
+        # Smoothed trend over the raw line (precomputed rolling mean)
+        trend_years, trend_values = SERIES_PANELS["capita"].series(iso_selected, "rolling")
+        fig_capita.add_scatter(x=trend_years, y=trend_values, mode="lines", name=TRENDS["rolling"],
+                               line=dict(color="gray", dash="dash", width=2), showlegend=False)
         
         # Sectoral distribution
-        df_sectors_sel = df_sectors[(df_sectors['Country'] == country_selected) & (df_sectors['Year'] == selected_year)]
+        df_s_hist = country_series("sectors", iso_selected)
+        df_sectors_sel = df_s_hist[df_s_hist['Year'] == selected_year]
         fig_pie = px.pie(df_sectors_sel, names='Sector', values='Value', title=f"Sectors: {country_selected}", hole=0.4)
         
         # Structural evolution over time
-        df_s_hist = df_sectors[df_sectors['Country'] == country_selected].sort_values('Year')
         fig_area = px.area(df_s_hist, x="Year", y="Value", color="Sector", title="Sector Evolution")
         
         radar_title = f"Top 5 vs {country_selected} (Normalized)"
-        target_radar = country_selected
+        target_radar = iso_selected
     else:
-        # World Avg per Capita
-        df_capita_world = df_capita.groupby('Year')['Value'].mean().reset_index()
-        fig_capita = px.line(df_capita_world, x='Year', y='Value', title="World Average CO2 per Capita")
+        # World Avg per Capita: simple and population-weighted means (precomputed)
+        df_capita_world = pd.concat(
+            [pd.DataFrame({"Year": years, "Value": values, "Average": AVERAGE_STATS[stat]})
+             for stat in AVERAGE_STATS for years, values in [REGION_CUBE.world("capita", stat)]])
+        fig_capita = px.line(df_capita_world, x='Year', y='Value', color='Average',
+                             title="World Average CO2 per Capita")
+        fig_capita.update_layout(legend=dict(title_text="", orientation="h", yanchor="top", y=0.99,
+                                             xanchor="right", x=0.99, font=dict(size=9)))
         
         # Global Sector Sum
         df_sectors_world = df_sectors[df_sectors['Year'] == selected_year].groupby('Sector')['Value'].sum().reset_index()
@@ -231,7 +289,7 @@ def update_advanced_modal(country_selected, selected_year):
         fig_area = px.area(df_s_hist_world, x="Year", y="Value", color="Sector", title="Global Sector Evolution")
         
         radar_title = "Global Top 5 Emitters Profile"
-        target_radar = dff_now.nlargest(1, 'Value')['Country'].iloc[0]
+        target_radar = None  # the top emitter, already among the top 5
 
     # Common layout styles
     for f in [fig_capita, fig_pie, fig_area]:
@@ -242,12 +300,12 @@ def update_advanced_modal(country_selected, selected_year):
         f.add_vline(x=selected_year, line_dash="dash", line_color="red")
 
     # --- RADAR LOGIC ---
-    top5_list = dff_now.nlargest(5, 'Value')['Country'].tolist()
-    compare_list = list(set(top5_list + ([target_radar.strip()] if target_radar else [])))
+    top5_list = YEAR_RANKINGS["totals"].top(selected_year, 5)['ISOcode'].tolist()
+    compare_list = list(dict.fromkeys(top5_list + ([target_radar] if target_radar else [])))
     
     # Consolidate metrics for the radar axes
-    df_metrics = pd.merge(dff_now[dff_now['Country'].isin(compare_list)], df_1970, on='Country', how='left')
-    df_metrics = pd.merge(df_metrics, df_cumulative_sum, on='Country', how='left')
+    df_metrics = pd.merge(dff_now[dff_now['ISOcode'].isin(compare_list)], df_1970, on='ISOcode', how='left')
+    df_metrics = pd.merge(df_metrics, df_cumulative_sum, on='ISOcode', how='left')
     
     # Calculate Growth Speed (current / baseline)
     df_metrics['Growth_Multiplier'] = df_metrics.apply(
@@ -1,6 +1,5 @@
-from dash import html, dcc, callback, Input, Output, State, callback_context as ctx
+from dash import html, dcc, callback, Input, Output, State, no_update, callback_context as ctx
 import dash_bootstrap_components as dbc
-import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
@@ -21,8 +20,20 @@ from prepare_data import (
     tab2_get_default_iso_life,
     tab2_get_gdp_country_series,
     tab2_get_life_country_series,
+    TAB2_GDP_MAP_LOCATIONS,
+    TAB2_LIFE_MAP_LOCATIONS,
+    YEAR_RANKINGS,
+    AVERAGE_STATS,
+    TRENDS,
+    SERIES_PANELS,
+    on_map_locations,
+    YEARS,
 )
-from components import controls
+from components import controls, geo
+from caching import memoize
+from response_store import precomputed
+from dispatch import tab_callback
+import figures
 
 
 # =============================================================================
@@ -35,9 +46,14 @@ _MAP_ANNOTATION = [dict(
     showarrow=False, font=dict(size=12, color="gray")
 )]
 
-_COMMON_GEO = dict(showframe=False, showcoastlines=True, projection_type="equirectangular")
 _COMMON_MAP_MARGIN = dict(l=0, r=0, t=0, b=0)
 
+# Input domains walked by `python response_store.py build`
+VIEWS = ("total", "capita")
+VIEW_MODES = ("gdp", "life")
+AVERAGES = tuple(AVERAGE_STATS)
+TREND_MODES = tuple(TRENDS)
+
 
 def _empty_fig(title=None) -> go.Figure:
     """Return a minimal placeholder figure."""
@@ -47,9 +63,43 @@ def _empty_fig(title=None) -> go.Figure:
     return fig
 
 
-def _pair(fig: go.Figure):
-    """Tab 2 duplicates the same figure into two containers (GDP/Life)."""
-    return fig, fig
+def _for_view(view_mode, fig):
+    """Send ``fig`` to the (GDP, Life) graph of the visible view only.
+
+    The hidden graph keeps its last figure until its view is shown again;
+    switching views triggers a full render of the newly visible one.
+    """
+    return (no_update, fig) if view_mode == "life" else (fig, no_update)
+
+
+def _average_name(name, average, years):
+    """Legend name of an average line (marks the population-weighted one and its years).
+
+    Weighted averages exist only where the population proxy has data, so the
+    line can be shorter than the country's; the name states its span.
+    """
+    if average != "wmean" or not len(years):
+        return name
+    return f"{name} (pop.-weighted, {int(years[0])}–{int(years[-1])})"
+
+
+def _weighted_span(average, series):
+    """Note on the years covered by population-weighted ``series`` ({name: (years, values)})."""
+    spans = [years for years, _ in series.values() if len(years)]
+    if average != "wmean" or not spans:
+        return ""
+    first, last = min(int(y[0]) for y in spans), max(int(y[-1]) for y in spans)
+    return f", {first}–{last} (years with population data)"
+
+
+def _trend_name(name, trend):
+    """Legend name of a line in trend mode ``trend`` (a TRENDS key)."""
+    return name if trend == "raw" else f"{name}, {TRENDS[trend]}"
+
+
+def _yoy(metric, iso, years):
+    """Year-over-year change (%) of the raw ``metric`` of ``iso`` in ``years`` (hover data)."""
+    return SERIES_PANELS[metric].at(iso, "yoy", years).reshape(-1, 1)
 
 
 def _clicked_iso(click_data):
@@ -59,15 +109,32 @@ def _clicked_iso(click_data):
     return None
 
 
-def _style_choropleth(fig: go.Figure, colorbar_title: str) -> go.Figure:
-    """Apply the shared map styling used in Tab 2."""
-    fig.update_layout(
+def _map_arrays(dff, color_col: str, with_value: bool = False) -> dict:
+    """Choropleth arrays for one year (``dff`` aligned on the map's fixed location list)."""
+    arrays = dict(
+        locations=dff["ISOcode"].to_numpy(),
+        z=dff[color_col].to_numpy(),
+        hovertext=dff["Country"].to_numpy(),
+    )
+    if with_value:
+        arrays["customdata"] = dff[["Value"]].to_numpy()
+    return arrays
+
+
+def _map_figure(arrays: dict, colorscale: str, colorbar_title: str, height: int,
+                hovertemplate: str, precision: dict) -> dict:
+    """Build a Tab 2 choropleth with the shared map styling."""
+    return figures.choropleth(
+        **arrays,
+        precision=precision,
+        colorscale_name=colorscale,
+        colorbar=dict(title=dict(text=colorbar_title), thickness=15, len=0.6),
+        hovertemplate=hovertemplate,
+        height=height,
         margin=_COMMON_MAP_MARGIN,
-        coloraxis_colorbar=dict(title=colorbar_title, thickness=15, len=0.6),
-        geo=_COMMON_GEO,
+        geo=dict(showframe=False, showcoastlines=True, projection=dict(type="equirectangular")),
         annotations=_MAP_ANNOTATION,
     )
-    return fig
 
 
 def layout():
@@ -84,6 +151,31 @@ def layout():
             ], width=12)
         ], className="mb-3"),
 
+        # Averaging of the global / continental reference lines (intensive metrics
+        # only: hidden while the GDP view shows total GDP) and raw / smoothed trend
+        # lines (both views)
+        dbc.Row([
+            dbc.Col(html.Div(id="tab2-average-control", children=[
+                html.Label("Averages:", className="fw-bold me-3 mb-0 small"),
+                dbc.RadioItems(
+                    id="tab2-average",
+                    options=[{"label": label, "value": stat} for stat, label in AVERAGE_STATS.items()],
+                    value="mean",
+                    inline=True,
+                    className="small"
+                ),
+            ], className="d-flex align-items-center justify-content-end"), width=6),
+            dbc.Col(html.Div([
+                html.Label("Trend:", className="fw-bold me-3 mb-0 small"),
+                dbc.RadioItems(
+                    id="tab2-trend",
+                    options=[{"label": label, "value": trend} for trend, label in TRENDS.items()],
+                    value="raw",
+                    inline=True,
+                    className="small"
+                ),
+            ], className="d-flex align-items-center"), width=6),
+        ], className="mb-2"),
 
         # GDP Stats cards (Top summary cards)
         dbc.Row(id="gdp-stats-container", className="mb-3 g-2"),
@@ -125,7 +217,7 @@ def layout():
                     dbc.Card(dbc.CardBody([
                         html.H5(id="tab2-map-title-gdp", className="text-primary fw-bold mb-1"),
                         html.P(id="tab2-map-description-gdp", className="text-muted small mb-2"),
-                        dcc.Graph(id="gdp-map")
+                        dcc.Graph(id="gdp-map", config=geo.graph_config())
                     ]), className="shadow-sm h-100")
                 ], width=8),
 
@@ -146,7 +238,7 @@ def layout():
                     dbc.Card(dbc.CardBody([
                         html.H5(id="tab2-map-title-life", className="text-primary fw-bold mb-1"),
                         html.P(id="tab2-map-description-life", className="text-muted small mb-2"),
-                        dcc.Graph(id="gdp-map-life")
+                        dcc.Graph(id="gdp-map-life", config=geo.graph_config())
                     ]), className="shadow-sm")
                 ], width=12)
             ], className="mb-3"),
@@ -170,6 +262,9 @@ def layout():
                 dbc.ModalHeader(dbc.ModalTitle(id="tab2-modal-title")),
                 dbc.ModalBody([
                     html.P(id="tab2-modal-intro", className="text-muted mb-4"),
+                    # Shown while the analysis is computed (background job)
+                    dbc.Progress(id="tab2-modal-progress", value=100, striped=True, animated=True,
+                                 className="mb-3", style={"display": "none"}),
                     html.Div(id="modal-advanced-body-gdp"),
                 ]),
                 dbc.ModalFooter(dbc.Button("Close", id="close-advanced-gdp", className="ms-auto", size="sm")),
@@ -179,6 +274,11 @@ def layout():
             is_open=False,
             scrollable=True,
         ),
+        # (year, view mode) the open modal should show; only set while it is open
+        dcc.Store(id="tab2-modal-request"),
+        # Key of the full figure each map holds (see figures.patch_or_full)
+        dcc.Store(id="gdp-map-key", data=None),
+        dcc.Store(id="gdp-map-life-key", data=None),
     ])
 
 
@@ -210,6 +310,23 @@ def toggle_gdp_controls_visibility(view_mode):
     return {"display": "none"} if view_mode == "life" else {}
 
 
+@callback(
+    [Output("tab2-average-control", "style"),
+     Output("tab2-average", "value")],
+    [Input("tab2-view-mode-store", "data"),
+     Input("gdp-view", "value")]
+)
+def toggle_average_control(view_mode, gdp_view):
+    """Hide the averaging toggle (back to simple means) while total GDP is shown.
+
+    A population-weighted mean of country totals has no meaning; the toggle
+    only applies to GDP per capita and life expectancy.
+    """
+    if view_mode != "life" and gdp_view == "total":
+        return {"display": "none"}, "mean"
+    return {}, no_update
+
+
 @callback(
     [Output("gdp-layout-container", "style"),
      Output("life-layout-container", "style")],
@@ -274,27 +391,33 @@ def update_tab2_text(view_mode):
     )
 
 
-@callback(
+@tab_callback(
+    "tab-2",
     Output("gdp-stats-container", "children"),
     Input("year-slider", "value"),
     Input("gdp-view", "value"),
-    Input("tabs", "active_tab"),
     Input("tab2-view-mode-store", "data")
 )
-def update_gdp_cards(selected_year, view, active_tab, view_mode):
+def update_gdp_cards(selected_year, view, view_mode):
     """Update the summary cards at the top of Tab 2."""
-    if active_tab != "tab-2" or selected_year is None:
+    if selected_year is None:
         return []
+    return render_gdp_cards(selected_year, view, view_mode)
 
+
+@precomputed("tab2.cards", year=YEARS, view=VIEWS, view_mode=VIEW_MODES)
+def render_gdp_cards(selected_year, view, view_mode):
+    """Summary cards for one (year, view, mode) combination."""
     # --- LIFE EXPECTANCY VIEW ---
     if view_mode == "life":
-        dff = tab2_get_life_year_df(selected_year, filter_small_isos=True)
-        if dff.empty:
+        ranking = YEAR_RANKINGS["life_cards"]
+        stats = ranking.stats(selected_year)
+        if stats is None:
             return dbc.Col(dbc.Alert("No data available for this year.", color="warning"), width=12)
 
-        max_row = dff.loc[dff["Life_Expectancy"].idxmax()]
-        min_row = dff.loc[dff["Life_Expectancy"].idxmin()]
-        mean_val = float(dff["Life_Expectancy"].mean())
+        max_row = ranking.top(selected_year, 1).iloc[0]
+        min_row = ranking.bottom(selected_year, 1).iloc[0]
+        mean_val = stats["mean"]
 
         return [
             dbc.Col(dbc.Card(dbc.CardBody([
@@ -314,20 +437,21 @@ def update_gdp_cards(selected_year, view, active_tab, view_mode):
         ]
 
     # --- GDP VIEW (ORIGINAL) ---
-    dff = tab2_get_gdp_year_df(selected_year, view)
-    if dff.empty:
+    ranking = YEAR_RANKINGS["gdp_total" if view == "total" else "gdp_capita"]
+    stats = ranking.stats(selected_year)
+    if stats is None:
         return dbc.Col(dbc.Alert("No data available for this year.", color="warning"), width=12)
 
-    max_row = dff.loc[dff["Value"].idxmax()]
-    mean_val = float(dff["Value"].mean())
+    max_row = ranking.top(selected_year, 1).iloc[0]
+    mean_val = stats["mean"]
 
     if view == "total":
-        global_val = float(dff["Value"].sum())
+        global_val = stats["sum"]
         left_title, left_value = "Global GDP (Sum)", f"{global_val:,.0f} M$"
         right_title, right_value = "National Average", f"{mean_val:,.0f} M$"
     else:
         left_title, left_value = "Avg GDP per Capita", f"{mean_val:,.0f} $"
-        right_title, right_value = "Median GDP per Capita", f"{float(dff['Value'].median()):,.0f} $"
+        right_title, right_value = "Median GDP per Capita", f"{stats['median']:,.0f} $"
 
     return [
         dbc.Col(dbc.Card(dbc.CardBody([
@@ -347,106 +471,138 @@ def update_gdp_cards(selected_year, view, active_tab, view_mode):
     ]
 
 
-@callback(
+@tab_callback(
+    "tab-2",
     [Output("gdp-map", "figure"),
-     Output("gdp-map-life", "figure")],
+     Output("gdp-map-life", "figure"),
+     Output("gdp-map-key", "data"),
+     Output("gdp-map-life-key", "data")],
     Input("year-slider", "value"),
     Input("gdp-view", "value"),
-    Input("tabs", "active_tab"),
-    Input("tab2-view-mode-store", "data")
+    Input("tab2-view-mode-store", "data"),
+    State("gdp-map-key", "data"),
+    State("gdp-map-life-key", "data")
 )
-def update_gdp_map(selected_year, view, active_tab, view_mode):
-    """Update the choropleth map for GDP or Life Expectancy."""
-    if active_tab != "tab-2" or selected_year is None:
-        return _pair(_empty_fig())
+def update_gdp_map(selected_year, view, view_mode, held_key_gdp, held_key_life):
+    """Update the choropleth map of the visible view (GDP or Life Expectancy).
+
+    A slider tick on a map that holds the same (mode, view) only patches the
+    data arrays.
+    """
+    if selected_year is None:
+        return _for_view(view_mode, _empty_fig()) + _for_view(view_mode, None)
 
+    fig = render_gdp_map(selected_year, view, view_mode)
+    # Locations are fixed per (mode, view): a year tick only sends the colours
+    key = "life" if view_mode == "life" else f"gdp:{view}"
+    held_key = held_key_life if view_mode == "life" else held_key_gdp
+    fig, key = figures.patch_or_full(fig, key, held_key, ctx.triggered_id == "year-slider",
+                                     attrs=("z", "customdata"))
+    return _for_view(view_mode, fig) + _for_view(view_mode, key)
+
+
+geo.register_zoom_resolution("gdp-map")
+geo.register_zoom_resolution("gdp-map-life")
+
+
+@precomputed("tab2.map", year=YEARS, view=VIEWS, view_mode=VIEW_MODES)
+def render_gdp_map(selected_year, view, view_mode):
+    """Full GDP / Life Expectancy choropleth for one (year, view, mode) combination."""
     # --- LIFE EXPECTANCY VIEW ---
     if view_mode == "life":
         dff = tab2_get_life_year_df(selected_year, filter_small_isos=True)
         if dff.empty:
-            return _pair(_empty_fig("No data to show"))
-
-        fig = px.choropleth(
-            dff,
-            locations="ISOcode",
-            color="Life_Expectancy",
-            hover_name="Country",
-            hover_data={"Life_Expectancy": ":.1f", "ISOcode": False},
-            color_continuous_scale="RdYlGn",
-            height=400
+            return _empty_fig("No data to show")
+
+        dff = on_map_locations(dff, TAB2_LIFE_MAP_LOCATIONS, ["Life_Expectancy"])
+        return _map_figure(
+            _map_arrays(dff, "Life_Expectancy"), "RdYlGn", "Age", height=400,
+            hovertemplate="<b>%{hovertext}</b><br><br>Life_Expectancy=%{z:.1f}<extra></extra>",
+            precision={"z": 2},
         )
-        _style_choropleth(fig, "Age")
-        return _pair(fig)
 
     # --- GDP VIEW (ORIGINAL) ---
     dff = tab2_get_gdp_map_df(selected_year, view)
     if dff.empty:
-        return _pair(_empty_fig("No data to show"))
+        return _empty_fig("No data to show")
 
-    fig = px.choropleth(
-        dff,
-        locations="ISOcode",
-        color="ColorValue",
-        hover_name="Country",
-        hover_data={"Value": ":,.2f", "ColorValue": False},
-        color_continuous_scale="Viridis",
-        height=550
+    dff = on_map_locations(dff, TAB2_GDP_MAP_LOCATIONS[view], ["Value", "ColorValue"])
+    return _map_figure(
+        _map_arrays(dff, "ColorValue", with_value=True), "Viridis", "log10(GDP)", height=550,
+        hovertemplate="<b>%{hovertext}</b><br><br>ISOcode=%{location}<br>Value=%{customdata[0]:,.2f}<extra></extra>",
+        precision={"z": 3, "customdata": 2},  # z is log10(GDP), only used for colour
     )
-    _style_choropleth(fig, "log10(GDP)")
-    return _pair(fig)
 
 
-@callback(
+@tab_callback(
+    "tab-2",
     [Output("gdp-country-lines", "figure"),
      Output("gdp-country-lines-life", "figure")],
     [Input("gdp-map", "clickData"),
      Input("gdp-map-life", "clickData")],
     Input("year-slider", "value"),
-    Input("tabs", "active_tab"),
-    Input("tab2-view-mode-store", "data")
+    Input("tab2-view-mode-store", "data"),
+    Input("tab2-average", "value"),
+    Input("tab2-trend", "value")
 )
-def update_country_lines(clickData_gdp, clickData_life, selected_year, active_tab, view_mode):
+def update_country_lines(clickData_gdp, clickData_life, selected_year, view_mode, average, trend):
     """Update the right-side historical lines based on the selected country."""
-    if active_tab != "tab-2" or selected_year is None:
-        return _pair(_empty_fig())
+    if selected_year is None:
+        return _for_view(view_mode, _empty_fig())
 
     click_data = clickData_life if view_mode == "life" else clickData_gdp
-    iso = _clicked_iso(click_data)
+    return _for_view(view_mode, render_country_lines(
+        _clicked_iso(click_data), selected_year, view_mode, average if average in AVERAGE_STATS else "mean",
+        trend if trend in TRENDS else "raw"))
 
+
+# Only the no-click state (default country of the year) is precomputed
+@precomputed("tab2.lines", iso=(None,), year=YEARS, view_mode=VIEW_MODES, average=AVERAGES, trend=TREND_MODES)
+def render_country_lines(iso, selected_year, view_mode, average, trend):
+    """Historical lines for ``iso`` (or the year's default country when None).
+
+    The global average line is the simple or population-weighted mean
+    (``average``, an AVERAGE_STATS key) of every country. ``trend`` (a
+    TRENDS key) shows every line raw or smoothed; the hover keeps the raw
+    year-over-year change.
+    """
     # Fallback selection (same logic as before)
     if iso is None:
         iso = tab2_get_default_iso_life(selected_year) if view_mode == "life" else tab2_get_default_iso_gdp(selected_year)
 
     if iso is None:
-        return _pair(_empty_fig("Click on a country"))
+        return _empty_fig("Click on a country")
 
     # --- LIFE EXPECTANCY VIEW ---
     if view_mode == "life":
-        c_life = tab2_get_life_country_series(iso)
+        c_life = tab2_get_life_country_series(iso, trend)
         if c_life.empty:
-            return _pair(_empty_fig("No data for selected country"))
+            return _empty_fig("No data for selected country")
 
         name = c_life["Country"].iloc[0]
-        avg_life = TAB2_LIFE_AVG_BY_YEAR
+        avg_years, avg_life = TAB2_LIFE_AVG_BY_YEAR[average][trend]
 
         fig = go.Figure()
         fig.add_trace(go.Scatter(
             x=c_life["Year"],
             y=c_life["Life_Expectancy"],
             mode="lines",
-            name=f"{name}",
-            line=dict(width=3, color="#2ecc71")
+            name=_trend_name(name, trend),
+            line=dict(width=3, color="#2ecc71"),
+            customdata=_yoy("life", iso, c_life["Year"]),
+            hovertemplate="%{fullData.name}<br>Year: %{x}<br>Life Exp: %{y:.1f} years"
+                          "<br>YoY: %{customdata[0]:+.2f}%<extra></extra>"
         ))
         fig.add_trace(go.Scatter(
-            x=avg_life["Year"],
-            y=avg_life["Life_Expectancy"],
+            x=avg_years,
+            y=avg_life,
             mode="lines",
-            name="Global Average",
-            line=dict(color="gray", dash="dash", width=2)
+            name=_trend_name(_average_name("Global Average", average, avg_years), trend),
+            line=dict(color="gray", dash="dash", width=2),
+            hovertemplate="%{fullData.name}<br>Year: %{x}<br>Life Exp: %{y:.1f} years<extra></extra>"
         ))
 
         fig.add_vline(x=selected_year, line_width=1, line_dash="dot", line_color="red")
-        fig.update_traces(hovertemplate="%{fullData.name}<br>Year: %{x}<br>Life Exp: %{y:.1f} years<extra></extra>")
         fig.update_layout(
             height=450,
             template="plotly_white",
@@ -457,15 +613,15 @@ def update_country_lines(clickData_gdp, clickData_life, selected_year, active_ta
             yaxis_title="Life Expectancy (years)",
             xaxis_title="Year"
         )
-        return _pair(fig)
+        return fig
 
     # --- GDP VIEW (ORIGINAL) ---
-    c_total, c_cap, name = tab2_get_gdp_country_series(iso)
+    c_total, c_cap, name = tab2_get_gdp_country_series(iso, trend)
     if name is None:
-        return _pair(_empty_fig("No data for selected country"))
+        return _empty_fig("No data for selected country")
 
-    avg_total = TAB2_GDP_TOTAL_AVG_BY_YEAR
-    avg_cap = TAB2_GDP_CAPITA_AVG_BY_YEAR
+    avg_total_years, avg_total = TAB2_GDP_TOTAL_AVG_BY_YEAR[trend]  # simple mean in every mode
+    avg_cap_years, avg_cap = TAB2_GDP_CAPITA_AVG_BY_YEAR[average][trend]
 
     fig = make_subplots(
         rows=2, cols=1, shared_xaxes=True,
@@ -474,23 +630,25 @@ def update_country_lines(clickData_gdp, clickData_life, selected_year, active_ta
     )
 
     fig.add_trace(go.Scatter(
-        x=c_total["Year"], y=c_total["Value"], mode="lines", name=f"{name} (Total)",
-        line=dict(width=3), hovertemplate="Year: %{x}<br>GDP: $%{y:,.0f}M<extra></extra>"
+        x=c_total["Year"], y=c_total["Value"], mode="lines", name=_trend_name(f"{name} (Total)", trend),
+        line=dict(width=3), customdata=_yoy("gdp_total", iso, c_total["Year"]),
+        hovertemplate="Year: %{x}<br>GDP: $%{y:,.0f}M<br>YoY: %{customdata[0]:+.1f}%<extra></extra>"
     ), row=1, col=1)
     fig.add_trace(go.Scatter(
-        x=avg_total["Year"], y=avg_total["Value"], mode="lines", name="Global Avg",
+        x=avg_total_years, y=avg_total, mode="lines", name=_trend_name("Global Avg", trend),
         line=dict(color="gray", dash="dash"),
         hovertemplate="Year: %{x}<br>Avg: $%{y:,.0f}M<extra></extra>"
     ), row=1, col=1)
 
     fig.add_trace(go.Scatter(
-        x=c_cap["Year"], y=c_cap["Value"], mode="lines", name=f"{name} (Per Capita)",
-        line=dict(width=3), showlegend=True,
-        hovertemplate="Year: %{x}<br>GDP pc: $%{y:,.0f}<extra></extra>"
+        x=c_cap["Year"], y=c_cap["Value"], mode="lines", name=_trend_name(f"{name} (Per Capita)", trend),
+        line=dict(width=3), showlegend=True, customdata=_yoy("gdp_capita", iso, c_cap["Year"]),
+        hovertemplate="Year: %{x}<br>GDP pc: $%{y:,.0f}<br>YoY: %{customdata[0]:+.1f}%<extra></extra>"
     ), row=2, col=1)
     fig.add_trace(go.Scatter(
-        x=avg_cap["Year"], y=avg_cap["Value"], mode="lines", name="Global Avg",
-        line=dict(color="gray", dash="dash"), showlegend=False,
+        x=avg_cap_years, y=avg_cap, mode="lines",
+        name=_trend_name(_average_name("Global Avg per capita", average, avg_cap_years), trend),
+        line=dict(color="gray", dash="dash"), showlegend=average == "wmean",
         hovertemplate="Year: %{x}<br>Avg: $%{y:,.0f}<extra></extra>"
     ), row=2, col=1)
 
@@ -503,53 +661,61 @@ def update_country_lines(clickData_gdp, clickData_life, selected_year, active_ta
         margin=dict(l=10, r=10, t=30, b=10),
         hovermode="x unified"
     )
-    return _pair(fig)
+    return fig
 
 
-@callback(
+@tab_callback(
+    "tab-2",
     Output("tab2-continental-chart-container", "children"),
     Input("year-slider", "value"),
-    Input("tabs", "active_tab"),
-    Input("tab2-view-mode-store", "data")
+    Input("tab2-view-mode-store", "data"),
+    Input("tab2-average", "value"),
+    Input("tab2-trend", "value")
 )
-def update_continental_progress(selected_year, active_tab, view_mode):
-    """Show the continental life expectancy progress chart (life view only)."""
-    if active_tab != "tab-2" or view_mode != "life" or selected_year is None:
-        return None
-
-    continent_avg = TAB2_LIFE_CONTINENT_AVG
-
-    fig = px.line(
-        continent_avg,
-        x="Year",
-        y="Life_Expectancy",
-        color="Continent",
-        template="plotly_white",
+def update_continental_progress(selected_year, view_mode, average, trend):
+    """Show the continental life expectancy progress chart (life view only).
+
+    In the GDP view the hidden container keeps its last chart.
+    """
+    if view_mode != "life" or selected_year is None:
+        return no_update
+    return render_continental_progress(selected_year, average if average in AVERAGE_STATS else "mean",
+                                       trend if trend in TRENDS else "raw")
+
+
+@precomputed("tab2.continental", year=YEARS, average=AVERAGES, trend=TREND_MODES)
+def render_continental_progress(selected_year, average, trend):
+    """Continental life expectancy card with the year marker (``average``: AVERAGE_STATS key, ``trend``: TRENDS key)."""
+    series = TAB2_LIFE_CONTINENT_AVG[average][trend]
+    fig = figures.line(
+        [dict(name=continent, x=years, y=values, color=TAB2_LIFE_CONTINENT_COLOR_MAP.get(continent))
+         for continent, (years, values) in series.items()],
+        hovertemplate="<b>%{fullData.name}</b><br>Year: %{x}<br>Life Exp: %{y:.1f} years<extra></extra>",
         markers=True,
-        color_discrete_map=TAB2_LIFE_CONTINENT_COLOR_MAP
-    )
-
-    fig.add_vline(x=selected_year, line_width=1, line_dash="dot", line_color="red")
-    fig.update_traces(hovertemplate="<b>%{fullData.name}</b><br>Year: %{x}<br>Life Exp: %{y:.1f} years<extra></extra>")
-    fig.update_layout(
+        template_name="plotly_white",
+        precision={"y": 2},
+        shapes=[figures.vline(selected_year)],
         height=450,
         margin=dict(l=10, r=10, t=10, b=10),
         hovermode="x unified",
-        yaxis_title="Life Expectancy (years)",
-        xaxis_title="Year",
+        yaxis=dict(title=dict(text="Life Expectancy (years)")),
+        xaxis=dict(title=dict(text="Year")),
         legend=dict(
             orientation="h",
             yanchor="bottom",
             y=-0.4,
             xanchor="center",
             x=0.5,
-            font=dict(size=9)
+            font=dict(size=9),
+            title=dict(text="Continent"),
         )
     )
 
     return dbc.Card(dbc.CardBody([
         html.H5("Continental Progress", className="text-primary fw-bold mb-1"),
-        html.P("Average life expectancy evolution by continent over time.", className="text-muted small mb-2"),
+        html.P(f"{AVERAGE_STATS[average]} average life expectancy evolution by continent over time"
+               + ("" if trend == "raw" else f" ({TRENDS[trend]})") + _weighted_span(average, series) + ".",
+               className="text-muted small mb-2"),
         dcc.Graph(figure=fig)
     ], className="py-2 px-2"), className="shadow-sm")
 
@@ -566,28 +732,54 @@ def toggle_modal_gdp(n1, n2, is_open):
     return is_open
 
 
-@callback(
-    Output("modal-advanced-body-gdp", "children"),
+@tab_callback(
+    "tab-2",
+    Output("tab2-modal-request", "data"),
     Input("year-slider", "value"),
-    Input("tabs", "active_tab"),
-    Input("tab2-view-mode-store", "data")
+    Input("tab2-view-mode-store", "data"),
+    Input("modal-advanced-gdp", "is_open")
 )
-def update_advanced_modal_gdp(selected_year, active_tab, view_mode):
-    """Update the advanced analysis modal content."""
-    if active_tab != "tab-2" or selected_year is None:
-        return None
+def request_advanced_modal_gdp(selected_year, view_mode, is_open):
+    """Ask for the modal content only while the modal is open."""
+    if not is_open or selected_year is None:
+        return no_update
+    return {"year": selected_year, "view_mode": view_mode}
 
-    if view_mode == "life":
-        return create_life_expectancy_advanced_analysis(selected_year)
 
-    return create_gdp_advanced_analysis(selected_year)
+@tab_callback(
+    "tab-2",
+    Output("modal-advanced-body-gdp", "children"),
+    Input("tab2-modal-request", "data"),
+    background=True,
+    progress=[Output("tab2-modal-progress", "label")],
+    running=[(Output("tab2-modal-progress", "style"), {}, {"display": "none"}),
+             (Output("modal-advanced-body-gdp", "style"), {"opacity": 0.4}, {})],
+    cancel=[Input("close-advanced-gdp", "n_clicks")],
+    prevent_initial_call=True,
+)
+def update_advanced_modal_gdp(set_progress, request):
+    """Render the advanced analysis modal content (background job, see background.py).
+
+    A newer request (slider moved while the modal is open) terminates this
+    job; closing the modal cancels it.
+    """
+    if not request:
+        return no_update
+    set_progress(f"Analysing {request['year']}...")
+
+    if request["view_mode"] == "life":
+        return create_life_expectancy_advanced_analysis(request["year"])
+
+    return create_gdp_advanced_analysis(request["year"])
 
+@precomputed("tab2.modal.gdp", year=YEARS)
+@memoize(maxsize=64)
 def create_gdp_advanced_analysis(selected_year):
     """Create GDP advanced analysis charts"""
+    import plotly.express as px  # loaded on the first modal, not at start-up
 
     # 1. TREEMAP: Top 15 Total GDP
-    d1 = df_gdp_total[df_gdp_total["Year"] == selected_year].dropna(subset=["Value"])
-    top_total = d1.nlargest(15, "Value")
+    top_total = YEAR_RANKINGS["gdp_total"].top(selected_year, 15)
     
     fig1 = px.treemap(
         top_total,
@@ -599,8 +791,7 @@ def create_gdp_advanced_analysis(selected_year):
     )
 
     # 2. LOLLIPOP CHART: Top 10 GDP per Capita
-    d2 = df_gdp_capita[df_gdp_capita["Year"] == selected_year].dropna(subset=["Value"])
-    top_cap = d2.nlargest(10, "Value").sort_values("Value")
+    top_cap = YEAR_RANKINGS["gdp_capita"].top(selected_year, 10).iloc[::-1]
     
     fig2 = go.Figure()
     fig2.add_trace(go.Scatter(
@@ -727,12 +918,19 @@ def create_gdp_advanced_analysis(selected_year):
     ])
 
 
+@precomputed("tab2.modal.life", year=YEARS)
+@memoize(maxsize=64)
 def create_life_expectancy_advanced_analysis(selected_year):
     """Create Life Expectancy advanced analysis charts"""
+    import plotly.express as px
     
     # 1. TREEMAP: Top 15 Life Expectancy
     d1 = df_life_expectancy[df_life_expectancy["Year"] == selected_year].dropna(subset=["Life_Expectancy"])
-    top_life = d1.nlargest(15, "Life_Expectancy")
+    ranking = YEAR_RANKINGS["life"]
+    stats = ranking.stats(selected_year)
+    if stats is None:
+        return dbc.Alert("No data available for this year.", color="warning")
+    top_life = ranking.top(selected_year, 15)
     
     fig1 = px.treemap(
         top_life,
@@ -744,7 +942,7 @@ def create_life_expectancy_advanced_analysis(selected_year):
     )
 
     # 2. LOLLIPOP CHART: Bottom 10 Life Expectancy (lowest)
-    bottom_life = d1.nsmallest(10, "Life_Expectancy").sort_values("Life_Expectancy")
+    bottom_life = ranking.bottom(selected_year, 10)
     
     fig2 = go.Figure()
     fig2.add_trace(go.Scatter(
@@ -805,7 +1003,7 @@ def create_life_expectancy_advanced_analysis(selected_year):
     )
     
     # Add mean line
-    mean_life = d1["Life_Expectancy"].mean()
+    mean_life = stats["mean"]
     fig4.add_vline(x=mean_life, line_dash="dash", line_color="red", 
                    annotation_text=f"Global Mean: {mean_life:.1f}",
                    annotation_position="top right")
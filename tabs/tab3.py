@@ -1,6 +1,5 @@
-from dash import html, dcc, callback, Input, Output, State, callback_context as ctx
+from dash import html, dcc, callback, Input, Output, State, no_update, callback_context as ctx
 import dash_bootstrap_components as dbc
-import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 from prepare_data import (
@@ -11,27 +10,123 @@ from prepare_data import (
     tab3_get_life_country_trajectory_df,
     tab3_get_decoupling_delta,
     tab3_get_life_progress_delta,
+    tab3_get_year_fit,
+    TRENDS,
+    YEARS,
 )
 from components import controls
+from caching import memoize
+from response_store import precomputed
+from dispatch import tab_callback
+import figures
 
 # ==================== UTILITY FUNCTIONS ====================
 
-def add_selection_ring(fig, df, selected_iso, x_col, y_col):
-    """Add a black ring around the selected country"""
-    if selected_iso:
-        selected = df[df["ISOcode"] == selected_iso]
-        if not selected.empty:
-            fig.add_trace(go.Scatter(
-                x=selected[x_col],
-                y=selected[y_col],
-                mode='markers',
-                marker=dict(size=20, color='rgba(0,0,0,0)', symbol='circle', 
-                           line=dict(width=3, color='black')),
-                showlegend=False,
-                hoverinfo='skip'
-            ))
+# Every region always gets a trace (empty when it has no data that year), followed
+# by the trend line and the selection ring, so year ticks can be sent as patches.
+BUBBLE_GROUP_ORDER = list(TAB3_LIFE_REGION_COLOR_MAP)
+
+# Input domain walked by `python response_store.py build`
+VIEW_MODES = ("gdp", "life")
+
+
+def create_bubble_figure(df, x_col, y_col, size_col, hover_fmt, color_map=None,
+                         render_mode=figures.BUBBLE_RENDER_MODE, precision=None, **layout):
+    """Build the region-coloured bubble chart from the year slice arrays.
+
+    One trace per region with area-scaled markers (as px.scatter did); the ISO
+    code travels in customdata so clicks still resolve a country. Switches to
+    WebGL above figures.WEBGL_ROW_THRESHOLD points when render_mode is "auto".
+
+    Args:
+        df: Year slice with ISOcode, Country, Region and the value columns.
+        x_col / y_col / size_col: Columns for axes and bubble area.
+        hover_fmt: Hover lines appended under the country name.
+        color_map: Optional Region -> color mapping (template colorway otherwise).
+        render_mode: "auto", "svg" or "webgl".
+        precision: {attr: decimals} display precision of the encoded arrays.
+        **layout: Layout overrides passed to the figure builder.
+    """
+    layout["legend"] = {"title": {"text": "Region"}, **layout.get("legend", {})}
+    return figures.bubble(
+        df[x_col], df[y_col], df[size_col], df["Region"],
+        hovertext=df["Country"],
+        customdata=df["ISOcode"],  # Critical for interactivity
+        hovertemplate="<b>%{hovertext}</b><br><br>" + hover_fmt + "<extra></extra>",
+        color_map=color_map,
+        group_order=BUBBLE_GROUP_ORDER,
+        render_mode=render_mode,
+        precision=precision,
+        template_name="plotly_white",
+        **layout,
+    )
+
+
+def _trace_type(fig):
+    """Trace type used by the bubbles (overlays must match: svg vs webgl)."""
+    return fig["data"][0]["type"] if fig["data"] else "scatter"
+
+
+def add_trend_line(fig, x, y, name):
+    """Add the dashed global trend line using the same trace type as the bubbles."""
+    fig["data"] += figures.compact([dict(
+        type=_trace_type(fig),
+        x=x,
+        y=y,
+        mode="lines",
+        line=dict(color="black", width=2, dash="dash"),
+        name=name,
+        showlegend=True,
+    )], {"x": 3, "y": 3})
     return fig
 
+
+def add_selection_ring(fig):
+    """Add the (empty) black ring trace that highlights the selected country"""
+    fig["data"].append(dict(
+        type=_trace_type(fig),
+        x=[],
+        y=[],
+        mode='markers',
+        marker=dict(size=20, color='rgba(0,0,0,0)', symbol='circle', 
+                   line=dict(width=3, color='black')),
+        showlegend=False,
+        hoverinfo='skip'
+    ))
+    return fig
+
+
+def fill_selection_ring(fig, selected_iso):
+    """Move the ring onto ``selected_iso`` using the bubbles already in ``fig``.
+
+    Works on live figures and on figures served from the response store, so
+    the selection never needs its own precomputed entry.
+    """
+    data = fig["data"]
+    n = len(BUBBLE_GROUP_ORDER)
+    if not selected_iso or len(data) != n + 2:
+        return fig
+    for trace in data[:n]:
+        for x, y, custom in zip(figures.decode(trace["x"]), figures.decode(trace["y"]), trace["customdata"]):
+            if custom[0] == selected_iso:
+                data[-1]["x"], data[-1]["y"] = [float(x)], [float(y)]
+                return fig
+    return fig
+
+
+def render_bubble_chart(df, x_col, y_col, size_col, trend, **figure_kwargs):
+    """Bubble figure with the global trend line and an empty selection ring.
+
+    Args:
+        df: Year slice (ISOcode, Country, Region and value columns).
+        x_col / y_col / size_col: Columns for axes and bubble area.
+        trend: (x, y, name) of the global trend line.
+        **figure_kwargs: Passed to create_bubble_figure.
+    """
+    fig = create_bubble_figure(df, x_col, y_col, size_col, **figure_kwargs)
+    add_trend_line(fig, *trend)
+    return add_selection_ring(fig)
+
 def create_baseline_figure(year, message):
     """Create placeholder figure for baseline year"""
     return go.Figure().update_layout(
@@ -156,6 +251,13 @@ def layout():
                     html.H6("Development Path (1960-2024)", className="card-subtitle text-primary fw-bold small mb-1"),
                     html.P(id="trajectory-description", className="small text-muted mb-2"),
                     
+                    dbc.RadioItems(
+                        id="tab3-trend",
+                        options=[{"label": label, "value": trend} for trend, label in TRENDS.items()],
+                        value="raw",
+                        inline=True,
+                        className="small mb-1"
+                    ),
                     dcc.Graph(id='corr-trajectory-graph', style={'height': '250px'}),
                     
                     html.Small("Log-Log scale used to visualize development stages.", className="text-muted d-block text-end mt-1")
@@ -188,7 +290,10 @@ def layout():
                 # Explanatory text inside the modal
                 html.H6(id="modal-subtitle", className="text-primary fw-bold"),
                 html.P(id="modal-description", className="text-muted small mb-4"),
-                
+
+                # Shown while the analysis is computed (background job)
+                dbc.Progress(id="corr-modal-progress", value=100, striped=True, animated=True,
+                             className="mb-3", style={"display": "none"}),
                 dcc.Graph(id="corr-decoupling-graph"),
                 
                 # Top countries section
@@ -201,6 +306,10 @@ def layout():
 
         # Hidden Store to keep track of the selected country (ISO code)
         dcc.Store(id="corr-selected-iso-store", data=None),
+        # Key of the full figure the bubble graph holds (see figures.patch_or_full)
+        dcc.Store(id="corr-bubble-graph-key", data=None),
+        # (year, view mode) the open modal should show; only set while it is open
+        dcc.Store(id="corr-modal-request"),
     ])
 
 
@@ -268,22 +377,35 @@ def update_chart_header(view_mode):
 # -----------------------------------------------------------------------------
 # 2. CALLBACK: MAIN BUBBLE CHART & STATS
 # -----------------------------------------------------------------------------
-@callback(
+@tab_callback(
+    "tab-3",
     [Output("corr-bubble-graph", "figure"),
      Output("corr-value-display", "children"),
-     Output("corr-explanation-display", "children")],
-    Input("tabs", "active_tab"),
+     Output("corr-explanation-display", "children"),
+     Output("corr-bubble-graph-key", "data")],
     Input("year-slider", "value"),
     Input("corr-selected-iso-store", "data"),
-    Input("tab3-view-mode-store", "data")
+    Input("tab3-view-mode-store", "data"),
+    State("corr-bubble-graph-key", "data")
 )
-def update_bubble_chart(active_tab, selected_year, selected_iso, view_mode):
-    if active_tab != "tab-3" or selected_year is None:
-        return go.Figure(), "---", ""
+def update_bubble_chart(selected_year, selected_iso, view_mode, held_key):
+    if selected_year is None:
+        return go.Figure(), "---", "", None
+
+    fig, corr_text, text_expl = render_bubble(selected_year, view_mode)
+    fill_selection_ring(fig, selected_iso)
 
+    # A slider tick only patches the data arrays of the same view's figure already on screen.
+    fig, key = figures.patch_or_full(fig, f"tab3:{view_mode}", held_key, ctx.triggered_id == "year-slider")
+    return fig, corr_text, text_expl, key
+
+
+@precomputed("tab3.bubble", year=YEARS, view_mode=VIEW_MODES)
+def render_bubble(selected_year, view_mode):
+    """Bubble figure, r value and explanation for one (year, mode) combination."""
     # --- LIFE EXPECTANCY VIEW ---
     if view_mode == "life":
-        return create_life_expectancy_chart(selected_year, selected_iso)
+        return create_life_expectancy_chart(selected_year)
     
     # --- GDP VIEW ---
     # Use precomputed merge from prepare_data to avoid repeating heavy joins
@@ -292,11 +414,11 @@ def update_bubble_chart(active_tab, selected_year, selected_iso, view_mode):
     if dff.empty:
         return go.Figure().update_layout(title="No data"), "N/A", "No data"
 
-    # --- CALCULATE STATISTICS (Pearson Correlation on Log-Log data) ---
+    # --- STATISTICS (Pearson Correlation on Log-Log data) ---
     # We use log because economic/emission relationships often follow power laws.
-    x_log = np.log10(dff["GDP_pc"])
-    y_log = np.log10(dff["CO2_pc"])
-    corr = np.corrcoef(x_log, y_log)[0, 1]
+    # r and the trend line are precomputed for every year in prepare_data.
+    fit = tab3_get_year_fit(selected_year, "gdp")
+    corr = fit["r"]
     
     # Generate dynamic text explanation
     if corr > 0.7: text_expl = "Strong positive link: Richer = Dirtier"
@@ -304,50 +426,29 @@ def update_bubble_chart(active_tab, selected_year, selected_iso, view_mode):
     elif corr > 0: text_expl = "Weak link"
     else: text_expl = "Decoupled or Inverse relationship!"
 
-    # --- GENERATE CHART ---
-    # We pass 'custom_data=["ISOcode"]' to allow click events to identify the country
-    fig = px.scatter(
-        dff,
-        x="GDP_pc",
-        y="CO2_pc",
-        size="Population",    
-        color="Region",       
-        hover_name="Country",
-        size_max=60,      
-        template="plotly_white",
-        log_x=True, 
-        log_y=True,
-        custom_data=["ISOcode"]  # Critical for interactivity
-    )
-
     # Global trend line in log-log space (visual indicator of correlation)
     # Fit: log10(CO2_pc) = a * log10(GDP_pc) + b
-    coeffs = np.polyfit(x_log, y_log, 1)
-    x_range = np.linspace(x_log.min(), x_log.max(), 100)
-    y_trend_log = coeffs[0] * x_range + coeffs[1]
-    fig.add_scatter(
-        x=10 ** x_range,
-        y=10 ** y_trend_log,
-        mode="lines",
-        line=dict(color="black", width=2, dash="dash"),
-        name=f"Global Trend (r={corr:.2f})",
-        showlegend=True,
-    )
-
-    # Highlight selected country with a ring
-    add_selection_ring(fig, dff, selected_iso, "GDP_pc", "CO2_pc")
+    x_range = np.linspace(fit["x_min"], fit["x_max"], 100)
+    y_trend_log = fit["slope"] * x_range + fit["intercept"]
 
-    fig.update_layout(
+    # --- GENERATE CHART ---
+    # ISO codes travel in customdata so click events can identify the country.
+    fig = render_bubble_chart(
+        dff, "GDP_pc", "CO2_pc", "Population",
+        trend=(10 ** x_range, 10 ** y_trend_log, f"Global Trend (r={corr:.2f})"),
+        hover_fmt="Region=%{fullData.name}<br>GDP_pc=%{x}<br>CO2_pc=%{y}<br>Population=%{marker.size}",
+        color_map=TAB3_LIFE_REGION_COLOR_MAP,
+        precision={"x": 0, "y": 3, "marker.size": 0},
         margin={"r": 20, "t": 20, "l": 20, "b": 20},
         legend=dict(orientation="h", y=1.02, x=0, bgcolor="rgba(255,255,255,0.8)"),
-        xaxis_title="GDP per Capita (USD) [Log Scale]",
-        yaxis_title="CO₂ per Capita (Tonnes) [Log Scale]",
+        xaxis=dict(title=dict(text="GDP per Capita (USD) [Log Scale]"), type="log"),
+        yaxis=dict(title=dict(text="CO₂ per Capita (Tonnes) [Log Scale]"), type="log"),
     )
 
     return fig, f"{corr:.2f}", text_expl
 
 
-def create_life_expectancy_chart(selected_year, selected_iso):
+def create_life_expectancy_chart(selected_year):
     """Create the life expectancy vs CO2 bubble chart using precomputed merges."""
     # Use centralized merge prepared in prepare_data
     df_merged = tab3_get_life_bubble_year_df(selected_year)
@@ -358,70 +459,26 @@ def create_life_expectancy_chart(selected_year, selected_iso):
     # Color palette by World Bank region
     color_map = TAB3_LIFE_REGION_COLOR_MAP
     
-    # Bubble chart
-    fig_bubble = px.scatter(
-        df_merged,
-        x='Value_capita',
-        y='Life_Expectancy',
-        size='Population_Proxy',
-        color='Region',
-        hover_name='Country',
-        hover_data={
-            'Value_capita': ':.3f',
-            'Life_Expectancy': ':.2f',
-            'Population_Proxy': False,
-            'Region': True
-        },
-        color_discrete_map=color_map,
-        size_max=60,
-        log_x=True,
-        labels={
-            'Value_capita': 'CO2 Per Capita (t/persona)',
-            'Life_Expectancy': 'Life Expectancy (years)',
-            'Population_Proxy': 'Estimated population'
-        },
-        custom_data=[df_merged['ISOcode']]
-    )
-    
-    # Global linear fit computed on log10(CO2 per-capita)
-    x_log = np.log10(df_merged['Value_capita'])
-    y = df_merged['Life_Expectancy']
-    
-    # Linear fit
-    coeffs = np.polyfit(x_log, y, 1)
-    x_range = np.linspace(x_log.min(), x_log.max(), 100)
-    y_trend = coeffs[0] * x_range + coeffs[1]
+    # Global linear fit on log10(CO2 per-capita), precomputed for every year
+    fit = tab3_get_year_fit(selected_year, "life")
+    x_range = np.linspace(fit["x_min"], fit["x_max"], 100)
+    y_trend = fit["slope"] * x_range + fit["intercept"]
     
     # Pearson correlation (r)
-    correlation = np.corrcoef(x_log, y)[0, 1]
-    
-    # Add global trend line
-    fig_bubble.add_scatter(
-        x=10**x_range,
-        y=y_trend,
-        mode='lines',
-        line=dict(color='black', width=2, dash='dash'),
-        name=f'Global Trend (r={correlation:.2f})',
-        showlegend=True
-    )
-    
-    # Highlight selected country with a ring
-    add_selection_ring(fig_bubble, df_merged, selected_iso, "Value_capita", "Life_Expectancy")
-    
-    # Layout styling
-    fig_bubble.update_layout(
+    correlation = fit["r"]
+    
+    # Bubble chart with global trend line and selection ring
+    fig_bubble = render_bubble_chart(
+        df_merged, "Value_capita", "Life_Expectancy", "Population_Proxy",
+        trend=(10**x_range, y_trend, f'Global Trend (r={correlation:.2f})'),
+        hover_fmt="CO2 Per Capita (t/persona)=%{x:.3f}<br>Life Expectancy (years)=%{y:.2f}<br>Region=%{fullData.name}",
+        color_map=color_map,
+        precision={"x": 3, "y": 2, "marker.size": 0},
         margin={"r": 20, "t": 20, "l": 20, "b": 20},
-        xaxis_title='CO₂ Per Capita (t/person) [Log Scale]',
-        yaxis_title='Life Expectancy (years)',
+        xaxis=dict(title=dict(text='CO₂ Per Capita (t/person) [Log Scale]'), type='log'),
+        yaxis=dict(title=dict(text='Life Expectancy (years)')),
         hovermode='closest',
-        legend=dict(
-            title="Region",
-            orientation="h",
-            y=1.02,
-            x=0,
-            bgcolor="rgba(255,255,255,0.8)"
-        ),
-        template="plotly_white"
+        legend=dict(orientation="h", y=1.02, x=0, bgcolor="rgba(255,255,255,0.8)"),
     )
     
     # Generate explanation text
@@ -440,16 +497,14 @@ def create_life_expectancy_chart(selected_year, selected_iso):
 # -----------------------------------------------------------------------------
 # 3. CALLBACK: TRAJECTORY GRAPH (RIGHT PANEL)
 # -----------------------------------------------------------------------------
-@callback(
+@tab_callback(
+    "tab-3",
     Output("corr-trajectory-graph", "figure"),
-    Input("tabs", "active_tab"),
     Input("corr-selected-iso-store", "data"),
-    Input("tab3-view-mode-store", "data")
+    Input("tab3-view-mode-store", "data"),
+    Input("tab3-trend", "value")
 )
-def update_trajectory(active_tab, selected_iso, view_mode):
-    if active_tab != "tab-3":
-        return go.Figure()
-    
+def update_trajectory(selected_iso, view_mode, trend):
     # If no country selected, show a prompt
     if not selected_iso:
         return go.Figure().update_layout(
@@ -461,7 +516,7 @@ def update_trajectory(active_tab, selected_iso, view_mode):
     # --- LIFE EXPECTANCY VIEW ---
     if view_mode == "life":
         # Pre-merged dataset (CO2 pc + Life Expectancy) prepared in prepare_data
-        df_country = tab3_get_life_country_trajectory_df(selected_iso)
+        df_country = tab3_get_life_country_trajectory_df(selected_iso, trend if trend in TRENDS else "raw")
         
         if df_country.empty:
             return go.Figure().update_layout(
@@ -514,7 +569,7 @@ def update_trajectory(active_tab, selected_iso, view_mode):
     
     # --- GDP VIEW (ORIGINAL) ---
     # Pre-merged dataset (GDP pc + CO2 pc) prepared in prepare_data
-    df_country = tab3_get_gdp_country_trajectory_df(selected_iso)
+    df_country = tab3_get_gdp_country_trajectory_df(selected_iso, trend if trend in TRENDS else "raw")
     name = df_country["Country"].iloc[0] if not df_country.empty else selected_iso
 
     fig = go.Figure()
@@ -575,30 +630,54 @@ def toggle_corr_modal(n1, n2, is_open):
 # -----------------------------------------------------------------------------
 # 5. CALLBACK: DECOUPLING/LIFE PROGRESS ANALYSIS CHART
 # -----------------------------------------------------------------------------
-@callback(
+@tab_callback(
+    "tab-3",
+    Output("corr-modal-request", "data"),
+    Input("corr-modal-advanced", "is_open"),
+    Input("year-slider", "value"),
+    Input("tab3-view-mode-store", "data")
+)
+def request_advanced_analysis(is_open, selected_year, view_mode):
+    # Closed modal: keep the last content, render again when it opens
+    if not is_open or selected_year is None:
+        return no_update
+    return {"year": selected_year, "view_mode": view_mode}
+
+
+@tab_callback(
+    "tab-3",
     [Output("corr-decoupling-graph", "figure"),
      Output("modal-title", "children"),
      Output("modal-subtitle", "children"),
      Output("modal-description", "children"),
      Output("top-countries-section", "children")],
-    Input("corr-modal-advanced", "is_open"),
-    Input("year-slider", "value"),
-    Input("tab3-view-mode-store", "data")
+    Input("corr-modal-request", "data"),
+    background=True,
+    progress=[Output("corr-modal-progress", "label")],
+    running=[(Output("corr-modal-progress", "style"), {}, {"display": "none"}),
+             (Output("corr-decoupling-graph", "style"), {"opacity": 0.4}, {})],
+    cancel=[Input("corr-close-advanced", "n_clicks")],
+    prevent_initial_call=True,
 )
-def update_advanced_analysis_chart(is_open, selected_year, view_mode):
-    if not is_open or selected_year is None:
-        return go.Figure(), "", "", "", None
-    
+def update_advanced_analysis_chart(set_progress, request):
+    # Background job (see background.py): superseded by newer requests, cancelled on close
+    if not request:
+        return no_update, no_update, no_update, no_update, no_update
+    set_progress(f"Analysing {request['year']}...")
+
     # --- LIFE EXPECTANCY PROGRESS ANALYSIS ---
-    if view_mode == "life":
-        return create_life_progress_analysis(selected_year)
-    
+    if request["view_mode"] == "life":
+        return create_life_progress_analysis(request["year"])
+
     # --- GDP DECOUPLING ANALYSIS (ORIGINAL) ---
-    return create_decoupling_analysis(selected_year)
+    return create_decoupling_analysis(request["year"])
 
 
+@precomputed("tab3.modal.gdp", year=YEARS)
+@memoize(maxsize=64)
 def create_decoupling_analysis(selected_year):
     """Create the GDP decoupling analysis chart"""
+    import plotly.express as px  # loaded on the first modal, not at start-up
     modal_title = "Decoupling Analysis: Breaking the Link"
     modal_subtitle = "Green Growth vs. Dirty Growth"
     modal_description = "Are we breaking the link between money and smoke? This chart compares the % Growth of GDP (Horizontal) vs. the % Growth of Emissions (Vertical) over time. The goal is the 'Green Growth' zone (Bottom-Right): This represents 'Absolute Decoupling', where an economy grows richer while simultaneously reducing its environmental footprint."
@@ -697,8 +776,11 @@ def create_decoupling_analysis(selected_year):
     return fig, modal_title, modal_subtitle, modal_description, top_section
 
 
+@precomputed("tab3.modal.life", year=YEARS)
+@memoize(maxsize=64)
 def create_life_progress_analysis(selected_year):
     """Create the Life Expectancy progress analysis chart"""
+    import plotly.express as px
     modal_title = "Health Progress Analysis: Life vs. Emissions"
     modal_subtitle = "Sustainable Health Improvement"
     modal_description = "Are countries improving health outcomes while managing emissions? This chart compares the Change in Life Expectancy (Horizontal) vs. the Change in CO₂ per Capita (Vertical). The goal is the 'Sustainable Progress' zone (Top-Right): countries that significantly increased life expectancy while reducing or moderately increasing emissions per capita."
@@ -0,0 +1,185 @@
+from dash import html, dcc, Input, Output, no_update
+import dash_bootstrap_components as dbc
+import numpy as np
+from prepare_data import YEAR_RANKINGS, YEARS
+from components import controls
+from caching import memoize
+from response_store import precomputed
+from dispatch import tab_callback
+import figures
+
+# ==================== RANK TRAJECTORIES ====================
+# How the top countries of the selected year moved through a ranking over
+# every year. Ranks come from the per-year orderings precomputed in
+# prepare_data (YEAR_RANKINGS), so a chart needs no sorting at request time.
+
+# metric key (YEAR_RANKINGS) -> label
+RANK_METRICS = {
+    "totals": "CO2 Emissions",
+    "gdp_total": "Total GDP",
+    "life": "Life Expectancy",
+}
+
+# Input domains walked by `python response_store.py build`
+TOP_NS = (5, 10, 15)
+
+
+def layout():
+    return html.Div(className='tab-animacion', children=[
+        controls.layout(),
+
+        # --- METRIC AND DEPTH SELECTION ---
+        dbc.Row([
+            dbc.Col(dbc.Card(dbc.CardBody([
+                html.Div([
+                    html.Label("Ranking:", className="fw-bold me-4 mb-0 small"),
+                    dbc.RadioItems(
+                        id="rank-metric",
+                        options=[{"label": label, "value": key} for key, label in RANK_METRICS.items()],
+                        value="totals",
+                        inline=True,
+                        className="small"
+                    ),
+                ], className="d-flex align-items-center")
+            ], className="py-2 px-3"), className="shadow-sm"), width=8),
+
+            dbc.Col(dbc.Card(dbc.CardBody([
+                html.Div([
+                    html.Label("Top:", className="fw-bold me-4 mb-0 small"),
+                    dbc.RadioItems(
+                        id="rank-top",
+                        options=[{"label": str(n), "value": n} for n in TOP_NS],
+                        value=10,
+                        inline=True,
+                        className="small"
+                    ),
+                ], className="d-flex align-items-center")
+            ], className="py-2 px-3"), className="shadow-sm"), width=4),
+        ], className="mb-3"),
+
+        # --- BUMP CHART ---
+        dbc.Card(dbc.CardBody([
+            html.H5("Ranking Trajectories", className="text-primary fw-bold mb-1"),
+            html.P("The leading countries of the selected year and their position in the ranking over time. "
+                   "Lines leaving the chart fell below twice the selected depth.",
+                   className="text-muted small mb-2"),
+            dcc.Graph(id="rank-bump-graph", style={'height': '560px'}),
+        ]), className="shadow-sm"),
+    ])
+
+
+@tab_callback(
+    "tab-4",
+    Output("rank-bump-graph", "figure"),
+    Input("year-slider", "value"),
+    Input("rank-metric", "value"),
+    Input("rank-top", "value"),
+)
+def update_rank_bump(selected_year, metric, top_n):
+    if selected_year is None or metric not in RANK_METRICS:
+        return no_update
+    return render_rank_bump(metric, int(top_n or TOP_NS[1]), selected_year)
+
+
+@precomputed("tab4.bump", metric=tuple(RANK_METRICS), top_n=TOP_NS, year=YEARS)
+@memoize(maxsize=256)
+def render_rank_bump(metric, top_n, selected_year):
+    """Bump chart: rank of the year's ``top_n`` countries in every year."""
+    label = RANK_METRICS[metric]
+    ranking = YEAR_RANKINGS[metric]
+    top = ranking.top(selected_year, top_n)
+    ranks = ranking.trajectories(top["ISOcode"])
+    years = np.asarray(YEARS)
+
+    series = [{"name": name, "x": years, "y": ranks[i], "width": 3 if i < 3 else 2}
+              for i, name in enumerate(top["Country"])]
+    return figures.line(
+        series,
+        markers=True,
+        hovertemplate=f"<b>%{{fullData.name}}</b><br>%{{x}}: #%{{y}} in {label}<extra></extra>",
+        template_name="plotly_white",
+        precision={"y": 0},
+        height=560,
+        margin={"r": 10, "t": 10, "l": 10, "b": 10},
+        xaxis={"title": {"text": "Year"}},
+        # Best rank on top; ranks beyond twice the depth leave the frame
+        yaxis={"title": {"text": "Rank"}, "range": [2 * top_n + 0.5, 0.5], "dtick": 1 if top_n <= 5 else 2},
+        legend={"title": {"text": f"Top {top_n} in {selected_year}"}},
+        shapes=[figures.vline(selected_year, color="gray", dash="dash")],
+    )
+
+
+# ==================== CONCLUSION TEXT ====================
+# The Tab 4 insight quotes ranks, so it is written from YEAR_RANKINGS rather
+# than by hand: the claims stay true when the data files are updated.
+
+def _ordinal(n):
+    n = int(n)
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+def _first_year(ranks, condition):
+    """First year of YEARS whose rank satisfies ``condition`` (None if never)."""
+    hits = np.flatnonzero(condition(np.nan_to_num(ranks, nan=np.inf)))
+    return YEARS[hits[0]] if hits.size else None
+
+
+@memoize(maxsize=1)
+def ranking_insight():
+    """Tab 4 summary: leader, climber and faller of the CO2 ranking, GDP and life leaders.
+
+    Every clause is only written when the ranks prove it (e.g. "holds the
+    first position" needs first place in every year).
+    """
+    first, last = YEARS[0], YEARS[-1]
+    sentences = ["The bump chart in this tab follows the countries that lead the selected ranking in the chosen "
+                 "year and shows the position each of them held in every other year. Steep lines mark the fastest "
+                 "climbers, while flat lines at the top reveal a stable leadership."]
+
+    # CO2: today's leader, the strongest climber into the top three, the steepest faller of the old top ten
+    co2 = YEAR_RANKINGS["totals"]
+    now, then = co2.top(last, 3), co2.top(first, 10)
+    if not now.empty and not then.empty:
+        names = dict(zip(then["ISOcode"], then["Country"])) | dict(zip(now["ISOcode"], now["Country"]))
+        isos = list(names)
+        ranks = dict(zip(isos, co2.trajectories(isos)))
+        leader = now["ISOcode"].iloc[0]
+        parts = []
+        on_top = ranks[leader] == 1
+        if on_top.all():
+            parts.append(f"{names[leader]} holds the first position from {first} to {last}")
+        elif on_top[0]:
+            # First at both ends but not throughout: name the year it lost and the year it took it back
+            regained = YEARS[len(on_top) - np.argmax(~on_top[::-1])]
+            parts.append(f"{names[leader]} is first in {first}, loses the top spot in "
+                         f"{_first_year(ranks[leader], lambda r: r != 1)} and regains it in {regained}")
+        else:
+            start = f"the {_ordinal(ranks[leader][0])} position in {first}" if ranks[leader][0] > 0 else "outside the ranking"
+            parts.append(f"{names[leader]} rises from {start} to the first place in "
+                         f"{_first_year(ranks[leader], lambda r: r == 1)}")
+        gains = {iso: ranks[iso][0] - ranks[iso][-1] for iso in now["ISOcode"].iloc[1:] if ranks[iso][0] > 3}
+        if gains:
+            climber = max(gains, key=gains.get)
+            parts.append(f"{names[climber]} climbs from the {_ordinal(ranks[climber][0])} position into the "
+                         f"top three by {_first_year(ranks[climber], lambda r: r <= 3)}")
+        # Only countries still ranked in the last year: a missing rank is missing data, not a fall
+        losses = {iso: ranks[iso][-1] - ranks[iso][0] for iso in then["ISOcode"] if ranks[iso][-1] > 10}
+        if losses:
+            faller = max(losses, key=losses.get)
+            parts.append(f"{names[faller]} falls from the {_ordinal(ranks[faller][0])} position in {first} "
+                         f"to the {_ordinal(ranks[faller][-1])} in {last}")
+        sentences.append("In total CO2 emissions, " + ", and ".join(parts[:-1]) +
+                         (", while " if len(parts) > 1 else "") + parts[-1] + ".")
+
+    # GDP and life expectancy: the leaders of the first and last year
+    gdp_then, gdp_now = YEAR_RANKINGS["gdp_total"].top(first, 2), YEAR_RANKINGS["gdp_total"].top(last, 2)
+    life = YEAR_RANKINGS["life"].top(last, 4)
+    if len(gdp_now) == 2 and len(gdp_then) == 2:
+        sentences.append(f"The total GDP ranking is led by {' and '.join(gdp_now['Country'])} in {last}, "
+                         f"against {' and '.join(gdp_then['Country'])} in {first}.")
+    if len(life) == 4:
+        countries = list(life["Country"])
+        sentences.append(f"In {last} the life expectancy ranking is led by {countries[0]} and {countries[1]}, "
+                         f"followed by {countries[2]}, then {countries[3]}.")
+    return " ".join(sentences[:1]) + "\n\n" + " ".join(sentences[1:])